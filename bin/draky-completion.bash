@@ -0,0 +1,126 @@
+# Completion of the draky commands for bash and zsh. It reads the completion index which draky
+# keeps in the project's configuration directory, so completing doesn't run draky, or its core.
+#
+# To enable it, add this line to ~/.bashrc or ~/.zshrc:
+#   source /path/to/draky-completion.bash
+#
+# The index is updated by every "draky env" and "draky core" command, e.g. "draky env build".
+
+# It must match COMPLETION_INDEX_FORMAT_VERSION in the core.
+_DRAKY_COMPLETION_INDEX_FORMAT=1
+
+# Prints the path to the completion index of the project the current directory belongs to, the
+# same way the wrapper looks for the project.
+_draky_completion_index() {
+  local dir="$PWD"
+  while [[ -n "$dir" && "$dir" != / && "$dir" != "$HOME" ]]; do
+    if [[ -d "$dir/.draky" ]]; then
+      if [[ -f "$dir/.draky/.completion-index" ]]; then
+        printf '%s\n' "$dir/.draky/.completion-index"
+      fi
+      return
+    fi
+    dir="${dir%/*}"
+  done
+}
+
+# Adds to COMPREPLY the given candidates starting with the word being completed, prefixed.
+_draky_complete_from() {
+  local prefix="$1" word="$2" candidate
+  shift 2
+  for candidate in "$@"; do
+    if [[ "$candidate" == "$word"* ]]; then
+      COMPREPLY+=("$prefix$candidate")
+    fi
+  done
+}
+
+_draky_complete() {
+  # Arrays are indexed from 0, just like in bash.
+  if [[ -n "$ZSH_VERSION" ]]; then
+    setopt local_options ksh_arrays
+  fi
+  COMPREPLY=()
+
+  local index
+  index="$(_draky_completion_index)"
+  [[ -n "$index" ]] || return 0
+
+  local header type first second third
+  local -a commands=() flags=() envs=() services=()
+  {
+    IFS= read -r header
+    while IFS=$'\t' read -r type first second third; do
+      case "$type" in
+        command) commands+=("$first") ;;
+        flag) flags+=("$first"$'\t'"$second"$'\t'"$third") ;;
+        env) envs+=("$first") ;;
+        service) services+=("$first") ;;
+      esac
+    done
+  } < "$index"
+  [[ "$header" == *"format ${_DRAKY_COMPLETION_INDEX_FORMAT}."* ]] || return 0
+
+  local cur="${COMP_WORDS[COMP_CWORD]}"
+  local prev="${COMP_WORDS[COMP_CWORD-1]}"
+
+  # Find the longest sequence of the typed words which is a command, e.g. "env build".
+  local command_words="" candidate known word i found
+  for (( i = 1; i < COMP_CWORD; i++ )); do
+    word="${COMP_WORDS[i]}"
+    candidate="${command_words:+$command_words }$word"
+    found=0
+    for known in "${commands[@]}"; do
+      if [[ "$known" == "$candidate" ]]; then
+        found=1
+        break
+      fi
+    done
+    (( found )) || break
+    command_words="$candidate"
+  done
+
+  # Values of the flags. Lists of environments and services are comma-separated.
+  local flag
+  for flag in "${flags[@]}"; do
+    if [[ "$flag" == "$command_words"$'\t'"$prev"$'\t'1 ]]; then
+      local prefix=""
+      if [[ "$cur" == *,* ]]; then
+        prefix="${cur%,*},"
+      fi
+      case "$prev" in
+        --envs) _draky_complete_from "$prefix" "${cur##*,}" "${envs[@]}" ;;
+        --services) _draky_complete_from "$prefix" "${cur##*,}" "${services[@]}" ;;
+      esac
+      return 0
+    fi
+  done
+
+  if [[ "$cur" == -* ]]; then
+    for flag in "${flags[@]}"; do
+      if [[ "$flag" == "$command_words"$'\t'* ]]; then
+        flag="${flag#*$'\t'}"
+        _draky_complete_from "" "$cur" "${flag%%$'\t'*}"
+      fi
+    done
+    _draky_complete_from "" "$cur" --help
+    return 0
+  fi
+
+  # Subcommands are completed only right after the command.
+  (( i == COMP_CWORD )) || return 0
+  for candidate in "${commands[@]}"; do
+    if [[ -n "$command_words" ]]; then
+      [[ "$candidate" == "$command_words "* ]] || continue
+      candidate="${candidate#"$command_words "}"
+    fi
+    if [[ "$candidate" != *" "* ]]; then
+      _draky_complete_from "" "$cur" "$candidate"
+    fi
+  done
+}
+
+if [[ -n "$ZSH_VERSION" ]]; then
+  autoload -U +X bashcompinit && bashcompinit
+fi
+complete -o default -F _draky_complete draky
@@ -1,88 +1,121 @@
 """Main module
 """
 
-import os
 import sys
-from colorama import Fore, Style
-
-from dk.args_parser import ArgsParser
-from dk.compose_manager import ComposeManager
-from dk.core_commands_provider import CoreCommandsProvider
-from dk.env_commands_provider import EnvCommandsProvider
-from dk.hook_manager import HookManager
-from dk.internal_commands_provider import InternalCommandsProvider
-from dk.process_executor import ProcessExecutor
+
+from dk import stats, tracing
+from dk.config_client import ConfigClient
+
+# Internal commands are run by the wrapper before every command, so if the config server is
+# running, we let it answer them before anything heavier gets loaded.
+if (
+    len(sys.argv) > 3
+    and sys.argv[1] == 'core'
+    and sys.argv[2] == '__internal'
+):
+    with tracing.span('config_server.forward') as span_args:
+        server_exit_code = ConfigClient().forward(sys.argv[3:])
+        span_args['exit_code'] = server_exit_code
+    if server_exit_code is not None:
+        sys.exit(server_exit_code)
+
+# Modules are imported only on the code paths that need them, as every command starts a new
+# process, and most commands don't need most of them.
+# pylint: disable=wrong-import-position,wrong-import-order,ungrouped-imports,import-outside-toplevel
+from dk.command_provider import PARSER_COMMANDS
 from dk.config_manager import ConfigManager
-from dk.custom_commands_provider import CustomCommandsProvider
-from dk.initializer import initialize
 
 
-config_manager = ConfigManager()
+with tracing.span('configs.load'):
+    config_manager = ConfigManager()
 
 # If we are initializing, we need to complete initialization before running anything else, as
 # therwise config manager won't have enough data.
 if len(sys.argv) == 3 and sys.argv[1] == 'env' and sys.argv[2] == 'init':
+    from dk.initializer import initialize
     initialize(config_manager)
     sys.exit(0)
 
 
-# Internal commands should be resolved before other commands because they may be needed to setup
-# later commands.
-if (
-    len(sys.argv) > 3
-    and sys.argv[1] == 'core'
-    and sys.argv[2] == '__internal'
-):
+def run_internal_command() -> None:
+    """Runs the internal command.
+    """
+    from dk.custom_commands_provider import CustomCommandsProvider
+    from dk.internal_commands_provider import InternalCommandsProvider
     internal_commands_provider = \
         InternalCommandsProvider(config_manager, CustomCommandsProvider(config_manager))
     internal_commands_provider.handle_internal_commands(sys.argv[3:])
     sys.exit(0)
 
 
-custom_commands_provider = CustomCommandsProvider(config_manager)
+def run_parser_command() -> None:
+    """Runs the command handled by the arguments parser.
+    """
+    from dk.args_parser import ArgsParser
+    from dk.compose_manager import ComposeManager
+    from dk.core_commands_provider import CoreCommandsProvider
+    from dk.custom_commands_provider import CustomCommandsProvider
+    from dk.env_commands_provider import EnvCommandsProvider
+    from dk.hook_manager import HookManager
+    from dk.process_executor import ProcessExecutor
+
+    process_executor = ProcessExecutor(
+        config_manager,
+        ComposeManager(config_manager),
+        HookManager(config_manager),
+    )
 
-compose_builder = ComposeManager(config_manager)
-hook_manager = HookManager(config_manager)
-process_executor = ProcessExecutor(config_manager, compose_builder, hook_manager)
+    args_parser = ArgsParser(version=config_manager.version)
+
+    def display_help(arguments=None):
+        """Callback displaying help for given arguments.
+        """
+        if arguments is None:
+            arguments = []
+        args_parser.parse(arguments + ['-h'])
+
+    custom_commands = CustomCommandsProvider(config_manager).get_commands()
+
+    def refresh_completion_index(current_process_executor: ProcessExecutor) -> None:
+        """Callback writing the completion index after the environment has been built. The watch
+           mode may have reloaded the configuration, and its commands with it.
+        """
+        from dk.completion import write_completion_index
+        from dk.lockfile import touch_lockfiles
+        write_completion_index(
+            current_process_executor,
+            [env_commands_provider, core_commands_provider],
+            custom_commands if current_process_executor is process_executor else None,
+        )
+        # Nothing is written after this point, so lockfiles written by the build are fresh.
+        touch_lockfiles()
+
+    env_commands_provider = EnvCommandsProvider(
+        process_executor,
+        display_help,
+        config_manager,
+        refresh_completion_index,
+    )
+    args_parser.add_command_group(env_commands_provider)
 
-args_parser = ArgsParser(version=config_manager.version)
+    core_commands_provider = CoreCommandsProvider(
+        display_help,
+    )
+    args_parser.add_command_group(core_commands_provider)
+
+    # Add custom commands to the parser. This is needed for them to be included in the help
+    # command.
+    args_parser.add_commands(custom_commands)
+
+    # Display help by default.
+    if len(sys.argv) == 1:
+        display_help()
 
-def display_help(arguments=None):
-    """Callback displaying help for given arguments.
-    """
-    if arguments is None:
-        arguments = []
-    args_parser.parse(arguments + ['-h'])
-
-env_commands_provider = EnvCommandsProvider(
-    process_executor,
-    display_help,
-    config_manager,
-)
-args_parser.add_command_group(env_commands_provider)
-
-core_commands_provider = CoreCommandsProvider(
-    display_help,
-)
-args_parser.add_command_group(core_commands_provider)
-
-# Add custom commands to the parser. This is needed for them to be included in the help command.
-args_parser.add_commands(custom_commands_provider.get_commands())
-
-# Display help by default.
-if len(sys.argv) == 1:
-    display_help()
-
-# Only use args_parser for the "env" and "-h" commands. For other commands, pass all arguments
-# directly to proper scripts. We are not validating them.
-if args_parser.has_command(sys.argv[1]):
     args = args_parser.parse()
     if not vars(args)[args.COMMAND]:
         args_parser.parse([args.COMMAND, '-h'])
     if sys.argv[1] == env_commands_provider.name():
-        # Find all environments.
-        available_environments = next(os.walk(config_manager.get_project_paths().environments))[1]
-        if config_manager.get_project_env() not in available_environments:
+        if config_manager.get_project_env() not in config_manager.get_project_envs():
             print(
                 f"Environment '{config_manager.get_project_env()}' has not been found in"
                 f" '{config_manager.get_project_paths().environments}'."
@@ -93,14 +126,22 @@ if args_parser.has_command(sys.argv[1]):
         core_commands_provider.run(sys.argv[2], sys.argv[3:], sys.argv[1:2])
     else:
         raise ValueError("Unexpected argument.")
-else:
+
+
+def run_custom_command() -> None:
+    """Runs the custom command. Arguments are passed to the command's script as they are, without
+       validation.
+    """
+    from dk.custom_commands_provider import CustomCommandsProvider
+    from dk.process_executor import ProcessExecutor
+
+    custom_commands_provider = CustomCommandsProvider(config_manager)
     if not custom_commands_provider.supports(sys.argv[1]):
+        from colorama import Fore, Style
         print(f"{Fore.RED}Command not found... but you can create it!{Style.RESET_ALL}")
         sys.exit(0)
 
     custom_command = custom_commands_provider.get_command(sys.argv[1])
-    command_file = custom_command.cmd
-    service = custom_command.service
 
     # All reminder arguments, no matter if flags or not.
     reminder_args = sys.argv[2:]
@@ -108,9 +149,33 @@ else:
     if custom_command.service is None:
         raise RuntimeError("This command was supposed to run on host.")
 
-    exit_code = process_executor.execute_inside_container(
+    # Running the command doesn't require building the environment, so the managers needed for
+    # that are not created.
+    exit_code = ProcessExecutor(config_manager).execute_inside_container(
         custom_command,
         reminder_args,
         variables
     )
     sys.exit(exit_code)
+
+
+# Internal commands should be resolved before other commands because they may be needed to setup
+# later commands.
+if (
+    len(sys.argv) > 3
+    and sys.argv[1] == 'core'
+    and sys.argv[2] == '__internal'
+):
+    run_internal_command()
+
+# Only use the arguments parser for the "env" and "-h" commands. For other commands, pass all
+# arguments directly to proper scripts.
+with stats.record_invocation(
+    stats.get_command_name(sys.argv),
+    config_manager.get_project_env() if config_manager.is_project_context_full() else None,
+    config_manager.get_project_id() if config_manager.is_project_context_full() else None,
+):
+    if len(sys.argv) == 1 or sys.argv[1] in PARSER_COMMANDS:
+        run_parser_command()
+    else:
+        run_custom_command()
@@ -0,0 +1,63 @@
+"""Manifest of the environment's build.
+"""
+import hashlib
+import json
+
+from dk.cache import PersistentCache
+
+
+def hash_file(path: str) -> str | None:
+    """Returns the hash of the file's content, or None if the file doesn't exist.
+    """
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def hash_inputs(inputs: dict) -> str:
+    """Returns the hash of the given JSON-serializable inputs.
+    """
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode('utf8')).hexdigest()
+
+
+class BuildManifest:
+    """Records the hash of the build's inputs and its outputs, so the build can be skipped if
+       nothing has changed since the previous one.
+    """
+
+    def __init__(self, path: str, version: str):
+        self.__cache: PersistentCache = PersistentCache(path, version)
+
+    def is_up_to_date(self, inputs_hash: str) -> bool:
+        """Tells if the previous build had the same inputs, and its outputs haven't been modified
+           since.
+        """
+        manifest = self.__cache.load()
+        if manifest.get('inputs') != inputs_hash:
+            return False
+
+        outputs: dict[str, str] = manifest.get('outputs', {})
+        return bool(outputs) and all(
+            hash_file(path) == output_hash for path, output_hash in outputs.items()
+        )
+
+    def get_commands_mounts(self) -> dict[str, list[str]]:
+        """Returns the commands' directories mounted into every service by the recorded build.
+        """
+        return self.__cache.load().get('commands_mounts', {})
+
+    def save(
+            self,
+            inputs_hash: str,
+            outputs: list[str],
+            commands_mounts: dict[str, list[str]] | None = None,
+    ) -> None:
+        """Records the build.
+        """
+        self.__cache.save({
+            'inputs': inputs_hash,
+            'outputs': {path: hash_file(path) for path in outputs},
+            'commands_mounts': commands_mounts or {},
+        })
@@ -0,0 +1,62 @@
+"""Persistent caches speeding up loading of the project's data.
+"""
+import hashlib
+import json
+import os
+
+# Bump it whenever the format of any cache changes.
+CACHE_FORMAT_VERSION = 1
+
+
+class PersistentCache:
+    """Stores JSON-serializable data on disk. Data stored by a different version of draky is
+       discarded.
+    """
+
+    def __init__(self, path: str, version: str):
+        self.path: str = path
+        self.version: str = f"{CACHE_FORMAT_VERSION}:{version}"
+
+    def load(self) -> dict:
+        """Returns the cached data, or an empty dictionary if there is no valid data.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if not isinstance(cached, dict) or cached.get('version') != self.version:
+            return {}
+
+        return cached.get('data', {})
+
+    def save(self, data: dict) -> None:
+        """Stores the data. Cache is only an optimization, so failures are silently ignored.
+        """
+        try:
+            content = json.dumps({'version': self.version, 'data': data})
+        except (TypeError, ValueError):
+            return
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf8') as f:
+                f.write(content)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+
+def get_project_cache(name: str, project_config_path: str) -> PersistentCache | None:
+    """Returns the named cache of the given project. Caches are stored in the global config
+       directory. Returns None if the cache is not available in the current context.
+    """
+    if 'DRAKY_GLOBAL_CONFIG_ROOT' not in os.environ or 'DRAKY_VERSION' not in os.environ:
+        return None
+
+    project_hash = hashlib.sha1(project_config_path.encode('utf8')).hexdigest()
+    path = f"{os.environ['DRAKY_GLOBAL_CONFIG_ROOT']}/cache/{project_hash}/{name}.json"
+    return PersistentCache(path, os.environ['DRAKY_VERSION'])
@@ -0,0 +1,76 @@
+"""Persistent index of the custom commands' files.
+"""
+import os
+
+from dk import yaml_io
+from dk.cache import PersistentCache
+from dk.scanner import COMPANION_FILE_SUFFIX, ProjectScan
+
+
+class CommandIndex:
+    """Index of the custom commands' files. Files are taken from the project's scan, and the
+       content of the companion files is persisted, and refreshed only for files that have been
+       modified, so finding commands doesn't require parsing everything again.
+    """
+
+    def __init__(self, cache: PersistentCache | None = None):
+        self.__cache: PersistentCache | None = cache
+        cached = cache.load() if cache else {}
+        self.__companions: dict[str, dict] = cached.get('companions', {})
+        self.__scan: ProjectScan | None = None
+        self.__dirty: bool = False
+
+    def find_command_files(self, scan: ProjectScan, weights: dict) -> list[list[str]]:
+        """Returns the [path, filename] pairs of all command files of the scanned project, in the
+           same order as find_files_weighted_by_path() would.
+        """
+        self.__scan = scan
+        companions = {f"{path}{COMPANION_FILE_SUFFIX}" for path in scan.companions}
+        if not self.__companions.keys() <= companions:
+            self.__companions = {
+                k: v for k, v in self.__companions.items() if k in companions
+            }
+            self.__dirty = True
+
+        files_by_weight: dict[int, list] = {}
+        for path, filename in scan.commands:
+            files_by_weight.setdefault(weights.get(path) or 0, []).append([path, filename])
+        return [
+            file for weight in sorted(files_by_weight) for file in files_by_weight[weight]
+        ]
+
+    def has_companion(self, path: str, filename: str) -> bool:
+        """Tells if the given command file has a companion file. Only valid for files returned
+           by find_command_files().
+        """
+        return f"{path}{os.sep}{filename}" in self.__scan.companions
+
+    def load_companion(self, command_path: str) -> dict:
+        """Returns the content of the command's companion file.
+        """
+        companion_path = command_path + COMPANION_FILE_SUFFIX
+        try:
+            stat = os.stat(companion_path)
+        except OSError:
+            return {}
+        key = [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+        entry = self.__companions.get(companion_path)
+        if entry is None or entry['key'] != key:
+            try:
+                with open(companion_path, "r", encoding='utf8') as stream:
+                    content = yaml_io.load(stream)
+            except (IOError, yaml_io.YAMLError):
+                content = {}
+            entry = {'key': key, 'content': content if isinstance(content, dict) else {}}
+            self.__companions[companion_path] = entry
+            self.__dirty = True
+
+        return entry['content']
+
+    def save(self) -> None:
+        """Persists the index if it has changed.
+        """
+        if self.__cache and self.__dirty:
+            self.__cache.save({'companions': self.__companions})
+            self.__dirty = False
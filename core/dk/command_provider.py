@@ -5,6 +5,12 @@ from typing import Union, Callable
 
 from dk.command import CallableCommand
 
+# Top-level commands handled by the arguments parser: its own flags, and the names of the
+# providers registered in it. All other commands are custom commands, which are passed to their
+# scripts directly, so the parser doesn't need to be built for them. It's kept here, rather than
+# derived from the providers, so telling them apart doesn't require loading the providers.
+PARSER_COMMANDS = ['-h', '-v', '--version', 'env', 'core']
+
 
 class CallableCommandsProvider(ABC):
     """Provides and executes commands.
@@ -62,6 +68,43 @@ class CallableCommandsProvider(ABC):
         """Help text describing this group of commands.
         """
 
+    @staticmethod
+    def _get_option_value(args: list[str], name: str) -> str | None:
+        """Returns the value of the option given either as "--name value" or "--name=value", or
+           None if the option is not given.
+        """
+        return CallableCommandsProvider._parse_options(args, [name])[0][name]
+
+    @staticmethod
+    def _parse_options(
+            args: list[str],
+            names: list[str],
+    ) -> tuple[dict[str, str | None], list[str]]:
+        """Parses the options with values, given either as "--name value" or "--name=value".
+           Other flags are skipped, and parsing stops at the first positional argument, or after
+           "--". Returns the values of the options, by name, and the rest of the arguments.
+        """
+        options: dict[str, str | None] = dict.fromkeys(names)
+        rest = []
+        i = 0
+        while i < len(args):
+            arg = args[i]
+            i += 1
+            if arg == '--':
+                break
+            name, has_value, value = arg.partition('=')
+            if name in names:
+                if not has_value:
+                    value = args[i] if i < len(args) else None
+                    i += 1
+                options[name] = value
+            elif arg.startswith('-'):
+                rest.append(arg)
+            else:
+                i -= 1
+                break
+        return options, rest + args[i:]
+
     def _add_command(self, command: Union[CallableCommand, "CallableCommandsProvider"]) -> None:
         if isinstance(command, CallableCommandsProvider):
             self.__commands[command.name()] = command
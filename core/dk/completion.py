@@ -0,0 +1,96 @@
+"""Index of the project's commands, environments and services, used by the shell completion. It's
+read directly on the host by the completion script, so completing doesn't need the core at all.
+"""
+from dk import yaml_io
+from dk.command import ServiceCommand
+from dk.command_provider import CallableCommandsProvider
+from dk.config_manager import ConfigManager
+from dk.custom_commands_provider import CustomCommandsProvider
+from dk.process_executor import ProcessExecutor
+from dk.utils import write_file_if_changed
+
+COMPLETION_INDEX_FILENAME = '.completion-index'
+
+# Bump it whenever the format of the index changes, together with the completion script.
+COMPLETION_INDEX_FORMAT_VERSION = 1
+
+# Actions of the flags which don't take a value.
+VALUELESS_FLAG_ACTIONS = ['store_true', 'store_false', 'count', 'help', 'version']
+
+
+def get_completion_index_path(config_manager: ConfigManager) -> str:
+    """Returns the path to the completion index of the current project.
+    """
+    return f"{config_manager.get_project_config_path()}/{COMPLETION_INDEX_FILENAME}"
+
+
+def format_help_text(text: str) -> str:
+    """Returns the help text as a single line, without the characters separating the fields.
+    """
+    return ' '.join(str(text).split())
+
+
+def build_completion_index(
+        providers: list[CallableCommandsProvider],
+        custom_commands: list[ServiceCommand],
+        environments: list[str],
+        services: list[str],
+) -> str:
+    """Returns the content of the completion index. Every line is a record of tab-separated
+       fields, starting with the record's type:
+       - "command", the command's words separated by spaces, and its help text,
+       - "flag", the command's words, the flag, and 1 if the flag takes a value or 0 otherwise,
+       - "env", and the environment's name,
+       - "service", and the service's name.
+    """
+    lines = [
+        f"# draky completion index, format {COMPLETION_INDEX_FORMAT_VERSION}. This file is "
+        "autogenerated. Don't modify it directly."
+    ]
+    for provider in providers:
+        __add_provider(lines, provider, [provider.name()])
+    for command in custom_commands:
+        lines.append(f"command\t{command.name}\t{format_help_text(command.help)}")
+    lines.extend(f"env\t{environment}" for environment in environments)
+    lines.extend(f"service\t{service}" for service in services)
+    return '\n'.join(lines) + '\n'
+
+
+def __add_provider(lines: list[str], provider: CallableCommandsProvider, words: list[str]) -> None:
+    lines.append(f"command\t{' '.join(words)}\t{format_help_text(provider.help_text())}")
+    for name, command in provider.get_commands().items():
+        if isinstance(command, CallableCommandsProvider):
+            __add_provider(lines, command, words + [name])
+            continue
+
+        command_words = ' '.join(words + [name])
+        lines.append(f"command\t{command_words}\t{format_help_text(command.help)}")
+        for flag in command.flags:
+            takes_value = 0 if flag.action in VALUELESS_FLAG_ACTIONS else 1
+            lines.append(f"flag\t{command_words}\t{flag.name}\t{takes_value}")
+
+
+def write_completion_index(
+        process_executor: ProcessExecutor,
+        providers: list[CallableCommandsProvider],
+        custom_commands: list[ServiceCommand] | None = None,
+) -> bool:
+    """Writes the completion index of the current project, unless it's up to date. Services are
+       taken from the built environment, and custom commands are found in the executor's
+       configuration, unless they are given. The index is only a convenience, so failures are
+       silently ignored. Returns True if the index has been written.
+    """
+    config_manager = process_executor.config
+    if custom_commands is None:
+        custom_commands = CustomCommandsProvider(config_manager).get_commands()
+    try:
+        services = process_executor.get_services()
+    except (OSError, yaml_io.YAMLError):
+        services = []
+    content = build_completion_index(
+        providers, custom_commands, config_manager.get_project_envs(), services
+    )
+    try:
+        return write_file_if_changed(get_completion_index_path(config_manager), content)
+    except OSError:
+        return False
@@ -4,12 +4,16 @@ import os
 import sys
 import typing
 import copy
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping
 
-import yaml
 from colorama import Fore, Style
 from packaging import version
 
+from dk import tracing, yaml_io
 from dk.config_manager import ConfigManager
+from dk.utils import write_file_if_changed
 
 
 class Compose:
@@ -60,7 +64,7 @@ class Compose:
         """Returns the content of the compose file as a string.
         """
 
-        compose_string = yaml.safe_dump(self.__content, default_flow_style=False)
+        compose_string = yaml_io.dump(self.__content, default_flow_style=False)
         if self.is_substituted_variables():
             compose_string = self.__variables_resolver(compose_string)
 
@@ -69,35 +73,88 @@ class Compose:
         return compose_string
 
 
+class ExtendedFilesCache:
+    """Cache of the parsed files extended by recipes. It may be shared between recipes, so every
+       file is read at most once.
+    """
+
+    def __init__(self):
+        self.__files: dict[str, dict] = {}
+
+    def get(self, path: str) -> dict:
+        """Returns the parsed content of the file. The content is shared, so it must not be
+           modified.
+        """
+        if path not in self.__files:
+            self.__files[path] = yaml_io.load_file(path)
+        return self.__files[path]
+
+    def invalidate(self, path: str | None = None) -> None:
+        """Forgets the given file, or all files if no path is given.
+        """
+        if path is None:
+            self.__files.clear()
+            return
+        self.__files.pop(path, None)
+
+
+@dataclass(frozen=True)
+class ResolvedRecipe:
+    """Dataclass storing the recipe with all extended services merged in. It's shared by everything
+       that needs the recipe's data, so it must not be modified.
+    """
+    compose: dict
+    addons: Mapping[str, tuple[str, ...]]
+
+
 class ComposeRecipe:
     """Class representing the compose's recipe.
     """
 
-    def __init__(self, content: dict, recipe_path: str, env_path: str):
+    def __init__(
+            self,
+            content: dict,
+            recipe_path: str,
+            env_path: str,
+            extended_files: ExtendedFilesCache | None = None,
+    ):
         self.__validate_recipe(content)
         self.__content: dict = content
         self.recipe_path = recipe_path
         self.__env_path = env_path
+        self.__extended_files: ExtendedFilesCache =\
+            extended_files if extended_files else ExtendedFilesCache()
+        self.__resolved: ResolvedRecipe | None = None
 
     def get_addons(self, service: str) -> list[str]:
         """Returns a list of addons for the given service.
         """
-        compose = self.__to_compose_dict(cleaned=False)
-        services = compose['services']
-        if service not in services:
+        addons = self.resolve().addons
+        if service not in addons:
             raise ValueError(f"Unknown service '{service}'")
 
-        if 'draky' not in services[service]:
-            return []
-
-        return services[service]['draky']['addons']\
-                    if 'addons' in services[service]['draky'] else []
+        return list(addons[service])
 
     def get_services(self) -> dict:
         """Returns the services defined by the recipe.
         """
         return self.__content['services']
 
+    def get_extended_files(self) -> list[str]:
+        """Returns paths to the files extended by the recipe's services.
+        """
+        extended_files = []
+        for service_data in self.get_services().values():
+            if not isinstance(service_data, dict) or 'extends' not in service_data:
+                continue
+            extends = service_data['extends']
+            if not isinstance(extends, dict) or not isinstance(extends.get('file'), str):
+                continue
+            remote_file_path = self.__get_extended_file_path(extends)
+            if remote_file_path not in extended_files:
+                extended_files.append(remote_file_path)
+        return extended_files
+
     def to_compose(
             self,
             compose_path: str,
@@ -106,10 +163,28 @@ class ComposeRecipe:
     ) -> Compose:
         """Converts recipe into the compose file.
         """
-        compose_dict = self.__to_compose_dict(cleaned)
+        compose_dict = copy.deepcopy(self.resolve().compose)
+        if cleaned:
+            compose_dict = self.__clean_compose(compose_dict)
 
         return Compose(compose_path, compose_dict, resolve_vars_in_string)
 
+    def resolve(self) -> ResolvedRecipe:
+        """Merges the extended services into the recipe. It's done only once, and the result is
+           reused afterward.
+        """
+        if self.__resolved is None:
+            with tracing.span('recipe.resolve', path=self.recipe_path):
+                compose_dict = self.__to_compose_dict()
+                addons: dict[str, tuple[str, ...]] = {}
+                for service_name, service in compose_dict['services'].items():
+                    draky = service.get('draky') if isinstance(service, dict) else None
+                    addons[service_name] =\
+                        tuple(draky.get('addons') or ()) if isinstance(draky, dict) else ()
+                self.__resolved = ResolvedRecipe(compose_dict, MappingProxyType(addons))
+
+        return self.__resolved
+
     def __clean_compose(self, compose: dict) -> dict:
         """Removes draky-specific properties from the service's definition.
         """
@@ -120,7 +195,10 @@ class ComposeRecipe:
 
         return compose
 
-    def __to_compose_dict(self, cleaned: bool = True):
+    def __get_extended_file_path(self, extends: dict) -> str:
+        return os.path.dirname(self.recipe_path) + os.sep + extends['file']
+
+    def __to_compose_dict(self):
         compose_dict = copy.deepcopy(self.__content)
         services = compose_dict['services']
 
@@ -131,51 +209,43 @@ class ComposeRecipe:
         for service_name in services:
             service_data = services[service_name]
 
-            service = None
-
             # Validate the basic structure.
-            if 'extends' in service_data:
-                extends = service_data['extends']
-                remote_file_path = os.path.dirname(self.recipe_path) + os.sep + extends['file']
-
-                remote_file_service = extends['service']
-                if not isinstance(remote_file_service, str):
-                    raise ValueError(
-                        f"Error in the '{service_name}' service. The 'service' value has to be "
-                        f"a string."
-                    )
+            if 'extends' not in service_data:
+                continue
 
-                if remote_file_path not in extended_files:
-                    with open(remote_file_path, "r", encoding='utf8') as f:
-                        extended_files[remote_file_path] = yaml.safe_load(f)
+            extends = service_data['extends']
+            remote_file_path = self.__get_extended_file_path(extends)
 
-                remote_file_dict = extended_files[remote_file_path]
+            remote_file_service = extends['service']
+            if not isinstance(remote_file_service, str):
+                raise ValueError(
+                    f"Error in the '{service_name}' service. The 'service' value has to be "
+                    f"a string."
+                )
 
-                self.__validate_service_in_extended_compose(remote_file_service, remote_file_dict)
+            remote_file_dict = extended_files[remote_file_path]
 
-                if not isinstance(remote_file_dict['services'][remote_file_service], dict):
-                    raise ValueError(
-                        f"Error in the '{service_name}' service. The service"
-                        f"'{remote_file_service}' in the '{remote_file_path}' file has to be a "
-                        f"dictionary."
-                    )
+            self.__validate_service_in_extended_compose(remote_file_service, remote_file_dict)
 
-                del service_data['extends']
-                service = remote_file_dict['services'][remote_file_service] | service_data
-                service = self.__convert_paths_in_service(
-                    service.copy(),
-                    compose_dict,
-                    remote_file_path,
+            if not isinstance(remote_file_dict['services'][remote_file_service], dict):
+                raise ValueError(
+                    f"Error in the '{service_name}' service. The service"
+                    f"'{remote_file_service}' in the '{remote_file_path}' file has to be a "
+                    f"dictionary."
                 )
 
-            if not service:
-                service = service_data
+            del service_data['extends']
+            # Extended files are shared, so the service is copied before its paths are converted.
+            service = copy.deepcopy(remote_file_dict['services'][remote_file_service])\
+                | service_data
+            service = self.__convert_paths_in_service(
+                service,
+                compose_dict,
+                remote_file_path,
+            )
 
             compose_dict['services'][service_name] = service
 
-        if cleaned:
-            return self.__clean_compose(compose_dict)
-
         return compose_dict
 
     def __convert_paths_in_service(
@@ -248,12 +318,12 @@ class ComposeRecipe:
                 extends = service_data['extends']
                 self.__validate_extends(service_name, extends)
 
-                remote_file_path = os.path.dirname(self.recipe_path) + os.sep + extends['file']
-                if not isinstance(remote_file_path, str):
+                if not isinstance(extends['file'], str):
                     raise ValueError(
                         f"Error in the '{service_name}' service. The 'file' value has to be a "
                         f"string."
                     )
+                remote_file_path = self.__get_extended_file_path(extends)
 
                 if 'service' not in extends:
                     raise ValueError(
@@ -262,8 +332,7 @@ class ComposeRecipe:
                     )
 
                 if remote_file_path not in extended_files:
-                    with open(remote_file_path, "r", encoding='utf8') as f:
-                        extended_files[remote_file_path] = yaml.safe_load(f)
+                    extended_files[remote_file_path] = self.__extended_files.get(remote_file_path)
 
         return extended_files
 
@@ -277,7 +346,8 @@ class ComposeRecipe:
                 if top_level_key == 'services':
                     continue
 
-                top_level_value = extended_file[top_level_key]
+                # Extended files are shared, so their values can't end up in the compose file.
+                top_level_value = copy.deepcopy(extended_file[top_level_key])
                 if top_level_key not in compose:
                     compose[top_level_key] = top_level_value
                 else:
@@ -382,10 +452,11 @@ class ComposeManager:
           Returns a dictionary representing the final compose.
         """
 
-        return recipe.to_compose(compose_path, self.config.resolve_vars_in_string)
+        with tracing.span('compose.create', path=compose_path):
+            return recipe.to_compose(compose_path, self.config.resolve_vars_in_string)
 
     def save(self, compose: Compose):
         """Save the compose file to disk.
         """
-        with open(compose.get_path(), 'w', encoding='utf8') as f:
-            f.write(compose.to_string())
+        with tracing.span('compose.write', path=compose.get_path()) as span_args:
+            span_args['changed'] = write_file_if_changed(compose.get_path(), compose.to_string())
@@ -1,15 +1,18 @@
 """Classes storing different types of configuration, and helper functions related to them.
 """
+import hashlib
 import os
 import re
 import sys
 from dataclasses import dataclass
 from enum import Enum
 from graphlib import TopologicalSorter
-from typing import Union
+from types import MappingProxyType
+from typing import Iterable, Mapping, Union
 
-import yaml
-from colorama import Fore, Style
+from dk import tracing, yaml_io
+from dk.cache import PersistentCache
+from dk.scanner import ProjectScan, scan_project
 
 
 class ConfigType(Enum):
@@ -24,6 +27,8 @@ class ConfigType(Enum):
 class Config:
     """Dataclass storing information about a single config file.
     """
+    __slots__ = ('id', 'type', 'variables', 'dependencies', 'environments', 'path', 'dirpath')
+
     def __init__(self, config_type: ConfigType, content: dict, path: str):
         self.id: str = content['id'] if 'id' in content else path
         self.type: ConfigType = config_type
@@ -38,6 +43,8 @@ class Config:
 class BasicConfig(Config):
     """Dataclass storing the basic config.
     """
+    __slots__ = ()
+
     def __init__(self, content: dict, path: str):
         super().__init__(ConfigType.BASIC, content, path)
 
@@ -46,6 +53,8 @@ class BasicConfig(Config):
 class AddonConfig(Config):
     """Dataclass storing information about the addons.
     """
+    __slots__ = ()
+
     def __init__(self, content: dict, path: str):
         super().__init__(ConfigType.ADDON, content, path)
         self.id = content['id']
@@ -55,6 +64,8 @@ class AddonConfig(Config):
 class TemplateConfig(Config):
     """Dataclass storing information about the templates.
     """
+    __slots__ = ()
+
     def __init__(self, content: dict, path: str):
         super().__init__(ConfigType.TEMPLATE, content, path)
         self.id = content['id']
@@ -63,29 +74,78 @@ class TemplateConfig(Config):
 Configs = Union[BasicConfig, AddonConfig, TemplateConfig]
 
 
-def fetch_configs(config_path) -> list[Configs]:
+def create_config(content: dict, file_path: str) -> Configs:
+    """Creates the config object of the type matching the given config file.
+    """
+    path, filename = os.path.split(file_path)
+    trimmed_path = re.sub(r'^.*?\.draky', '', path)
+    config_path = f"{trimmed_path}{os.sep}{filename}".lstrip(os.sep)
+
+    if filename.endswith('addon.dk.yml'):
+        return AddonConfig(content, config_path)
+    if filename.endswith('template.dk.yml'):
+        return TemplateConfig(content, config_path)
+    return BasicConfig(content, config_path)
+
+
+def fetch_configs(
+        config_path,
+        cache: PersistentCache | None = None,
+        scan: ProjectScan | None = None,
+) -> list[Configs]:
     """Returns a list of config objects. If no "env" is provided, then only universal configs are
        returned.
+       If the cache is given, only the files that changed since it has been stored are parsed,
+       and if none did, the configs are not sorted again.
+       Config files are taken from the given scan of the project, or the project is scanned if
+       none is given.
     """
-    configs: list[Configs] = []
-    for path, _, files in os.walk(config_path):
-        for filename in files:
-            if not filename.endswith('dk.yml'):
-                continue
-            with open(f"{path}{os.sep}{filename}", 'r', encoding='utf8') as stream:
-                content = yaml.safe_load(stream)
-                trimmed_path = re.sub(r'^.*?\.draky', '', path)
-                config_path = f"{trimmed_path}{os.sep}{filename}".lstrip(os.sep)
-
-                if filename.endswith('addon.dk.yml'):
-                    config = AddonConfig(content, config_path)
-                elif filename.endswith('template.dk.yml'):
-                    config = TemplateConfig(content, config_path)
-                else:
-                    config = BasicConfig(content, config_path)
-            configs.append(config)
-
-    sort_configs_by_dependencies(configs)
+    if scan is None:
+        scan = scan_project(config_path)
+    cached: dict = cache.load() if cache else {}
+    cached_files: dict = cached.get('files', {})
+
+    # Version metadata of the config files.
+    keys: dict[str, list[int]] = {}
+    with tracing.span('configs.discover', path=config_path) as span_args:
+        for file_path in scan.configs:
+            stat = os.stat(file_path)
+            keys[file_path] = [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+        span_args['files'] = len(keys)
+
+    # Parsed config files, with the metadata identifying their version.
+    files: dict[str, dict] = {}
+    changed = False
+    with tracing.span('configs.parse') as span_args:
+        for file_path, key in keys.items():
+            entry = cached_files.get(file_path)
+            if entry is None or entry['key'] != key:
+                with open(file_path, 'r', encoding='utf8') as stream:
+                    entry = {'key': key, 'content': yaml_io.load(stream)}
+                changed = True
+            files[file_path] = entry
+        span_args['changed'] = changed
+
+    listing = hashlib.sha1('\n'.join(files).encode('utf8')).hexdigest()
+    configs_by_path: dict[str, Configs] = {}
+    for file_path, entry in files.items():
+        config = create_config(entry['content'], file_path)
+        configs_by_path[config.path] = config
+
+    order = cached.get('order')
+    if not changed and listing == cached.get('listing') and order is not None:
+        return [configs_by_path[path] for path in order]
+
+    configs: list[Configs] = list(configs_by_path.values())
+    with tracing.span('configs.sort', configs=len(configs)):
+        sort_configs_by_dependencies(configs)
+
+    if cache:
+        cache.save({
+            'listing': listing,
+            'files': files,
+            'order': [config.path for config in configs],
+        })
 
     return configs
 
@@ -93,14 +153,17 @@ def fetch_configs(config_path) -> list[Configs]:
 def sort_configs_by_dependencies(configs: list[Configs]):
     """Sorts a list of configs by dependencies.
     """
-    ids: list[str] = [item.id for item in configs]
+    configs_by_id: dict[str, Configs] = {}
+    for config in configs:
+        configs_by_id.setdefault(config.id, config)
     unmet_dependencies: list[tuple[str, str]] = []
     for config in filter(lambda c: c.dependencies, configs):
-        unmet_dependencies_list = filter(lambda d: d not in ids, config.dependencies)
+        unmet_dependencies_list = filter(lambda d: d not in configs_by_id, config.dependencies)
         for dep in unmet_dependencies_list:
             unmet_dependencies.append((dep, config.path))
 
     if unmet_dependencies:
+        from colorama import Fore, Style  # pylint: disable=import-outside-toplevel
         print(f"{Fore.RED}[ERROR] The following dependencies are unmet:", file=sys.stderr)
         for dep in unmet_dependencies:
             print(f"'{dep[0]}' in '{dep[1]}'", file=sys.stderr)
@@ -113,13 +176,72 @@ def sort_configs_by_dependencies(configs: list[Configs]):
         depmap[config.id] = config.dependencies
 
     sorter = TopologicalSorter(depmap)
-    configs_backup = configs.copy()
     configs.clear()
     for config_id in sorter.static_order():
-        config = next((x for x in configs_backup if x.id == config_id), None)
+        config = configs_by_id.get(config_id)
         if not config:
             raise RuntimeError("Could not find the config object. "
                                "The logic of sorting configs by dependencies must be flawed.")
         configs.append(config)
 
     configs.sort(key=lambda c: len(c.environments))
+
+
+@dataclass(frozen=True)
+class ConfigView:
+    """Dataclass storing a subset of configs, in the dependency order, together with their lookup
+       tables.
+    """
+    configs: tuple[Configs, ...]
+    by_id: Mapping[str, Configs]
+    by_type: Mapping[ConfigType, tuple[Configs, ...]]
+
+    @staticmethod
+    def create(configs: Iterable[Configs]) -> 'ConfigView':
+        """Creates the view of the given configs.
+        """
+        configs = tuple(configs)
+        by_id: dict[str, Configs] = {}
+        by_type: dict[ConfigType, list[Configs]] = {}
+        for config in configs:
+            by_id.setdefault(config.id, config)
+            by_type.setdefault(config.type, []).append(config)
+        return ConfigView(
+            configs,
+            MappingProxyType(by_id),
+            MappingProxyType({k: tuple(v) for k, v in by_type.items()}),
+        )
+
+
+class ConfigIndex:
+    """Index of the configs sorted by dependencies. Views of the configs available in every
+       environment are computed once, when the index is built.
+    """
+
+    def __init__(self, configs: list[Configs]):
+        self.all: ConfigView = ConfigView.create(configs)
+        self.universal: ConfigView = ConfigView.create(c for c in configs if not c.environments)
+        self.__env_views: dict[str, ConfigView] = {}
+        self.__env_specific_views: dict[str, ConfigView] = {}
+        environments = {env for config in configs for env in config.environments}
+        for env in environments:
+            self.__env_views[env] = ConfigView.create(
+                c for c in configs if not c.environments or env in c.environments
+            )
+            self.__env_specific_views[env] = ConfigView.create(
+                c for c in configs if env in c.environments
+            )
+
+    def get_view(self, env: str) -> ConfigView:
+        """Returns the view of the universal configs, and the ones specific to the given
+           environment.
+        """
+        return self.__env_views.get(env, self.universal)
+
+    def get_env_specific_view(self, env: str) -> ConfigView:
+        """Returns the view of the configs specific to the given environment.
+        """
+        return self.__env_specific_views.get(env, EMPTY_VIEW)
+
+
+EMPTY_VIEW = ConfigView.create(())
@@ -0,0 +1,75 @@
+"""Thin client of the config server.
+
+This module is imported before anything else when the internal commands are run, so it should stay
+lightweight and depend only on the standard library.
+"""
+import json
+import os
+import socket
+import sys
+
+from dk.tracing import TRACE_ENV_NAME
+
+DRAKY_PREFIX = 'DRAKY_'
+
+SOCKET_PATH_ENV_NAME = 'DRAKY_CONFIG_SERVER_SOCKET'
+SOCKET_PATH_DEFAULT = '/tmp/dk-config-server.sock'
+
+# Variables configuring the core's process itself. They share the prefix with the project's
+# variables, but they must not change the project's configuration.
+INTERNAL_ENV_NAMES = (SOCKET_PATH_ENV_NAME, TRACE_ENV_NAME)
+
+
+def get_socket_path() -> str:
+    """Returns the path to the socket the config server listens on.
+    """
+    return os.environ.get(SOCKET_PATH_ENV_NAME, SOCKET_PATH_DEFAULT)
+
+
+class ConfigClient:
+    """Forwards the internal commands to the config server.
+    """
+
+    def __init__(self, socket_path: str = None, timeout: float = 60.0):
+        self.socket_path: str = socket_path if socket_path else get_socket_path()
+        self.timeout: float = timeout
+
+    def query(self, args: list[str]) -> dict | None:
+        """Sends the internal command to the server and returns its reply. Returns None if the
+           server is not available.
+        """
+        if not os.path.exists(self.socket_path):
+            return None
+
+        request = {
+            'args': args,
+            'env': {k: v for k, v in os.environ.items() if k.startswith(DRAKY_PREFIX)},
+        }
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                sock.sendall(json.dumps(request).encode('utf8') + b'\n')
+                sock.shutdown(socket.SHUT_WR)
+                chunks = []
+                while chunk := sock.recv(65536):
+                    chunks.append(chunk)
+        except OSError:
+            return None
+
+        try:
+            return json.loads(b''.join(chunks))
+        except ValueError:
+            return None
+
+    def forward(self, args: list[str]) -> int | None:
+        """Runs the internal command through the server, and prints its output. Returns the exit
+           code, or None if the command couldn't be handled by the server.
+        """
+        reply = self.query(args)
+        if reply is None:
+            return None
+
+        sys.stdout.write(reply['stdout'])
+        sys.stderr.write(reply['stderr'])
+        return reply['exit_code']
@@ -1,14 +1,23 @@
 """Configuration manager.
 """
+import copy
 import os
-import re
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Mapping
 
-import yaml
+from dk import tracing, yaml_io
+from dk.cache import get_project_cache
+from dk.config import Config, AddonConfig, ConfigIndex, ConfigType, ConfigView, fetch_configs
+# VariableNotExists is re-exported, as it used to be defined here.
+from dk.interpolation import Interpolator, VariableNotExists  # pylint: disable=unused-import
+from dk.scanner import ProjectScan, scan_project
+from dk.utils import vars_dict_from_configs, vars_layers_from_configs, get_env_vars_dict
+from dk.variables import BUILTIN_ORIGIN, ENVIRONMENT_ORIGIN
 
-from dk.config import Config, AddonConfig, fetch_configs
-from dk.utils import vars_dict_from_configs, get_env_vars_dict
+
+# The environment used when neither the configuration nor the DRAKY_ENV variable sets it.
+DEFAULT_ENV = 'dev'
 
 
 @dataclass
@@ -19,13 +28,6 @@ class ProjectPaths:
     commands: str
 
 
-class VariableNotExists(ValueError):
-    """This is a helper exception to indicate that variable doesn't exist when requested.
-    """
-    def __init__(self, name):
-        super().__init__(f"Variable {name} doesn't exist.")
-
-
 class ProjectConfigInit:
     """Class representing the project's configuration when it's during the initialization phase.
     """
@@ -80,35 +82,62 @@ class ProjectConfigFull(ProjectConfigInit):
 
         core_config_file_path = ProjectConfigFull.get_core_config_path()
 
-        with core_config_file_path.open(encoding='utf8') as stream:
-            core_data = yaml.safe_load(stream)
+        core_data = yaml_io.load_file(str(core_config_file_path))
 
         core_variables = core_data['variables']
         project_id = core_variables['DRAKY_PROJECT_ID']
 
         self.id: str = project_id
 
-        all_configs = fetch_configs(self.config_path)
+        # The project is scanned once, and the snapshot is shared by everything that needs to
+        # know the project's files.
+        self.scan: ProjectScan = scan_project(self.config_path)
+        all_configs = fetch_configs(
+            self.config_path,
+            get_project_cache('configs', self.config_path),
+            self.scan,
+        )
 
-        universal_configs = [c for c in all_configs if not c.environments]
-        universal_variables = vars_dict_from_configs(universal_configs)
+        self.index: ConfigIndex = ConfigIndex(all_configs)
+        universal_variables = vars_dict_from_configs(self.index.universal.configs)
 
         env: str = universal_variables['DRAKY_ENV']\
-            if 'DRAKY_ENV' in universal_variables else "dev"
+            if 'DRAKY_ENV' in universal_variables else DEFAULT_ENV
+
+        self.__set_env(env)
 
-        self.configs: list[Config] = \
-            [c for c in all_configs if not c.environments or env in c.environments]
+    def with_env(self, env: str) -> 'ProjectConfigFull':
+        """Returns the copy of the configuration, switched to the given environment. Configs are
+           not fetched again, only the variables of the environment are merged.
+        """
+        project = copy.copy(self)
+        # pylint: disable-next=protected-access
+        project.__set_env(env, os.environ | {'DRAKY_ENV': env})
+        return project
+
+    def __set_env(self, env: str, environment: Mapping[str, str] | None = None) -> None:
+        """Sets the current environment, and the variables available in it. Variables are
+           resolved against the given environment variables, or the process' ones if none are
+           given.
+        """
+        self.view: ConfigView = self.index.get_view(env)
+        configs: list[Config] = list(self.view.configs)
 
         self.env: str = env
 
         # Set project vars.
-        self.vars: dict[str, str] = vars_dict_from_configs(self.configs)
+        with tracing.span('variables.merge', configs=len(configs), env=env):
+            variables = vars_layers_from_configs(configs, environment=environment)
+        self.vars: dict[str, str] = variables.values
+        self.vars_origins: dict[str, str] = variables.origins
 
         # Set helper env variables.
         self.vars['DRAKY_PATH_ADDONS'] = f"{self.config_path}/addons"
+        self.vars_origins['DRAKY_PATH_ADDONS'] = BUILTIN_ORIGIN
 
         # Make sure that DRAKY_ENV has the up to date value.
         self.vars['DRAKY_ENV'] = self.env
+        self.vars_origins['DRAKY_ENV'] = BUILTIN_ORIGIN
 
     @staticmethod
     def dependencies_are_met() -> bool:
@@ -121,7 +150,7 @@ class ProjectConfigFull(ProjectConfigInit):
         if not core_config_file_path.is_file():
             return False
 
-        core_config = yaml.safe_load(core_config_file_path.read_text(encoding='utf8'))
+        core_config = yaml_io.load_file(str(core_config_file_path))
         if 'variables' not in core_config:
             raise ValueError("Required 'variables' section is missing in core.dk.yml.")
 
@@ -166,6 +195,7 @@ class ConfigManager:
             raise ValueError("Required DRAKY_PROJECT_CONFIG_ROOT environment variable is missing.")
 
         self.global_config_path: str = os.environ['DRAKY_GLOBAL_CONFIG_ROOT']
+        self.__interpolator: tuple[dict, Interpolator] | None = None
 
 
     def get_project_id(self) -> str|None:
@@ -182,6 +212,43 @@ class ConfigManager:
 
         return self.project.env
 
+    def get_default_env(self) -> str:
+        """Returns the environment the project uses when the DRAKY_ENV variable is not set,
+           regardless of whether it's set now.
+        """
+        self.__ensure_project_context_full()
+        environment = {k: v for k, v in os.environ.items() if k != 'DRAKY_ENV'}
+        variables = vars_layers_from_configs(
+            self.project.index.universal.configs, environment=environment
+        ).values
+        return variables.get('DRAKY_ENV', DEFAULT_ENV)
+
+    def for_env(self, env: str) -> 'ConfigManager':
+        """Returns the config manager of the given environment of the current project. The parsed
+           configs are shared with this manager, so switching environments is cheap.
+        """
+        self.__ensure_project_context_full()
+        config_manager = copy.copy(self)
+        # The interpolator is bound to the variables, so it's not reused for the new ones.
+        config_manager.project = self.project.with_env(env)
+        return config_manager
+
+    def get_project_scan(self) -> ProjectScan:
+        """Returns the snapshot of the project's files, taken when the configuration was loaded.
+        """
+        self.__ensure_project_context_full()
+        return self.project.scan
+
+    def get_project_envs(self) -> list[str]:
+        """Returns the names of all environments of the current project.
+        """
+        if self.is_project_context_full():
+            return list(self.project.scan.environments)
+        environments_path = self.get_project_paths().environments
+        if not os.path.isdir(environments_path):
+            return []
+        return sorted(e.name for e in os.scandir(environments_path) if e.is_dir())
+
     def get_project_env_path(self) -> str:
         """Returns the path to the current environment directory.
         """
@@ -191,24 +258,41 @@ class ConfigManager:
         """Returns configuration objects representing addons.
         """
         self.__ensure_project_context_full()
-        return list(filter(lambda config: isinstance(config, AddonConfig), self.project.configs))
+        return list(self.project.view.by_type.get(ConfigType.ADDON, ()))
 
+    def get_addon(self, addon_id: str) -> AddonConfig | None:
+        """Returns the configuration object representing the addon with the given id, or None if
+           there is no such addon.
+        """
+        self.__ensure_project_context_full()
+        config = self.project.view.by_id.get(addon_id)
+        return config if isinstance(config, AddonConfig) else None
 
     def resolve_vars_in_string(self, string: str) -> str:
         """Replaces vars references with their values in the string.
         """
-        found_vars = re.findall(r"\${([A-Z_]+)}", string)
-        existing_vars = self.get_vars()
-        for var in found_vars:
-            if var not in existing_vars:
-                raise VariableNotExists(var)
-            string = string.replace(f"${{{var}}}", existing_vars[var])
+        variables = self.get_vars()
+        # The interpolator memoizes resolved variables, so it's reused as long as variables are
+        # the same.
+        if self.__interpolator is None or self.__interpolator[0] is not variables:
+            self.__interpolator = (variables, Interpolator(variables))
 
-        return string
+        return self.__interpolator[1].interpolate(string)
 
-    def filter_configs_by_environment(self, configs: list[Config]) -> list[Config]:
-        """Filter configs by environment.
+    def is_commands_mount_enabled(self) -> bool:
+        """Tells if directories with the service commands should be mounted into the services, so
+           the commands can run in place.
         """
+        return self.get_vars().get('DRAKY_COMMANDS_MOUNT', '').lower() in ('1', 'true', 'yes')
+
+    def filter_configs_by_environment(self, configs: list[Config] | None = None) -> list[Config]:
+        """Filter configs by environment. If no configs are given, the project's configs specific
+           to the current environment are returned.
+        """
+        if configs is None:
+            self.__ensure_project_context_full()
+            return list(self.project.index.get_env_specific_view(self.project.env).configs)
+
         return [x for x in configs if self.get_project_env() in x.environments]
 
     def is_project_context_full(self) -> bool:
@@ -249,6 +333,15 @@ class ConfigManager:
 
         return self.project.vars
 
+    def get_vars_origins(self) -> dict[str, str]:
+        """Returns a dictionary telling where the value of every variable comes from. It's either
+           the path of the config file, or the origin of variables set by draky itself.
+        """
+        if not self.is_project_context_full():
+            return {name: ENVIRONMENT_ORIGIN for name in self.vars}
+
+        return self.project.vars_origins
+
     def __ensure_project_context_full(self):
         if not self.is_project_context_full():
             raise RuntimeError("Not in the full project context.")
@@ -0,0 +1,167 @@
+"""Resident config server. It's started together with the core container and keeps the parsed
+project's configuration in memory, so the internal commands don't need to load it on every call.
+"""
+import contextlib
+import io
+import json
+import os
+import socketserver
+import sys
+from dataclasses import dataclass
+
+from dk.config_client import DRAKY_PREFIX, INTERNAL_ENV_NAMES, get_socket_path
+from dk.config_manager import ConfigManager
+from dk.custom_commands_provider import CustomCommandsProvider
+from dk.internal_commands_provider import InternalCommandsProvider
+from dk.scanner import IGNORE_FILENAME, ProjectScanner
+
+# How many different environments (sets of DRAKY_* variables) are kept in memory at once.
+STATES_LIMIT = 8
+
+
+def project_fingerprint(config_path: str | None) -> tuple:
+    """Returns a value that changes whenever any file that the project's configuration is built
+       from changes.
+    """
+    if not config_path or not os.path.isdir(config_path):
+        return ()
+
+    fingerprint = []
+    for path, _, files in ProjectScanner(config_path).walk():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        fingerprint.append((path, stat.st_mtime_ns))
+        for filename in files:
+            if (not filename.endswith('dk.yml') and '.dk.sh' not in filename
+                    and filename != IGNORE_FILENAME):
+                continue
+            file_path = f"{path}{os.sep}{filename}"
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            fingerprint.append((file_path, stat.st_mtime_ns, stat.st_size, stat.st_ino))
+    return tuple(fingerprint)
+
+
+@contextlib.contextmanager
+def draky_environment(environment: dict[str, str]):
+    """Temporarily replaces draky-related environment variables with the given ones.
+    """
+    backup = os.environ.copy()
+    for key in [k for k in os.environ if k.startswith(DRAKY_PREFIX)]:
+        del os.environ[key]
+    os.environ.update(environment)
+    try:
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(backup)
+
+
+@dataclass
+class ProjectState:
+    """Dataclass storing the loaded project's state.
+    """
+    fingerprint: tuple
+    internal_commands_provider: InternalCommandsProvider
+
+
+class ConfigRequestHandler(socketserver.StreamRequestHandler):
+    """Handles a single request to the config server.
+    """
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        reply = self.server.answer(request['args'], request['env'])
+        self.wfile.write(json.dumps(reply).encode('utf8'))
+
+
+class ConfigServer(socketserver.UnixStreamServer):
+    """Server answering the internal commands with the project's state kept in memory. The state is
+       reloaded whenever the configuration files change.
+    """
+
+    def __init__(self, socket_path: str):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, ConfigRequestHandler)
+        # The server may be started by a different user than the one running the commands.
+        os.chmod(socket_path, 0o666)
+        self.__states: dict[tuple, ProjectState] = {}
+
+    def answer(self, args: list[str], environment: dict[str, str]) -> dict:
+        """Runs the internal command in the given environment and returns its output.
+        """
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        exit_code = 0
+        with draky_environment(environment),\
+                contextlib.redirect_stdout(stdout),\
+                contextlib.redirect_stderr(stderr):
+            try:
+                state = self.__get_state(environment)
+                state.internal_commands_provider.handle_internal_commands(args)
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else 0 if e.code is None else 1
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print(f"{type(e).__name__}: {e}", file=sys.stderr)
+                exit_code = 1
+
+        return {
+            'exit_code': exit_code,
+            'stdout': stdout.getvalue(),
+            'stderr': stderr.getvalue(),
+        }
+
+    def __get_state(self, environment: dict[str, str]) -> ProjectState:
+        # Variables of the core's process don't affect the configuration.
+        key = tuple(sorted(
+            (k, v) for k, v in environment.items() if k not in INTERNAL_ENV_NAMES
+        ))
+        fingerprint = project_fingerprint(environment.get('DRAKY_PROJECT_CONFIG_ROOT'))
+        state = self.__states.get(key)
+        if state and state.fingerprint == fingerprint:
+            return state
+
+        config_manager = ConfigManager()
+        state = ProjectState(
+            fingerprint=fingerprint,
+            internal_commands_provider=InternalCommandsProvider(
+                config_manager,
+                CustomCommandsProvider(config_manager),
+            ),
+        )
+        self.__states.pop(key, None)
+        if len(self.__states) >= STATES_LIMIT:
+            del self.__states[next(iter(self.__states))]
+        self.__states[key] = state
+        return state
+
+
+def drop_privileges() -> None:
+    """If the server has been started by root, continue as the host's user, so files created by
+       the server are accessible on the host.
+    """
+    if os.getuid() != 0 or 'DRAKY_HOST_UID' not in os.environ:
+        return
+    os.setgroups([])
+    os.setgid(int(os.environ.get('DRAKY_HOST_GID', os.environ['DRAKY_HOST_UID'])))
+    os.setuid(int(os.environ['DRAKY_HOST_UID']))
+
+
+def main() -> None:
+    """Starts the config server.
+    """
+    with ConfigServer(get_socket_path()) as server:
+        drop_privileges()
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,18 @@
 """ Provider of the "core" commands.
 """
+import math
+import sys
+import time
 from typing import Callable
 
-from dk.command import CallableCommand
+from colorama import Fore, Style
+
+from dk.command import CallableCommand, Flag
 from dk.command_provider import CallableCommandsProvider
+from dk.stats import get_stats_store, print_summaries, summarize
+
+# Number of days covered by the statistics, by default.
+STATS_DAYS_DEFAULT = 30
 
 
 class CoreCommandsProvider(CallableCommandsProvider):
@@ -21,6 +30,22 @@ class CoreCommandsProvider(CallableCommandsProvider):
             )
         )
 
+        self.days_flag: str = '--days'
+
+        self._add_command(
+            CallableCommand(
+                name='stats',
+                help='Show statistics of the wall time of recent commands.',
+                callback=self.__stats,
+                flags=[
+                    Flag(
+                        name=self.days_flag,
+                        help=f"Number of days to cover. Defaults to {STATS_DAYS_DEFAULT}.",
+                    ),
+                ],
+            )
+        )
+
         self._add_command(
             CallableCommand(
                 name='destroy',
@@ -48,3 +73,29 @@ class CoreCommandsProvider(CallableCommandsProvider):
     def __update_draky(self, _reminder_args: list[str]):
         #@todo
         print("To be implemented.")
+
+    def __stats(self, reminder_args: list[str]):
+        """Prints p50, p95 and max wall times of the commands run in the given number of days,
+           per command, environment and draky version.
+        """
+        days_value = self._get_option_value(reminder_args, self.days_flag) or STATS_DAYS_DEFAULT
+        try:
+            days = float(days_value)
+        except ValueError:
+            days = math.nan
+        if not 0 < days < math.inf:
+            print(
+                f"{Fore.RED}The number of days must be a positive number, '{days_value}' given."
+                f"{Style.RESET_ALL}",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        store = get_stats_store()
+        records = store.load(time.time() - days * 86400) if store else []
+        if not records:
+            print(f"No commands have been recorded in the last {days:g} days.")
+            return
+
+        for title, key in [('command', 'command'), ('environment', 'env'), ('version', 'version')]:
+            print_summaries(title, summarize(records, key))
+            print()
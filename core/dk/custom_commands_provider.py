@@ -1,91 +1,138 @@
 """Custom commands provider.
 """
 
-import yaml
-
+from dk.cache import get_project_cache
+from dk.command_index import CommandIndex
 from dk.config_manager import ConfigManager
-from dk.utils import find_files_weighted_by_path
 from dk.command import ServiceCommand
 
 
+def parse_command_filename(filename: str) -> tuple[str, str | None] | None:
+    """Returns the command's name and service encoded in the command's filename, or None if the
+       filename doesn't follow the naming scheme.
+    """
+    filename_split = list(reversed(filename.split('.')))
+    filename_sections_count = len(filename_split)
+    if filename_sections_count < 3 or filename_sections_count > 4:
+        return None
+
+    command_name = filename_split[filename_sections_count - 1]
+    service = filename_split[filename_sections_count - 2] if filename_sections_count == 4 \
+        else None
+    return command_name, service
+
+
 class CustomCommandsProvider:
-    """Provider of the custom commands.
+    """Provider of the custom commands. Commands are gathered once per process, and only parsed
+       when needed.
     """
 
     def __init__(self, config_manager: ConfigManager):
         self.config_manager: ConfigManager = config_manager
+        self.__index: CommandIndex | None = None
+        # The (name, path, filename, service) tuples of the command files, ordered by priority.
+        self.__command_files: list[tuple[str, str, str, str | None]] | None = None
+        self.__command_files_by_name: dict[str, list[tuple[str, str, str, str | None]]] = {}
+        self.__commands: dict[str, ServiceCommand | None] = {}
+        self.__all_commands: list[ServiceCommand] | None = None
 
     def supports(self, command_name: str) -> bool:
         """Returns the information if given command is supported.
         """
-        custom_commands = self.__gather_custom_commands()
-        for command in custom_commands:
-            if command.name == command_name:
-                return True
-        return False
+        return self.__find_command(command_name) is not None
 
     def get_commands(self) -> list[ServiceCommand]:
         """Returns the supported commands.
         """
-        return self.__gather_custom_commands()
+        if self.__all_commands is None:
+            self.__all_commands = []
+            for command_file in self.__get_command_files():
+                command = self.__create_command(*command_file)
+                if command:
+                    self.__all_commands.append(command)
+            self.__save_index()
+        return self.__all_commands
 
     def get_command(self, command_name: str) -> ServiceCommand:
         """Returns the command.
         """
-        commands = self.__gather_custom_commands()
-        for command in commands:
-            if command.name == command_name:
-                return command
-        raise ValueError("Unsupported command.")
-
-    def __gather_custom_commands(self) -> list[ServiceCommand]:
+        command = self.__find_command(command_name)
+        if command is None:
+            raise ValueError("Unsupported command.")
+        return command
+
+    def __find_command(self, command_name: str) -> ServiceCommand | None:
+        if command_name not in self.__commands:
+            self.__get_command_files()
+            command = None
+            for command_file in self.__command_files_by_name.get(command_name, []):
+                command = self.__create_command(*command_file)
+                if command:
+                    break
+            self.__commands[command_name] = command
+            self.__save_index()
+        return self.__commands[command_name]
+
+    def __get_command_files(self) -> list[tuple[str, str, str, str | None]]:
+        if self.__command_files is not None:
+            return self.__command_files
+
+        self.__command_files = []
         if not self.config_manager.is_project_context_full():
-            return []
+            return self.__command_files
 
-        command_files = find_files_weighted_by_path("*.dk.sh", {
+        project_config_path = self.config_manager.get_project_config_path()
+        self.__index = CommandIndex(get_project_cache('commands', project_config_path))
+        command_files = self.__index.find_command_files(self.config_manager.get_project_scan(), {
             self.config_manager.get_project_paths().commands: 10,
-        }, self.config_manager.get_project_config_path())
-
-        custom_commands = []
+        })
         for path, filename in command_files:
-            filename_split = list(reversed(filename.split('.')))
-            filename_sections_count = len(filename_split)
-            if filename_sections_count < 3 or filename_sections_count > 4:
+            parsed = parse_command_filename(filename)
+            if not parsed:
                 continue
-
-            command_name = filename_split[filename_sections_count - 1]
-            service = filename_split[filename_sections_count - 2] if filename_sections_count == 4 \
-                else None
-            full_path = path + '/' + filename
-
-            # Find yaml companion.
-            help_text = ''
-            user: str = '0'
-            environments = []
-            try:
-                with open(full_path + ".yml", "r", encoding='utf8') as stream:
-                    yaml_companion = yaml.safe_load(stream)
-                    if 'help' in yaml_companion:
-                        help_text = str(yaml_companion['help'])
-                    if 'user' in yaml_companion:
-                        user = str(yaml_companion['user'])
-                    if 'environments' in yaml_companion:
-                        environments = yaml_companion['environments']
-            except (IOError, yaml.YAMLError):
-                pass
-
-            if environments:
-                if self.config_manager.get_project_env() not in environments:
-                    continue
-
-            custom_commands.append(
-                ServiceCommand(
-                    name=command_name,
-                    help=help_text,
-                    service=service,
-                    cmd=full_path,
-                    user=user
-                )
-            )
-
-        return custom_commands
+            command_file = (parsed[0], path, filename, parsed[1])
+            self.__command_files.append(command_file)
+            self.__command_files_by_name.setdefault(parsed[0], []).append(command_file)
+
+        return self.__command_files
+
+    def __save_index(self) -> None:
+        if self.__index:
+            self.__index.save()
+
+    def __create_command(
+            self,
+            command_name: str,
+            path: str,
+            filename: str,
+            service: str | None,
+    ) -> ServiceCommand | None:
+        """Creates the command from its file. Returns None if the command is not available in
+           the current environment.
+        """
+        full_path = path + '/' + filename
+
+        # Find yaml companion.
+        help_text = ''
+        user: str = '0'
+        environments = []
+        if self.__index.has_companion(path, filename):
+            yaml_companion = self.__index.load_companion(full_path)
+            if 'help' in yaml_companion:
+                help_text = str(yaml_companion['help'])
+            if 'user' in yaml_companion:
+                user = str(yaml_companion['user'])
+            if 'environments' in yaml_companion:
+                environments = yaml_companion['environments']
+
+        if environments:
+            if self.config_manager.get_project_env() not in environments:
+                return None
+
+        return ServiceCommand(
+            name=command_name,
+            help=help_text,
+            service=service,
+            cmd=full_path,
+            user=user
+        )
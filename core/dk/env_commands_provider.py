@@ -1,12 +1,23 @@
 """ Provider of the "env" commands.
 """
 
+import sys
 from typing import Callable
 
+from colorama import Fore, Style
+
 from dk.command import CallableCommand, Flag
 from dk.command_provider import CallableCommandsProvider
 from dk.config_manager import ConfigManager
-from dk.process_executor import ProcessExecutor
+from dk.custom_commands_provider import CustomCommandsProvider
+from dk.process_executor import DEFAULT_CONCURRENCY, ProcessExecutor
+
+WATCH_FLAG = '--watch'
+WATCH_UP_FLAG = '--up'
+WATCH_POLL_FLAG = '--poll'
+SERVICES_FLAG = '--services'
+CONCURRENCY_FLAG = '--concurrency'
+
 
 class EnvCommandsProvider(CallableCommandsProvider):
     """This class handles environment commands.
@@ -17,10 +28,14 @@ class EnvCommandsProvider(CallableCommandsProvider):
             process_executor: ProcessExecutor,
             display_help_callback: Callable,
             config_manager: ConfigManager,
+            build_callback: Callable | None = None,
     ):
         super().__init__(display_help_callback)
         self.process_executor: ProcessExecutor = process_executor
         self.config_manager: ConfigManager = config_manager
+        # Called with the process executor after the environment has been built, also by the
+        # watch mode, which may replace the executor.
+        self.build_callback: Callable | None = build_callback
 
         self._add_command(
             CallableCommand(
@@ -34,6 +49,8 @@ class EnvCommandsProvider(CallableCommandsProvider):
             return
 
         self.substitute_variables_flag: str = '-s'
+        self.force_flag: str = '--force'
+        self.envs_flag: str = '--envs'
 
         self._add_command(
             CallableCommand(
@@ -46,7 +63,17 @@ class EnvCommandsProvider(CallableCommandsProvider):
                         help='If the compose file is being build from the recipe, it determines if '
                              'environmental variables should be substituted in the resulting file.',
                         action='store_true',
-                    )
+                    ),
+                    Flag(
+                        name=self.force_flag,
+                        help='Build the environment\'s definition even if nothing has changed.',
+                        action='store_true',
+                    ),
+                    Flag(
+                        name=self.envs_flag,
+                        help='Comma-separated list of environments to start, instead of the '
+                             'current one. They are started concurrently.',
+                    ),
                 ]
             )
         )
@@ -77,11 +104,68 @@ class EnvCommandsProvider(CallableCommandsProvider):
                         name=self.substitute_variables_flag,
                         help='Substitute variables with their values.',
                         action='store_true',
-                    )
+                    ),
+                    Flag(
+                        name=self.force_flag,
+                        help='Build even if none of the inputs has changed since the previous '
+                             'build. Useful if addons\' hooks depend on other files.',
+                        action='store_true',
+                    ),
+                    Flag(
+                        name=self.envs_flag,
+                        help='Comma-separated list of environments to build, instead of the '
+                             'current one.',
+                    ),
+                    Flag(
+                        name=WATCH_FLAG,
+                        help='Keep running, and rebuild whenever the configuration, the recipe, '
+                             'the extended files or the addons\' hooks change.',
+                        action='store_true',
+                    ),
+                    Flag(
+                        name=WATCH_UP_FLAG,
+                        help='In the watch mode, start the services whose definitions have '
+                             'changed after every rebuild.',
+                        action='store_true',
+                    ),
+                    Flag(
+                        name=WATCH_POLL_FLAG,
+                        help='In the watch mode, detect changes by polling instead of inotify. '
+                             'Needed if inotify doesn\'t report changes of the project\'s files.',
+                        action='store_true',
+                    ),
                 ]
             )
         )
 
+        self._add_command(
+            CallableCommand(
+                name='exec-all',
+                help='Run the command, or the custom command, in many services at once.',
+                callback=self.__exec_all,
+                flags=[
+                    Flag(
+                        name=SERVICES_FLAG,
+                        help='Comma-separated list of services to run the command in. Defaults to '
+                             'all services of the environment.',
+                    ),
+                    Flag(
+                        name=CONCURRENCY_FLAG,
+                        help='Maximum number of services the command is run in at once. Defaults '
+                             f"to {DEFAULT_CONCURRENCY}.",
+                    ),
+                ]
+            ),
+        )
+
+        self._add_command(
+            CallableCommand(
+                name='status',
+                help='Show the state of the environment\'s containers.',
+                callback=self.__status,
+            ),
+        )
+
         self._add_command(
             CallableCommand(
                 name='name',
@@ -112,13 +196,32 @@ class EnvCommandsProvider(CallableCommandsProvider):
         return 'Environment management.'
 
     def __start_environment(self, _reminder_args: list[str]):
-        """Starts the environment.
+        """Starts the environment, or all given environments concurrently.
         """
-        build_flags =\
-            [self.substitute_variables_flag] if self.substitute_variables_flag in _reminder_args\
-                else []
-        self.__build_environment(build_flags)
-        self.process_executor.env_start()
+        build_flags = [
+            flag for flag in [self.substitute_variables_flag, self.force_flag]
+            if flag in _reminder_args
+        ]
+        process_executors = self.__get_process_executors(_reminder_args)
+        self.__build_environment(build_flags, process_executors)
+        if not self._get_option_value(_reminder_args, self.envs_flag):
+            self.process_executor.env_start()
+            return
+
+        commands = {
+            env: process_executor.get_command_base() + ['up', '-d']
+            for env, process_executor in process_executors.items()
+        }
+        exit_codes = self.process_executor.execute_many(commands)
+        failed = {env: exit_code for env, exit_code in exit_codes.items() if exit_code}
+        for env, exit_code in failed.items():
+            print(
+                f"{Fore.RED}Environment '{env}' failed to start with exit code {exit_code}."
+                f"{Style.RESET_ALL}",
+                file=sys.stderr,
+            )
+        if failed:
+            sys.exit(max(failed.values()))
 
     def __freeze_environment(self, _reminder_args: list[str]):
         """Stops the environment.
@@ -130,11 +233,154 @@ class EnvCommandsProvider(CallableCommandsProvider):
         """
         self.process_executor.env_destroy()
 
-    def __build_environment(self, _reminder_args: list[str]):
-        """Build environment's definition.
+    def __build_environment(
+            self,
+            _reminder_args: list[str],
+            process_executors: dict[str, ProcessExecutor] | None = None,
+    ):
+        """Build environment's definition, or definitions of all given environments.
         """
         substitute = self.substitute_variables_flag in _reminder_args
-        self.process_executor.env_build(substitute)
+        force = self.force_flag in _reminder_args
+        if WATCH_FLAG in _reminder_args:
+            self.__watch_environment(_reminder_args)
+            return
+        if process_executors is None:
+            process_executors = self.__get_process_executors(_reminder_args)
+        for process_executor in process_executors.values():
+            process_executor.env_build(substitute, force)
+        if self.build_callback:
+            self.build_callback(self.process_executor)
+
+    def __watch_environment(self, args: list[str]):
+        """Rebuilds the environment's definition whenever its sources change.
+        """
+        # pylint: disable=import-outside-toplevel
+        from dk.env_watcher import EnvironmentWatcher
+        from dk.watcher import create_watcher
+
+        if self._get_option_value(args, self.envs_flag):
+            print(
+                f"{Fore.RED}Only the current environment can be watched.{Style.RESET_ALL}",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        if self.force_flag in args:
+            self.process_executor.env_build(self.substitute_variables_flag in args, True)
+        env_watcher = EnvironmentWatcher(
+            self.process_executor,
+            create_watcher(WATCH_POLL_FLAG in args),
+            substitute_vars=self.substitute_variables_flag in args,
+            start=WATCH_UP_FLAG in args,
+            build_callback=self.build_callback,
+        )
+        env_watcher.run()
+        # The configuration may have been reloaded during the watch.
+        self.process_executor = env_watcher.process_executor
+
+    def __get_process_executors(self, args: list[str]) -> dict[str, ProcessExecutor]:
+        """Returns the process executors of the environments given with the "--envs" option, or
+           the executor of the current environment if the option is not given. All of them share
+           the parsed configs.
+        """
+        envs_value = self._get_option_value(args, self.envs_flag)
+        if not envs_value:
+            return {self.config_manager.get_project_env(): self.process_executor}
+
+        envs = list(dict.fromkeys(env for env in envs_value.split(',') if env))
+        available_envs = self.config_manager.get_project_envs()
+        unknown_envs = [env for env in envs if env not in available_envs]
+        if unknown_envs:
+            print(
+                f"{Fore.RED}Environments not found in "
+                f"'{self.config_manager.get_project_paths().environments}': "
+                f"{', '.join(unknown_envs)}.{Style.RESET_ALL}",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        return {env: self.process_executor.for_env(env) for env in envs}
+
+    def __exec_all(self, reminder_args: list[str]):
+        """Runs the command in many services concurrently, and exits with the highest of their
+           exit codes.
+        """
+        options, command = self._parse_options(
+            reminder_args, [SERVICES_FLAG, CONCURRENCY_FLAG]
+        )
+        if not command:
+            print(f"{Fore.RED}The command to run is missing.{Style.RESET_ALL}", file=sys.stderr)
+            sys.exit(1)
+        services = options[SERVICES_FLAG].split(',') if options[SERVICES_FLAG] \
+            else self.process_executor.get_services()
+        concurrency_value = options[CONCURRENCY_FLAG] or str(DEFAULT_CONCURRENCY)
+        if not concurrency_value.isdigit() or int(concurrency_value) < 1:
+            print(
+                f"{Fore.RED}The concurrency must be a positive integer, '{concurrency_value}' "
+                f"given.{Style.RESET_ALL}",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        concurrency = int(concurrency_value)
+
+        commands: dict[str, list] = {}
+        variables: dict = {}
+        custom_commands_provider = CustomCommandsProvider(self.config_manager)
+        custom_command = custom_commands_provider.get_command(command[0])\
+            if custom_commands_provider.supports(command[0]) else None
+        for service in services:
+            if custom_command and custom_command.service is not None:
+                commands[service], variables = self.process_executor.get_script_command(
+                    custom_command,
+                    command[1:],
+                    self.config_manager.get_vars(),
+                    service=service,
+                    tty=False,
+                )
+            else:
+                commands[service] = self.process_executor.get_command_base()
+                commands[service].extend(['exec', '-T', service, *command])
+
+        exit_codes = self.process_executor.execute_many(commands, variables, concurrency)
+        # Processes killed by a signal have negative exit codes. They are reported the way shells
+        # do, so they aren't taken for a success.
+        exit_codes = {
+            service: 128 - exit_code if exit_code < 0 else exit_code
+            for service, exit_code in exit_codes.items()
+        }
+        for service, exit_code in exit_codes.items():
+            if exit_code:
+                print(f"{Fore.RED}{service}: failed with exit code {exit_code}{Style.RESET_ALL}")
+            else:
+                print(f"{service}: succeeded")
+        sys.exit(max(exit_codes.values(), default=0))
+
+    def __status(self, _reminder_args: list[str]):
+        """Prints the state, health and uptime of the environment's containers. Docker is queried
+           directly, so the compose file doesn't need to be parsed.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from dk.docker_api import DockerApiError, DockerClient
+
+        try:
+            containers = DockerClient().list_project_containers(
+                self.process_executor.get_project_name()
+            )
+        except DockerApiError as e:
+            print(f"{Fore.RED}{e}{Style.RESET_ALL}", file=sys.stderr)
+            sys.exit(1)
+
+        if not containers:
+            print("The environment has no containers.")
+            return
+
+        rows = [('SERVICE', 'NAME', 'STATE', 'HEALTH', 'UPTIME')]
+        rows.extend(
+            (c.service or '-', c.name, c.state, c.health or '-', c.uptime or '-')
+            for c in containers
+        )
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        for row in rows:
+            print('  '.join(v.ljust(w) for v, w in zip(row, widths)).rstrip())
 
     def __name(self, _reminder_args: list[str]):
         """Returns the name of the current environment.
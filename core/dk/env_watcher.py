@@ -0,0 +1,168 @@
+"""Rebuilding of the environment's definition whenever its sources change.
+"""
+import os
+import sys
+from typing import Callable
+
+from colorama import Fore, Style
+
+from dk import yaml_io
+from dk.completion import COMPLETION_INDEX_FILENAME
+from dk.compose_manager import ComposeManager
+from dk.config_manager import ConfigManager
+from dk.hook_manager import HookManager
+from dk.process_executor import ProcessExecutor
+from dk.scanner import IgnoreRules, load_ignore_rules
+from dk.watcher import DEBOUNCE_DEFAULT, Watcher
+
+
+class EnvironmentWatcher:
+    """Watches the project's configuration, and the files extended by the recipe, and rebuilds
+       the environment's definition when they change. Optionally, the services whose definitions
+       changed are started again.
+    """
+
+    def __init__(
+            self,
+            process_executor: ProcessExecutor,
+            watcher: Watcher,
+            substitute_vars: bool = False,
+            start: bool = False,
+            build_callback: Callable | None = None,
+    ):
+        self.process_executor: ProcessExecutor = process_executor
+        self.watcher: Watcher = watcher
+        self.substitute_vars: bool = substitute_vars
+        self.start: bool = start
+        self.debounce: float = DEBOUNCE_DEFAULT
+        self.build_callback: Callable | None = build_callback
+        # Rules of the project's scan, so the ignored files are neither watched nor sources.
+        self.ignore: IgnoreRules = load_ignore_rules(
+            process_executor.config.get_project_config_path()
+        )
+
+    def run(self) -> None:
+        """Builds the environment, and then rebuilds it on every change, until interrupted.
+        """
+        self.rebuild(None)
+        print(
+            f"Watching '{self.process_executor.config.get_project_config_path()}' for changes. "
+            "Press Ctrl+C to stop."
+        )
+        try:
+            while True:
+                self.rebuild(self.watcher.wait_for_changes(self.debounce))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.watcher.close()
+
+    def rebuild(self, changes: set[str] | None) -> bool:
+        """Rebuilds the environment after the given files have changed, or unconditionally if
+           the changes are not known. Errors are reported without stopping the watch. Returns
+           True if the environment's definition has changed.
+        """
+        outputs = self.process_executor.get_build_outputs()
+        if changes is not None:
+            changes = {path for path in changes if self.__is_source(path, outputs)}
+            if not changes:
+                return False
+
+        compose_path, dotenv_path = outputs[0], outputs[1]
+        services_before = self.__get_services(compose_path)
+        dotenv_before = self.__read(dotenv_path)
+        try:
+            if changes is not None:
+                self.__reload(changes)
+            built = self.process_executor.env_build(self.substitute_vars)
+        except (ValueError, RuntimeError, OSError, yaml_io.YAMLError) as e:
+            print(f"{Fore.RED}The build has failed: {e}{Style.RESET_ALL}", file=sys.stderr)
+            return False
+        except SystemExit:
+            # The error has been already reported.
+            return False
+        finally:
+            self.__watch_sources()
+
+        # The callback is run even if the environment's definition hasn't changed, as e.g. new
+        # commands are completed while the watch is still running.
+        if self.build_callback:
+            self.build_callback(self.process_executor)
+        if not built:
+            return False
+
+        services = self.__get_services(compose_path)
+        changed_services = [
+            name for name, service in services.items() if services_before.get(name) != service
+        ]
+        print(f"The environment has been rebuilt. Changed services: "
+              f"{', '.join(changed_services) if changed_services else 'none'}.")
+
+        if self.start and changes is not None:
+            # Variables may be used by any service, so if they have changed, all services are
+            # updated. Compose recreates only the containers whose configuration has changed.
+            if self.__read(dotenv_path) != dotenv_before:
+                self.process_executor.env_start()
+            elif changed_services:
+                self.process_executor.env_start(changed_services)
+        return True
+
+    def __reload(self, changes: set[str]) -> None:
+        """Loads again the configuration if the project's files have changed, as files may have
+           been added or removed since the project has been scanned. Parsed files are cached, so
+           only the changed ones are parsed again. Changes of the extended files alone don't
+           require that. If the configuration can't be loaded, the previous one is kept.
+        """
+        config_path = self.process_executor.config.get_project_config_path()
+        if any(path.startswith(config_path + os.sep) for path in changes):
+            config = ConfigManager()
+            self.process_executor = ProcessExecutor(
+                config, ComposeManager(config), HookManager(config)
+            )
+
+    def __watch_sources(self) -> None:
+        """Watches the project's configuration, and the directories of the extended files. The
+           ignore rules are loaded again, as they may have changed.
+        """
+        config_path = self.process_executor.config.get_project_config_path()
+        self.ignore = load_ignore_rules(config_path)
+        self.watcher.watch(config_path, ignore=self.ignore)
+        try:
+            recipe = self.process_executor.get_recipe()
+            extended_files = recipe.get_extended_files() if recipe else []
+        except (ValueError, RuntimeError, OSError, yaml_io.YAMLError):
+            extended_files = []
+        for path in extended_files:
+            directory = os.path.dirname(os.path.abspath(path))
+            if os.path.isdir(directory):
+                self.watcher.watch(directory, recursive=False)
+
+    def __is_source(self, path: str, outputs: list[str]) -> bool:
+        """Tells if the file may affect the build. Outputs of the build, the completion index,
+           temporary files, and files excluded from the project's scan, are ignored.
+        """
+        config_path = self.process_executor.config.get_project_config_path()
+        if path.startswith(config_path + os.sep) and self.ignore.is_ignored_in_tree(
+                os.path.relpath(path, config_path).replace(os.sep, '/'), os.path.isdir(path)
+        ):
+            return False
+        return (
+            path not in outputs
+            and os.path.basename(path) != COMPLETION_INDEX_FILENAME
+            and not path.endswith(('.tmp', '~', '.swp'))
+        )
+
+    @staticmethod
+    def __get_services(compose_path: str) -> dict:
+        try:
+            return dict((yaml_io.load_file(compose_path) or {}).get('services') or {})
+        except (OSError, yaml_io.YAMLError):
+            return {}
+
+    @staticmethod
+    def __read(path: str) -> str | None:
+        try:
+            with open(path, 'r', encoding='utf8') as f:
+                return f.read()
+        except OSError:
+            return None
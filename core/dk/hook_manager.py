@@ -2,10 +2,13 @@
 """
 import os
 from importlib import util
+from types import ModuleType
 
+from dk import tracing
 from dk.config import AddonConfig
 from dk.compose_manager import Compose, ComposeRecipe
 from dk.config_manager import ConfigManager
+from dk.scanner import HOOKS_FILENAME
 
 
 class HookUtils:
@@ -27,38 +30,61 @@ class HookManager:
     def __init__(self, config: ConfigManager):
         self.__config: ConfigManager = config
         self.__utils = HookUtils(config)
+        self.__hooks: dict[str, ModuleType | None] = {}
+
+    def get_hooks_path(self, addon: AddonConfig) -> str:
+        """Returns the path to the addon's hooks file. The file may not exist.
+        """
+        return os.path.join(
+            self.__config.get_project_config_path(), os.path.dirname(addon.path), HOOKS_FILENAME
+        )
 
     def addon_alter_services(self, recipe: ComposeRecipe, compose: Compose) -> None:
-        """Allows addons to alter services.
+        """Allows addons to alter services. The 'alter_service' hook is called for every service
+           using the addon, and then the 'alter_compose' hook is called once with all of them.
         """
-        services = compose.list_services()
-        addons: list[AddonConfig] = self.__config.get_addons()
-        for service in services:
-            service_addons_ids = recipe.get_addons(service)
-            for service_addon_id in service_addons_ids:
-                addon: AddonConfig | None =\
-                    next((a for a in addons if a.id == service_addon_id), None)
+        addons: dict[str, AddonConfig] = {}
+        addon_services: dict[str, dict[str, dict]] = {}
+        for service in compose.list_services():
+            for service_addon_id in recipe.get_addons(service):
+                addon: AddonConfig | None = self.__config.get_addon(service_addon_id)
                 if not addon:
                     raise ValueError(f"Unknown addon '{service_addon_id}'")
+                addons[addon.id] = addon
 
-                addon_path = addon.path
-                addon_path_absolute = (
-                        self.__config.get_project_config_path() +
-                        os.sep +
-                        os.path.dirname(addon_path)
-                )
-
-                hooks_path = addon_path_absolute + os.sep + 'hooks.py'
-                if not os.path.exists(hooks_path):
+                module = self.__load_hooks(addon)
+                if not module:
                     continue
-                spec = util.spec_from_file_location('', hooks_path)
-                module = util.module_from_spec(spec)
-                spec.loader.exec_module(module)
+                service_data = compose.get_service(service)
+                addon_services.setdefault(addon.id, {})[service] = service_data
                 if hasattr(module, 'alter_service'):
-                    service_data = compose.get_service(service)
-                    module.alter_service(
-                        service,
-                        service_data,
-                        self.__utils,
-                        addon
-                    )
+                    with tracing.span('hooks.alter_service', addon=addon.id, service=service):
+                        module.alter_service(
+                            service,
+                            service_data,
+                            self.__utils,
+                            addon
+                        )
+
+        for addon_id, services in addon_services.items():
+            module = self.__load_hooks(addons[addon_id])
+            if hasattr(module, 'alter_compose'):
+                # Services are passed by reference, so the hook can alter them in place.
+                with tracing.span('hooks.alter_compose', addon=addon_id):
+                    module.alter_compose({'services': services}, self.__utils, addons[addon_id])
+
+    def __load_hooks(self, addon: AddonConfig) -> ModuleType | None:
+        """Returns the addon's hooks module, or None if the addon has no hooks. Every module is
+           loaded only once.
+        """
+        if addon.id not in self.__hooks:
+            module = None
+            hooks_path = self.get_hooks_path(addon)
+            if hooks_path in self.__config.get_project_scan().hooks:
+                with tracing.span('hooks.load', addon=addon.id, path=hooks_path):
+                    spec = util.spec_from_file_location('', hooks_path)
+                    module = util.module_from_spec(spec)
+                    spec.loader.exec_module(module)
+            self.__hooks[addon.id] = module
+
+        return self.__hooks[addon.id]
@@ -6,9 +6,9 @@ import shutil
 from typing import Generator
 from dataclasses import dataclass
 
-import yaml
 from colorama import Fore, Style
 
+from dk import yaml_io
 from dk.config_manager import ConfigManager
 
 
@@ -26,8 +26,7 @@ class CustomTemplate(Template):
     path_base: str
 
 def __get_template_id(template_path: str) -> str:
-    with open(template_path, 'r', encoding='utf8') as stream:
-        content = yaml.safe_load(stream)
+    content = yaml_io.load_file(template_path)
     if 'id' not in content:
         raise ValueError("Template is missing ID.")
     return content['id']
@@ -4,6 +4,7 @@ import sys
 
 from dk.config_manager import ConfigManager
 from dk.custom_commands_provider import CustomCommandsProvider
+from dk.lockfile import write_lockfile
 from dk.utils import dict_to_env_string
 
 
@@ -28,22 +29,56 @@ class InternalCommandsProvider():
             self.__is_local_command(commands[1:])
         elif command == 'get-command-vars':
             self.__print_command_vars()
+        elif command == 'resolve':
+            self.__resolve(commands[1:])
         sys.exit(0)
 
-    def __print_project_path(self) -> None:
-        project_path =\
-            self.config_manager.get_project_config_path()\
-                if self.config_manager.is_project_context_full()\
-                else None
-        if project_path:
-            print(project_path, end='')
+    def __get_project_path(self) -> str:
+        return self.config_manager.get_project_config_path()\
+            if self.config_manager.is_project_context_full()\
+            else ''
 
-    def __is_local_command(self, _reminder_args: list[str]) -> None:
-        command_name = _reminder_args[0]
+    def __get_local_command_path(self, command_name: str) -> str:
         if self.custom_command_provider.supports(command_name):
             command = self.custom_command_provider.get_command(command_name)
             if not command.service:
-                print(command.cmd, end='')
+                return command.cmd
+        return ''
+
+    def __print_project_path(self) -> None:
+        print(self.__get_project_path(), end='')
+
+    def __is_local_command(self, _reminder_args: list[str]) -> None:
+        print(self.__get_local_command_path(_reminder_args[0]), end='')
 
     def __print_command_vars(self) -> None:
         print(dict_to_env_string(self.config_manager.get_vars()), end='')
+
+    def __resolve(self, _reminder_args: list[str]) -> None:
+        """Prints everything the wrapper needs to run the given command, so it can be done in
+           a single call. Expects the project path seen by the wrapper, followed by the command's
+           arguments. Prints NUL-terminated fields:
+           - the current context's project path,
+           - "1" if the context has to be switched, "0" otherwise,
+           - the path to the command if it's supposed to be run on host, or an empty field,
+           - the "KEY=value" variables for the command run on host (only if the command is local).
+           If the context has to be switched, the remaining fields are empty, as they would be
+           resolved in the wrong context. Resolving the local command refreshes the lockfile, so
+           the wrapper can run it without the core next time.
+        """
+        expected_project_path = _reminder_args[0] if _reminder_args else ''
+        command_args = _reminder_args[1:]
+        project_path = self.__get_project_path()
+        switch_context = project_path != expected_project_path
+
+        local_command_path = ''
+        if not switch_context and command_args:
+            local_command_path = self.__get_local_command_path(command_args[0])
+
+        fields = [project_path, '1' if switch_context else '0', local_command_path]
+        if local_command_path:
+            fields.extend(
+                f"{key}={value}" for key, value in self.config_manager.get_vars().items()
+            )
+            write_lockfile(self.config_manager, self.custom_command_provider.get_commands())
+        print(''.join(f"{field}\0" for field in fields), end='')
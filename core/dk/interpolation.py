@@ -0,0 +1,169 @@
+"""Interpolation of variables in strings.
+"""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Mapping
+
+NAME_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+SPECIAL_CHARS_PATTERN = re.compile(r'\$')
+NESTED_SPECIAL_CHARS_PATTERN = re.compile(r'[$}]')
+
+# Compose-style operators. Longer operators go first, so they are matched before their prefixes.
+OPERATORS = (':-', ':?', ':+', '-', '?', '+')
+
+
+class VariableNotExists(ValueError):
+    """This is a helper exception to indicate that variable doesn't exist when requested.
+    """
+    def __init__(self, name: str, message: str | None = None):
+        super().__init__(message if message else f"Variable {name} doesn't exist.")
+
+
+class VariableReferenceCycle(ValueError):
+    """Exception indicating that variables reference each other in a cycle.
+    """
+    def __init__(self, names: list[str]):
+        super().__init__(f"Variables reference each other in a cycle: {' -> '.join(names)}.")
+
+
+@dataclass(frozen=True)
+class Reference:
+    """Dataclass storing the reference to a variable, together with its operator and the
+       operator's argument.
+    """
+    name: str
+    operator: str | None = None
+    argument: tuple = ()
+
+
+@lru_cache(maxsize=256)
+def compile_template(string: str) -> tuple:
+    """Compiles the string into a tuple of literal strings and references. Escaped dollars ("$$")
+       and anything that isn't a valid reference are kept as they are.
+    """
+    parts, _ = __parse(string, 0, False)
+    return tuple(parts)
+
+
+def __parse(string: str, pos: int, nested: bool) -> tuple[list, int]:
+    """Parses the string from the given position. If nested, parsing stops at the closing brace
+       of the enclosing reference.
+    """
+    parts: list = []
+    literal_start = pos
+    special_chars = NESTED_SPECIAL_CHARS_PATTERN if nested else SPECIAL_CHARS_PATTERN
+    length = len(string)
+    while pos < length:
+        match = special_chars.search(string, pos)
+        if not match:
+            pos = length
+            break
+        pos = match.start()
+        if string[pos] == '}':
+            break
+        if string.startswith('$$', pos):
+            pos += 2
+            continue
+        reference, end = __parse_reference(string, pos)
+        if not reference:
+            pos += 1
+            continue
+        if pos > literal_start:
+            parts.append(string[literal_start:pos])
+        parts.append(reference)
+        pos = literal_start = end
+
+    if pos > literal_start:
+        parts.append(string[literal_start:pos])
+    return parts, pos
+
+
+def __parse_reference(string: str, pos: int) -> tuple[Reference | None, int]:
+    """Parses the reference starting at the given position. Returns None if there is no valid
+       reference there.
+    """
+    if not string.startswith('${', pos):
+        return None, pos
+    match = NAME_PATTERN.match(string, pos + 2)
+    if not match:
+        return None, pos
+    name = match.group()
+    pos = match.end()
+
+    operator = next((o for o in OPERATORS if string.startswith(o, pos)), None)
+    argument: list = []
+    if operator:
+        argument, pos = __parse(string, pos + len(operator), True)
+
+    if pos >= len(string) or string[pos] != '}':
+        return None, pos
+    return Reference(name, operator, tuple(argument)), pos + 1
+
+
+class Interpolator:
+    """Substitutes references to variables in strings, in a single pass. Supported are "${NAME}"
+       references, and the compose-style operators: "${NAME:-default}", "${NAME-default}",
+       "${NAME:?error}", "${NAME?error}", "${NAME:+alternative}" and "${NAME+alternative}".
+       Values of variables may reference other variables too. If not strict, references to
+       unknown variables are replaced with empty strings.
+    """
+
+    def __init__(self, variables: Mapping[str, str], strict: bool = True):
+        self.__variables: Mapping[str, str] = variables
+        self.__strict: bool = strict
+        self.__resolved: dict[str, str] = {}
+        self.__resolving: list[str] = []
+
+    def interpolate(self, string: str) -> str:
+        """Replaces references to variables in the string with their values.
+        """
+        return self.__render(compile_template(string))
+
+    def get(self, name: str) -> str | None:
+        """Returns the value of the variable with all references resolved, or None if the
+           variable doesn't exist.
+        """
+        if name in self.__resolved:
+            return self.__resolved[name]
+        if name not in self.__variables:
+            return None
+        if name in self.__resolving:
+            raise VariableReferenceCycle(self.__resolving[self.__resolving.index(name):] + [name])
+
+        self.__resolving.append(name)
+        try:
+            value = self.interpolate(str(self.__variables[name]))
+        finally:
+            self.__resolving.pop()
+        self.__resolved[name] = value
+        return value
+
+    def __render(self, template: tuple) -> str:
+        return ''.join(
+            part if isinstance(part, str) else self.__resolve_reference(part) for part in template
+        )
+
+    def __resolve_reference(self, reference: Reference) -> str:
+        value = self.get(reference.name)
+        operator = reference.operator
+        if operator is None:
+            if value is None:
+                if not self.__strict:
+                    return ''
+                raise VariableNotExists(reference.name)
+            return value
+
+        # Operators with a colon treat empty variables as unset.
+        is_set = value is not None and (value != '' or not operator.startswith(':'))
+        if operator.endswith('-'):
+            return value if is_set else self.__render(reference.argument)
+        if operator.endswith('?'):
+            if not is_set:
+                error = self.__render(reference.argument)
+                raise VariableNotExists(
+                    reference.name,
+                    f"Variable {reference.name} is required" + (f": {error}" if error else "."),
+                )
+            return value
+        return self.__render(reference.argument) if is_set else ''
@@ -0,0 +1,115 @@
+"""Resolved environment's lockfile. It's read directly on the host by the wrapper, so local
+commands can be run without the core, as long as none of the lockfile's inputs has changed.
+"""
+import os
+
+from dk.command import ServiceCommand
+from dk.config_manager import ConfigManager
+from dk.scanner import COMPANION_FILE_SUFFIX, IGNORE_FILENAME
+from dk.utils import write_file_if_changed
+
+LOCKFILE_FILENAME = '.resolved.lock'
+
+# Name of the file in the environments' directory, storing the name of the project's default
+# environment, so the wrapper knows which lockfile to read when DRAKY_ENV is not set.
+DEFAULT_ENV_FILENAME = '.default-env'
+
+# Bump it whenever the format of the lockfile changes, together with the wrapper.
+LOCKFILE_FORMAT = 'draky-lock 1'
+
+# Paths of the lockfiles written by the current process.
+__written_lockfiles: set[str] = set()
+
+
+def get_lockfile_path(config_manager: ConfigManager) -> str:
+    """Returns the path to the lockfile of the current environment.
+    """
+    return f"{config_manager.get_project_env_path()}/{LOCKFILE_FILENAME}"
+
+
+def get_default_env_path(config_manager: ConfigManager) -> str:
+    """Returns the path to the file storing the name of the project's default environment.
+    """
+    return f"{config_manager.get_project_paths().environments}/{DEFAULT_ENV_FILENAME}"
+
+
+def get_lockfile_inputs(config_manager: ConfigManager) -> list[str]:
+    """Returns the paths of the files and directories the resolved variables and commands depend
+       on. The lockfile is stale if any of them is newer than the lockfile itself, or is missing.
+    """
+    scan = config_manager.get_project_scan()
+    inputs = list(scan.directories)
+    inputs.extend(scan.configs)
+    inputs.extend(f"{path}{os.sep}{filename}" for path, filename in scan.commands)
+    inputs.extend(f"{path}{COMPANION_FILE_SUFFIX}" for path in sorted(scan.companions))
+    ignore_path = f"{config_manager.get_project_config_path()}{os.sep}{IGNORE_FILENAME}"
+    if os.path.exists(ignore_path):
+        inputs.append(ignore_path)
+    return inputs
+
+
+def build_lockfile(
+        config_manager: ConfigManager,
+        custom_commands: list[ServiceCommand],
+) -> str:
+    """Returns the content of the lockfile. It consists of NUL-terminated fields:
+       - the format, the draky's version, the environment, and the project's path,
+       - the number of inputs, followed by their paths,
+       - the number of variables, followed by the "KEY=value" variables,
+       - the number of commands, followed by the name, service, user and path of every command,
+         in the order of their priority. The service is empty for commands run on host.
+    """
+    inputs = get_lockfile_inputs(config_manager)
+    variables = config_manager.get_vars()
+    fields = [
+        LOCKFILE_FORMAT,
+        config_manager.version,
+        config_manager.get_project_env(),
+        config_manager.get_project_config_path(),
+        str(len(inputs)),
+        *inputs,
+        str(len(variables)),
+        *(f"{key}={value}" for key, value in variables.items()),
+        str(len(custom_commands)),
+    ]
+    for command in custom_commands:
+        fields.extend([command.name, command.service or '', str(command.user), command.cmd])
+    return ''.join(f"{field}\0" for field in fields)
+
+
+def write_lockfile(config_manager: ConfigManager, custom_commands: list[ServiceCommand]) -> bool:
+    """Writes the lockfile of the current environment, and the name of the default environment.
+       The lockfile is only an optimization, so failures are silently ignored. Returns True if
+       the lockfile has been written.
+    """
+    lockfile_path = get_lockfile_path(config_manager)
+    if not os.path.isdir(os.path.dirname(lockfile_path)):
+        return False
+    try:
+        write_file_if_changed(
+            get_default_env_path(config_manager), config_manager.get_default_env() + '\n'
+        )
+        written = write_file_if_changed(
+            lockfile_path, build_lockfile(config_manager, custom_commands)
+        )
+        # The lockfile has to be newer than its inputs, even if its content hasn't changed, and
+        # than the directories modified by writing it.
+        os.utime(lockfile_path)
+    except OSError:
+        return False
+    __written_lockfiles.add(lockfile_path)
+    return written
+
+
+def touch_lockfiles() -> None:
+    """Makes the lockfiles written by the current process newer than everything the process has
+       written since, e.g. the build of another environment, or the completion index. These
+       files are not the lockfiles' inputs, but writing them changes the modification time of
+       their directories, which are.
+    """
+    for lockfile_path in __written_lockfiles:
+        try:
+            os.utime(lockfile_path)
+        except OSError:
+            pass
+    __written_lockfiles.clear()
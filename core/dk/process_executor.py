@@ -1,35 +1,99 @@
 """Process executor. Executes other processes.
 """
 
+import hashlib
 import os
 import sys
 import pathlib
-from subprocess import Popen, PIPE, run, DEVNULL
-
-import yaml
+import time
+from subprocess import Popen, PIPE, STDOUT, run, DEVNULL
+from typing import TYPE_CHECKING, Iterable
 
+from dk import stats, tracing, yaml_io
+from dk.build_manifest import BuildManifest, hash_file, hash_inputs
 from dk.command import ServiceCommand
-from dk.compose_manager import ComposeManager, ComposeRecipe
 from dk.config_manager import ConfigManager
-from dk.hook_manager import HookManager
-from dk.utils import get_path_up_to_project_root
+from dk.custom_commands_provider import CustomCommandsProvider
+from dk.lockfile import get_default_env_path, get_lockfile_path, write_lockfile
+from dk.utils import write_file_if_changed
+
+if TYPE_CHECKING:
+    from asyncio import StreamReader
+    from dk.compose_manager import ComposeManager, ComposeRecipe
+    from dk.hook_manager import HookManager
+
+# Path in the container where the custom commands' scripts are stored.
+SCRIPTS_PATH = '/tmp'
+# Scripts up to this size are passed to the container in a variable, which the kernel limits to
+# 128 KiB. Larger scripts are copied in a separate exec.
+MAX_INLINE_SCRIPT_SIZE = 100 * 1024
+SCRIPT_VARIABLE_NAME = 'DRAKY_COMMAND_SCRIPT'
+
+# Installs the script passed in the variable at the path given as $0, unless it's already there,
+# and runs it. The script is moved into place only when complete, so concurrent runs are safe.
+RUN_SCRIPT = (
+    'if [ ! -f "$0" ]; then '
+    f'mkdir -p "${{0%/*}}" && printf "%s" "${SCRIPT_VARIABLE_NAME}" > "$0.$$" && '
+    'chmod a+x "$0.$$" && mv -f "$0.$$" "$0" || exit 1; '
+    'fi; '
+    f'unset {SCRIPT_VARIABLE_NAME}; '
+    'exec "$0" "$@"'
+)
+
+# Runs the executable script in place from the mounted commands directory, at the path given as $0.
+# The directory is missing if the service hasn't been recreated since the build.
+RUN_MOUNTED_SCRIPT = (
+    'if [ ! -f "$0" ]; then '
+    'echo "$0 is not mounted into the service. Start the environment again." >&2; '
+    'exit 127; '
+    'fi; '
+    'exec "$0" "$@"'
+)
+
+# Number of commands run at once by default, when running commands concurrently.
+DEFAULT_CONCURRENCY = 4
+# Lines of output of the concurrently run commands are split at this length.
+MAX_OUTPUT_LINE_LENGTH = 1024 * 1024
+
+# Installs the script passed through stdin at the path given as $0, unless it's already there.
+COPY_SCRIPT = (
+    '[ -f "$0" ] || { mkdir -p "${0%/*}" && cat > "$0.$$" && chmod a+x "$0.$$" && '
+    'mv -f "$0.$$" "$0"; }'
+)
 
 
 class ProcessExecutor:
-    """Class handling execution of system processes.
+    """Class handling execution of system processes. The compose and hook managers are only
+       needed to build the environment.
     """
 
     def __init__(
             self,
             config: ConfigManager,
-            compose_manager: ComposeManager,
-            hook_manager: HookManager,
+            compose_manager: 'ComposeManager | None' = None,
+            hook_manager: 'HookManager | None' = None,
     ) -> None:
         self.config: ConfigManager = config
-        self.compose_manager: ComposeManager = compose_manager
-        self.hook_manager: HookManager = hook_manager
+        self.compose_manager: 'ComposeManager | None' = compose_manager
+        self.hook_manager: 'HookManager | None' = hook_manager
         self.stdin_passed: bool = False
 
+    def for_env(self, env: str) -> 'ProcessExecutor':
+        """Returns the process executor of the given environment of the current project. Parsed
+           configs are shared with this executor.
+        """
+        config = self.config.for_env(env)
+        return ProcessExecutor(
+            config,
+            type(self.compose_manager)(config) if self.compose_manager else None,
+            type(self.hook_manager)(config) if self.hook_manager else None,
+        )
+
+    def get_project_name(self) -> str:
+        """Returns the name of the compose project of the current environment.
+        """
+        return f"{self.config.get_project_id()}-{self.config.get_project_env()}"
+
     def get_command_base(self) -> list:
         """Returns beginning of every command.
         """
@@ -37,26 +101,46 @@ class ProcessExecutor:
             'docker',
             'compose',
             '-p',
-            f"{self.config.get_project_id()}-{self.config.get_project_env()}",
+            self.get_project_name(),
             '-f',
             self.__get_compose_path(),
         ]
 
-    def env_build(self, substitute_vars: bool = False):
-        """Build the environment's definition.
+    def env_build(self, substitute_vars: bool = False, force: bool = False) -> bool:
+        """Build the environment's definition. The build is skipped if its inputs haven't changed
+           since the previous build, unless it's forced. The lockfile is refreshed either way.
+           Returns True if the build has been done.
         """
+        with tracing.span('build', force=force) as span_args:
+            span_args['built'] = self.__env_build(substitute_vars, force)
+            with tracing.span('lockfile.write'):
+                write_lockfile(self.config, CustomCommandsProvider(self.config).get_commands())
+            return span_args['built']
+
+    def __env_build(self, substitute_vars: bool, force: bool) -> bool:
+        recipe = self.get_recipe()
+        variables = self.config.get_vars()
+        commands_mounts = self.__get_commands_mounts(recipe)
+        manifest = BuildManifest(self.__get_build_manifest_path(), self.config.version)
+        with tracing.span('build.inputs'):
+            inputs_hash = hash_inputs(
+                self.__get_build_inputs(recipe, variables, substitute_vars, commands_mounts)
+            )
+        if not force and manifest.is_up_to_date(inputs_hash):
+            return False
+
+        outputs = [self.__get_dotenv_path()]
         # Build the compose file.
-        recipe_path = self.__get_recipe_path()
-        if os.path.exists(recipe_path):
-            with open(recipe_path, "r", encoding='utf8') as f:
-                recipe_content = yaml.safe_load(f)
-            recipe = ComposeRecipe(recipe_content, recipe_path, self.config.get_project_env_path())
+        if recipe:
             compose = self.compose_manager.create(recipe, self.__get_compose_path())
             compose.set_substituted_variables(substitute_vars)
+            for service, paths in commands_mounts.items():
+                volumes = compose.get_service(service).setdefault('volumes', [])
+                volumes.extend(f"{path}:{path}:ro" for path in paths)
             self.hook_manager.addon_alter_services(recipe, compose)
             self.compose_manager.save(compose)
+            outputs.append(compose.get_path())
         # Save the .env file.
-        variables = self.config.get_vars()
         dotenv_lines = [
             '# This file is autogenerated. Don\'t modify it directly. Instead, if you want to add '
             'your custom variables, do it through the configuration files. See documentation.'
@@ -64,15 +148,19 @@ class ProcessExecutor:
         for var in variables:
             dotenv_lines.append(f"{var}={variables[var]}")
         dotenv_content = "\n".join(dotenv_lines)
-        with open(self.config.get_project_env_path() + os.sep + '.env', "w", encoding='utf8')\
-                as text_file:
-            text_file.write(dotenv_content)
+        with tracing.span('dotenv.write', path=self.__get_dotenv_path()) as span_args:
+            span_args['changed'] = write_file_if_changed(self.__get_dotenv_path(), dotenv_content)
 
-    def env_start(self) -> None:
-        """Start the current environment.
+        manifest.save(inputs_hash, outputs, commands_mounts)
+        return True
+
+    def env_start(self, services: list[str] | None = None) -> None:
+        """Start the current environment, or only the given services.
         """
         command = self.get_command_base()
         command.extend(['up', '-d'])
+        if services:
+            command.extend(services)
         self.execute(command)
 
     def env_freeze(self) -> None:
@@ -89,6 +177,38 @@ class ProcessExecutor:
         command.extend(['down', '-v'])
         self.execute(command)
 
+    def get_recipe(self) -> 'ComposeRecipe | None':
+        """Returns the recipe of the current environment, or None if it doesn't have one.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from dk.compose_manager import ComposeRecipe
+
+        recipe_path = self.config.get_project_scan().recipes.get(self.config.get_project_env())
+        if recipe_path is None:
+            return None
+        with tracing.span('recipe.load', path=recipe_path):
+            recipe_content = yaml_io.load_file(recipe_path)
+        return ComposeRecipe(recipe_content, recipe_path, self.config.get_project_env_path())
+
+    def get_build_outputs(self) -> list[str]:
+        """Returns the paths of the files written by the build.
+        """
+        return [
+            self.__get_compose_path(),
+            self.__get_dotenv_path(),
+            self.__get_build_manifest_path(),
+            get_lockfile_path(self.config),
+            get_default_env_path(self.config),
+        ]
+
+    def get_services(self) -> list[str]:
+        """Returns the names of the services of the built environment.
+        """
+        compose_path = self.__get_compose_path()
+        if not os.path.exists(compose_path):
+            return []
+        return list((yaml_io.load_file(compose_path) or {}).get('services') or {})
+
     def env_compose(self, arguments: list[str]|None = None) -> None:
         """Runs docker compose with custom arguments.
         """
@@ -119,7 +239,11 @@ class ProcessExecutor:
         # the container, or on the host.
         # @todo Figure out why that's the case and write an explanation here.
         stdin = sys.stdin if pass_stdin else DEVNULL if container else None
-        result = run(command, check=False, stdin=stdin, env=variables)
+        started = time.monotonic()
+        with tracing.span('subprocess', argv=command) as span_args:
+            result = run(command, check=False, stdin=stdin, env=variables)
+            span_args['exit_code'] = result.returncode
+        stats.add_subprocess_time(time.monotonic() - started)
         return result.returncode
 
     def execute_pipe(
@@ -141,11 +265,17 @@ class ProcessExecutor:
 
         stdin = previous_process.stdout if previous_process else default_stdin
 
-        with Popen(
-            first_command, stdout=stdout, stderr=sys.stderr, stdin=stdin
-        ) as process:
-            if commands:
-                self.execute_pipe(commands, process)
+        started = time.monotonic()
+        with tracing.span('subprocess', argv=first_command) as span_args:
+            with Popen(
+                first_command, stdout=stdout, stderr=sys.stderr, stdin=stdin
+            ) as process:
+                if commands:
+                    self.execute_pipe(commands, process)
+            span_args['exit_code'] = process.returncode
+        # Processes in the chain run at the same time, so only the first one is counted.
+        if not previous_process:
+            stats.add_subprocess_time(time.monotonic() - started)
 
     def execute_inside_container(
             self,
@@ -160,42 +290,205 @@ class ProcessExecutor:
         :param reminder_args:
         :return:
         """
-        service = custom_command.service
+        command, exec_variables = self.get_script_command(
+            custom_command,
+            reminder_args,
+            variables,
+            tty=sys.stdin.isatty(),
+        )
+        return self.execute(command, exec_variables, pass_stdin=True, container=True)
+
+    def get_script_command(
+            self,
+            custom_command: ServiceCommand,
+            reminder_args: list,
+            variables: dict | None = None,
+            service: str | None = None,
+            tty: bool = True,
+    ) -> tuple[list, dict]:
+        """Returns the command running the custom command's script in the given service, or in the
+           command's own service if none is given, together with the variables it needs to be run
+           with. If the script's directory is mounted into the service, and the script is
+           executable, it's run in place. Otherwise, the script is installed in the container, which
+           makes it executable, and if it's too big to be passed in a variable, it's copied into
+           the container right away.
+        """
+        service = service if service else custom_command.service
         script_path = custom_command.cmd
-        script_path_with_draky_root = get_path_up_to_project_root(script_path)
         if variables is None:
             variables = {}
-        # Destination is constant.
-        dest_path = f"/tmp/{script_path_with_draky_root}"
+        if self.config.is_commands_mount_enabled() \
+                and os.access(script_path, os.X_OK) \
+                and self.__is_mounted(service, os.path.dirname(script_path)):
+            command = self.__get_exec_base(custom_command.user, variables, tty)
+            command.extend([service, 'sh', '-c', RUN_MOUNTED_SCRIPT, script_path])
+            command.extend(reminder_args)
+            return command, {}
+
+        with open(script_path, 'rb') as f:
+            script = f.read()
+        # Scripts are stored under a path derived from their content, so they are copied into the
+        # container only if the container doesn't have their current version yet.
+        script_hash = hashlib.sha256(custom_command.user.encode('utf8') + b'\0' + script)
+        dest_path = f"{SCRIPTS_PATH}/draky-{script_hash.hexdigest()[:32]}"
         dest = f"{dest_path}/{pathlib.PurePath(script_path).name}"
-        # Prepare the dir path for the script to be copied.
-        mkdir_command = self.get_command_base()
-        mkdir_command.extend(['exec', '-T', service, 'mkdir',  '-p', dest_path])
-        self.execute(mkdir_command, pass_stdin=False, container=True)
-
-        # Copy script into container to avoid having to pipe commands, as that would disable
-        # coloring.
-        copy_command = self.get_command_base()
-        copy_command.extend([
-            'exec', '-T', service, 'sh', '-c', f"cat > {dest} < /dev/stdin;chmod a+x {dest}"
-        ])
-        self.execute_pipe([['cat', script_path], copy_command])
-
-        # Run the script by using docker's "exec" command.
-        command = self.get_command_base()
-        command.extend(['exec', '-u', custom_command.user])
 
-        # Pass the variables to the container running the command.
+        exec_variables = {}
+        if len(script) <= MAX_INLINE_SCRIPT_SIZE and b'\0' not in script:
+            # The script is installed by the same exec that runs it.
+            exec_variables[SCRIPT_VARIABLE_NAME] = script.decode('utf8', 'surrogateescape')
+        else:
+            # Copy script into container to avoid having to pipe commands, as that would disable
+            # coloring.
+            copy_command = self.get_command_base()
+            copy_command.extend([
+                'exec', '-T', '-u', custom_command.user, service, 'sh', '-c', COPY_SCRIPT, dest
+            ])
+            self.execute_pipe([['cat', script_path], copy_command])
+
+        command = self.__get_exec_base(custom_command.user, [*variables, *exec_variables], tty)
+        command.extend([service, 'sh', '-c', RUN_SCRIPT, dest])
+        command.extend(reminder_args)
+        return command, exec_variables
+
+    def __get_exec_base(self, user: str, variables: Iterable[str], tty: bool) -> list:
+        """Returns the beginning of docker's "exec" command, passing the variables with the given
+           names to the container.
+        """
+        command = self.get_command_base()
+        command.extend(['exec', '-u', user])
         for var in variables:
             command.extend(['-e', var])
-        if not sys.stdin.isatty():
+        if not tty:
             command.extend(['-T'])
-        command.extend([service, dest])
-        command.extend(reminder_args)
-        return self.execute(command, pass_stdin=True, container=True)
+        return command
+
+    def __is_mounted(self, service: str, directory: str) -> bool:
+        """Tells if the built environment mounts the given commands' directory into the service.
+           The mounts are recorded by the build, so the compose file doesn't need to be parsed.
+        """
+        manifest = BuildManifest(self.__get_build_manifest_path(), self.config.version)
+        return directory in manifest.get_commands_mounts().get(service, [])
+
+    def execute_many(
+            self,
+            commands: dict[str, list],
+            variables: dict | None = None,
+            concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> dict[str, int]:
+        """Executes the named commands concurrently, running at most the given number of them at
+           once. Their output is streamed line by line, prefixed with the command's name. Returns
+           the exit codes of the commands, by name.
+        """
+        # Only commands run concurrently need asyncio, so it's not loaded for others.
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        if concurrency < 1:
+            raise ValueError("Concurrency must be a positive number.")
+        started = time.monotonic()
+        with tracing.span('subprocesses', names=list(commands), concurrency=concurrency):
+            exit_codes = asyncio.run(
+                self.__execute_many(commands, variables or {}, concurrency)
+            )
+        stats.add_subprocess_time(time.monotonic() - started)
+        return exit_codes
+
+    async def __execute_many(
+            self,
+            commands: dict[str, list],
+            variables: dict,
+            concurrency: int,
+    ) -> dict[str, int]:
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        semaphore = asyncio.Semaphore(concurrency)
+        width = max((len(name) for name in commands), default=0)
+
+        async def execute_one(name: str, command: list) -> int:
+            async with semaphore:
+                prefix = f"{name.ljust(width)} | ".encode('utf8')
+                with tracing.span('subprocess', argv=command) as span_args:
+                    process = await asyncio.create_subprocess_exec(
+                        *command,
+                        stdin=DEVNULL,
+                        stdout=PIPE,
+                        stderr=STDOUT,
+                        env=variables,
+                    )
+                    await self.__stream_output(process.stdout, prefix)
+                    span_args['exit_code'] = await process.wait()
+                return span_args['exit_code']
+
+        exit_codes = await asyncio.gather(
+            *(execute_one(name, command) for name, command in commands.items())
+        )
+        return dict(zip(commands, exit_codes))
+
+    @staticmethod
+    async def __stream_output(stream: 'StreamReader', prefix: bytes) -> None:
+        """Writes the output read from the stream to stdout, prefixing every line. Complete lines
+           are written at once, so lines of the concurrently run commands don't interleave.
+        """
+        pending = b''
+        while chunk := await stream.read(65536):
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop()
+            if len(pending) >= MAX_OUTPUT_LINE_LENGTH:
+                lines.append(pending)
+                pending = b''
+            if lines:
+                sys.stdout.buffer.write(b''.join(prefix + line + b'\n' for line in lines))
+                sys.stdout.buffer.flush()
+        if pending:
+            sys.stdout.buffer.write(prefix + pending + b'\n')
+            sys.stdout.buffer.flush()
+
+    def __get_build_inputs(
+            self,
+            recipe: 'ComposeRecipe | None',
+            variables: dict,
+            substitute_vars: bool,
+            commands_mounts: dict[str, list[str]],
+    ) -> dict:
+        """Returns everything the result of the build depends on.
+        """
+        hooks_paths = [self.hook_manager.get_hooks_path(a) for a in self.config.get_addons()]
+        return {
+            'version': self.config.version,
+            'recipe': hash_file(recipe.recipe_path) if recipe else None,
+            'extended_files': {
+                path: hash_file(path) for path in recipe.get_extended_files()
+            } if recipe else {},
+            'hooks': {path: hash_file(path) for path in hooks_paths},
+            'variables': variables,
+            'substitute_vars': substitute_vars,
+            'commands_mounts': commands_mounts,
+        }
+
+    def __get_commands_mounts(self, recipe: 'ComposeRecipe | None') -> dict[str, list[str]]:
+        """Returns the directories with the service commands to mount into every service, if
+           mounting them is enabled.
+        """
+        if not recipe or not self.config.is_commands_mount_enabled():
+            return {}
+
+        services = recipe.resolve().compose['services']
+        commands_mounts: dict[str, list[str]] = {}
+        for command in CustomCommandsProvider(self.config).get_commands():
+            if command.service not in services:
+                continue
+            paths = commands_mounts.setdefault(command.service, [])
+            path = os.path.dirname(command.cmd)
+            if path not in paths:
+                paths.append(path)
+
+        return commands_mounts
+
+    def __get_build_manifest_path(self) -> str:
+        return f"{self.config.get_project_env_path()}/.build-manifest.json"
 
-    def __get_recipe_path(self) -> str:
-        return f"{self.config.get_project_env_path()}/docker-compose.recipe.yml"
+    def __get_dotenv_path(self) -> str:
+        return self.config.get_project_env_path() + os.sep + '.env'
 
     def __get_compose_path(self) -> str:
         return f"{self.config.get_project_env_path()}/docker-compose.yml"
@@ -0,0 +1,257 @@
+"""Scanning of the project's configuration directory. Directories excluded by the built-in rules,
+or by the project's .drakyignore file, are pruned, so nothing inside them is ever listed.
+"""
+import os
+import re
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from types import MappingProxyType
+from typing import Iterator, Mapping
+
+from dk import tracing
+
+IGNORE_FILENAME = '.drakyignore'
+CONFIG_FILE_SUFFIX = 'dk.yml'
+COMMAND_FILE_PATTERN = '*.dk.sh'
+COMPANION_FILE_SUFFIX = '.yml'
+HOOKS_FILENAME = 'hooks.py'
+RECIPE_FILENAME = 'docker-compose.recipe.yml'
+ENVIRONMENTS_DIRNAME = 'env'
+
+# Directories that never contain the project's configuration, but may contain lots of files.
+# They are ignored before the project's rules are applied, so the project can re-include them
+# with negated patterns, e.g. "!node_modules/".
+BUILTIN_IGNORE_PATTERNS = [
+    '.git/',
+    '.hg/',
+    '.svn/',
+    'node_modules/',
+    '__pycache__/',
+    '.venv/',
+]
+
+
+def translate_pattern(pattern: str) -> str:
+    """Translates the gitignore-style glob into the regular expression matching the paths
+       relative to the root of the scan.
+    """
+    # Patterns containing a slash, other than the trailing one, are relative to the root.
+    # Other patterns match at any level.
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+    regex = '' if anchored else '(?:.*/)?'
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+            continue
+        if pattern.startswith('/**', i) and i + 3 == len(pattern):
+            regex += '/.*'
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+            continue
+        if char == '*':
+            regex += '[^/]*'
+        elif char == '?':
+            regex += '[^/]'
+        elif char == '\\' and i + 1 < len(pattern):
+            i += 1
+            regex += re.escape(pattern[i])
+        elif char == '[' and (end := pattern.find(']', i + 2)) != -1:
+            content = pattern[i + 1:end]
+            if content[0] == '!':
+                content = '^' + content[1:]
+            regex += '[' + content.replace('\\', '\\\\') + ']'
+            i = end
+        else:
+            regex += re.escape(char)
+        i += 1
+    return regex
+
+
+class IgnoreRules:
+    """Rules excluding files and directories from the scan, in the gitignore syntax. Just like in
+       git, the last matching rule wins, and files inside an excluded directory can't be
+       re-included, because the directory is never listed.
+    """
+
+    def __init__(self, patterns: list[str] | None = None):
+        # Compiled patterns, whether they are negated, and whether they only match directories.
+        self.__rules: list[tuple[re.Pattern, bool, bool]] = []
+        for pattern in patterns or []:
+            self.add(pattern)
+
+    def add(self, line: str) -> None:
+        """Adds the rule from the single line of the ignore file. Empty lines and comments are
+           skipped.
+        """
+        line = line.rstrip('\n')
+        if not line.endswith('\\ '):
+            line = line.rstrip()
+        if not line or line.startswith('#'):
+            return
+
+        negated = line.startswith('!')
+        if negated or line.startswith('\\!') or line.startswith('\\#'):
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            return
+        self.__rules.append((re.compile(translate_pattern(line) + '$'), negated, dir_only))
+
+    def is_ignored(self, path: str, is_dir: bool) -> bool:
+        """Tells if the path, relative to the root of the scan and separated by slashes, is
+           excluded.
+        """
+        ignored = False
+        for regex, negated, dir_only in self.__rules:
+            if ignored == negated and (is_dir or not dir_only) and regex.match(path):
+                ignored = not negated
+        return ignored
+
+    def is_ignored_in_tree(self, path: str, is_dir: bool) -> bool:
+        """Tells if the path is excluded, either directly or because one of its parent directories
+           is. Useful for the paths which haven't been found by the scan, e.g. reported by the file
+           watcher.
+        """
+        parts = path.split('/')
+        for i in range(1, len(parts)):
+            if self.is_ignored('/'.join(parts[:i]), True):
+                return True
+        return self.is_ignored(path, is_dir)
+
+
+def load_ignore_rules(root: str) -> IgnoreRules:
+    """Returns the built-in rules, followed by the rules from the .drakyignore file in the given
+       directory, if it exists.
+    """
+    rules = IgnoreRules(BUILTIN_IGNORE_PATTERNS)
+    try:
+        with open(f"{root}{os.sep}{IGNORE_FILENAME}", 'r', encoding='utf8') as f:
+            for line in f:
+                rules.add(line)
+    except (OSError, UnicodeDecodeError):
+        pass
+    return rules
+
+
+class ProjectScanner:
+    """Walks the directory, skipping everything that is ignored. The number of listed entries is
+       counted, so the cost of the scan can be observed.
+    """
+
+    def __init__(self, root: str, ignore: IgnoreRules | None = None):
+        self.root: str = root
+        self.ignore: IgnoreRules = ignore if ignore is not None else load_ignore_rules(root)
+        self.visited: int = 0
+
+    def walk(self, relative_path: str = '') -> Iterator[tuple[str, list[str], list[str]]]:
+        """Yields the (dirpath, dirnames, filenames) tuples, top-down and in the same order as
+           os.walk() would. Just like os.walk(), symlinked directories are not descended into. If
+           the path relative to the root is given, only that directory is walked, but the rules
+           are still matched against the paths relative to the root.
+        """
+        if not relative_path:
+            yield from self.__walk(self.root, '')
+            return
+        yield from self.__walk(f"{self.root}{os.sep}{relative_path}", f"{relative_path}/")
+
+    def __walk(self, path: str, relative_path: str) -> Iterator[tuple[str, list[str], list[str]]]:
+        dirnames = []
+        filenames = []
+        symlinks = set()
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    self.visited += 1
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if self.ignore.is_ignored(f"{relative_path}{entry.name}", is_dir):
+                        continue
+                    if not is_dir:
+                        filenames.append(entry.name)
+                        continue
+                    dirnames.append(entry.name)
+                    if entry.is_symlink():
+                        symlinks.add(entry.name)
+        except OSError:
+            return
+
+        yield path, dirnames, filenames
+        for dirname in dirnames:
+            if dirname in symlinks:
+                continue
+            yield from self.__walk(f"{path}{os.sep}{dirname}", f"{relative_path}{dirname}/")
+
+
+@dataclass(frozen=True)
+class ProjectScan:
+    """Immutable snapshot of the project's configuration directory, taken in a single scan and
+       shared by everything that needs to know which files the project consists of. Paths are
+       absolute, and in the order of the scan.
+    """
+    configs: tuple[str, ...]
+    # The (dirpath, filename) pairs of the custom commands' files.
+    commands: tuple[tuple[str, str], ...]
+    # Paths of the commands' files which have the companion file.
+    companions: frozenset[str]
+    hooks: frozenset[str]
+    environments: tuple[str, ...]
+    # Paths of the recipes by the environment's name.
+    recipes: Mapping[str, str]
+    # Every scanned directory, starting with the root. Adding, or removing, a file changes the
+    # modification time of its directory.
+    directories: tuple[str, ...]
+
+
+def scan_project(root: str, ignore: IgnoreRules | None = None) -> ProjectScan:
+    """Scans the project's configuration directory once, and classifies every file found in it.
+    """
+    configs = []
+    commands = []
+    companions = set()
+    hooks = set()
+    environments = []
+    recipes = {}
+    directories = []
+    environments_path = f"{root}{os.sep}{ENVIRONMENTS_DIRNAME}"
+
+    with tracing.span('project.scan', path=root) as span_args:
+        scanner = ProjectScanner(root, ignore)
+        for path, dirnames, filenames in scanner.walk():
+            directories.append(path)
+            if path == environments_path:
+                environments = sorted(dirnames)
+            in_environment = os.path.dirname(path) == environments_path
+            filenames_set = set(filenames)
+            for filename in filenames:
+                file_path = f"{path}{os.sep}{filename}"
+                if filename.endswith(CONFIG_FILE_SUFFIX):
+                    configs.append(file_path)
+                elif fnmatch(filename, COMMAND_FILE_PATTERN):
+                    commands.append((path, filename))
+                    if filename + COMPANION_FILE_SUFFIX in filenames_set:
+                        companions.add(file_path)
+                elif filename == HOOKS_FILENAME:
+                    hooks.add(file_path)
+                elif filename == RECIPE_FILENAME and in_environment:
+                    recipes[os.path.basename(path)] = file_path
+        span_args['visited'] = scanner.visited
+
+    return ProjectScan(
+        configs=tuple(configs),
+        commands=tuple(commands),
+        companions=frozenset(companions),
+        hooks=frozenset(hooks),
+        environments=tuple(environments),
+        recipes=MappingProxyType(recipes),
+        directories=tuple(directories),
+    )
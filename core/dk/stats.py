@@ -0,0 +1,192 @@
+"""Statistics of the core's invocations, stored to spot slow commands and regressions.
+
+This module is imported before anything else, so it should stay lightweight and depend only on the
+standard library.
+"""
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+# The store is compacted to the newest half of its records when it grows above this size.
+MAX_STORE_SIZE = 1024 * 1024
+
+# Time when the current process has started, as far as this module can tell.
+STARTED = time.monotonic()
+
+# Time spent by the current process waiting for subprocesses, in seconds.
+__subprocess_time: list[float] = [0.0]
+
+
+class StatsStore:
+    """Stores records of the invocations as JSON lines. The store's size is bounded, so only the
+       newest records are kept.
+    """
+
+    def __init__(self, path: str, max_size: int = MAX_STORE_SIZE):
+        self.path: str = path
+        self.max_size: int = max_size
+
+    def append(self, record: dict) -> None:
+        """Appends the record to the store. Statistics are only informative, so failures are
+           silently ignored.
+        """
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Lines are appended in a single write, so concurrent invocations don't mix them up.
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line.encode('utf8'))
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            if size > self.max_size:
+                self.__compact()
+        except OSError:
+            pass
+
+    def load(self, since: float = 0.0) -> list[dict]:
+        """Returns the records of the invocations started at the given timestamp or later.
+        """
+        records = []
+        try:
+            with open(self.path, 'r', encoding='utf8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict) and record.get('time', 0) >= since:
+                        records.append(record)
+        except OSError:
+            pass
+        return records
+
+    def __compact(self) -> None:
+        """Keeps only the newer half of the records.
+        """
+        with open(self.path, 'r', encoding='utf8') as f:
+            lines = f.readlines()
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf8') as f:
+            f.writelines(lines[len(lines) // 2:])
+        os.replace(tmp_path, self.path)
+
+
+def get_stats_store() -> StatsStore | None:
+    """Returns the store of the statistics. It's kept in the global config directory. Returns None
+       if the store is not available in the current context.
+    """
+    if 'DRAKY_GLOBAL_CONFIG_ROOT' not in os.environ:
+        return None
+    return StatsStore(f"{os.environ['DRAKY_GLOBAL_CONFIG_ROOT']}/stats/invocations.jsonl")
+
+
+def add_subprocess_time(seconds: float) -> None:
+    """Adds the time the current process has spent waiting for a subprocess.
+    """
+    __subprocess_time[0] += seconds
+
+
+@contextmanager
+def record_invocation(command: str, env: str | None, project: str | None) -> Iterator[None]:
+    """Records the invocation of the given command, which is run within the wrapped block, in the
+       stats store.
+    """
+    exit_code = 0
+    try:
+        yield
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+        raise
+    except BaseException:
+        exit_code = 1
+        raise
+    finally:
+        store = get_stats_store()
+        if store:
+            store.append({
+                'time': time.time(),
+                'command': command,
+                'env': env,
+                'project': project,
+                'version': os.environ.get('DRAKY_VERSION'),
+                'wall': round(time.monotonic() - STARTED, 6),
+                'subprocess': round(__subprocess_time[0], 6),
+                'exit_code': exit_code,
+            })
+
+
+def get_command_name(argv: list[str]) -> str:
+    """Returns the name under which the invocation with the given arguments is recorded.
+    """
+    if len(argv) < 2:
+        return 'help'
+    if argv[1] in ('env', 'core'):
+        return ' '.join(argv[1:3])
+    return argv[1]
+
+
+@dataclass(frozen=True)
+class Summary:
+    """Dataclass storing the summary of the wall times of a group of invocations, in seconds.
+    """
+    count: int
+    failed: int
+    p50: float
+    p95: float
+    max: float
+    subprocess_p50: float
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Returns the given percentile of the sorted values, using the nearest-rank method.
+    """
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(records: Iterable[dict], key: str) -> dict[str, Summary]:
+    """Summarizes the records grouped by the value of the given key.
+    """
+    groups: dict[str, list[dict]] = {}
+    for record in records:
+        groups.setdefault(str(record.get(key)), []).append(record)
+
+    summaries = {}
+    for name in sorted(groups):
+        group = groups[name]
+        wall = sorted(float(r.get('wall', 0)) for r in group)
+        subprocess = sorted(float(r.get('subprocess', 0)) for r in group)
+        summaries[name] = Summary(
+            count=len(group),
+            failed=sum(1 for r in group if r.get('exit_code')),
+            p50=percentile(wall, 0.5),
+            p95=percentile(wall, 0.95),
+            max=wall[-1],
+            subprocess_p50=percentile(subprocess, 0.5),
+        )
+    return summaries
+
+
+def print_summaries(title: str, summaries: dict[str, Summary], file=None) -> None:
+    """Prints the summaries as a table.
+    """
+    width = max([len(title), *(len(name) for name in summaries)])
+    print(
+        f"{title:<{width}}  {'runs':>6}  {'failed':>6}  {'p50':>8}  {'p95':>8}  {'max':>8}"
+        f"  {'sub p50':>8}",
+        file=file,
+    )
+    for name, summary in summaries.items():
+        print(
+            f"{name:<{width}}  {summary.count:>6}  {summary.failed:>6}  {summary.p50:>7.3f}s"
+            f"  {summary.p95:>7.3f}s  {summary.max:>7.3f}s  {summary.subprocess_p50:>7.3f}s",
+            file=file,
+        )
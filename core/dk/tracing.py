@@ -0,0 +1,106 @@
+"""Tracing of the time spent in the phases of a single invocation of the core.
+
+Tracing is enabled by setting the DRAKY_TRACE variable to the path of the trace file. Spans are
+appended to it in the Chrome trace format, which can be opened in "chrome://tracing" or in
+Perfetto. Every invocation appends its own spans, so a single file can hold the trace of the whole
+command, including the internal commands the wrapper runs before it.
+
+This module is imported before anything else, so it should stay lightweight and depend only on the
+standard library.
+"""
+import atexit
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterator
+
+TRACE_ENV_NAME = 'DRAKY_TRACE'
+
+
+class Tracer:
+    """Records timed spans, and writes them to the trace file when the process exits.
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.pid: int = os.getpid()
+        self.start: int = self.__now()
+        self.events: list[dict] = [{
+            'name': 'process_name',
+            'ph': 'M',
+            'pid': self.pid,
+            'tid': self.pid,
+            'args': {'name': f"dk-core {' '.join(sys.argv[1:])}"},
+        }]
+
+    @contextmanager
+    def span(self, name: str, **args) -> Iterator[dict]:
+        """Records the span covering the execution of the wrapped block. The returned dictionary
+           holds the span's arguments, and may be updated within the block, e.g. with its result.
+        """
+        start = self.__now()
+        try:
+            yield args
+        finally:
+            self.add_span(name, start, self.__now() - start, args)
+
+    def add_span(self, name: str, start: int, duration: int, args: dict) -> None:
+        """Adds the span starting at the given time, in microseconds since the epoch.
+        """
+        self.events.append({
+            'name': name,
+            'cat': name.split('.', 1)[0],
+            'ph': 'X',
+            'ts': start,
+            'dur': duration,
+            'pid': self.pid,
+            'tid': self.pid,
+            'args': args,
+        })
+
+    def flush(self) -> None:
+        """Adds the span covering the whole process, and appends all spans to the trace file.
+           Tracing must never break the command, so failures are only reported.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        import json
+
+        self.add_span('process', self.start, self.__now() - self.start, {'argv': sys.argv})
+        content = ''.join(f"{json.dumps(event, default=str)},\n" for event in self.events)
+        self.events.clear()
+        try:
+            with open(self.path, 'a', encoding='utf8') as f:
+                # The closing bracket of the array is optional in this format, so spans can be
+                # appended to the file by every process.
+                if f.tell() == 0:
+                    content = '[\n' + content
+                f.write(content)
+        except OSError as e:
+            print(f"Could not write the trace to '{self.path}': {e}", file=sys.stderr)
+
+    @staticmethod
+    def __now() -> int:
+        return time.time_ns() // 1000
+
+
+# The tracer of the current process, or None if tracing is disabled.
+__tracer: Tracer | None = None
+if os.environ.get(TRACE_ENV_NAME):
+    __tracer = Tracer(os.path.abspath(os.environ[TRACE_ENV_NAME]))
+    atexit.register(__tracer.flush)
+
+
+def get_tracer() -> Tracer | None:
+    """Returns the tracer of the current process, or None if tracing is disabled.
+    """
+    return __tracer
+
+
+def span(name: str, **args):
+    """Returns the context manager recording the span with the given name and arguments. If
+       tracing is disabled, it does nothing.
+    """
+    if __tracer is None:
+        return nullcontext({})
+    return __tracer.span(name, **args)
@@ -1,13 +1,15 @@
 """Utilities.
 """
-import io
 import os
 import pathlib
+import shutil
 from fnmatch import fnmatch
-
-from dotenv import dotenv_values
+from typing import Mapping
 
 from dk.config import Config
+from dk.config_client import INTERNAL_ENV_NAMES
+from dk.scanner import ProjectScanner
+from dk.variables import ENVIRONMENT_ORIGIN, VariableLayers
 
 
 def find_files_weighted_by_path(pattern: str, weights: dict, search_path: str) -> list:
@@ -19,7 +21,7 @@ def find_files_weighted_by_path(pattern: str, weights: dict, search_path: str) -
     :return: list
     """
     files_by_weight = {}
-    for path, _, files in os.walk(search_path):
+    for path, _, files in ProjectScanner(search_path).walk():
         weight = weights.get(path) or 0
         for filename in files:
             if fnmatch(filename, pattern):
@@ -57,19 +59,62 @@ def dict_to_env_string(dictionary: dict[str, str]) -> str:
         output += f"{key}={value}\n"
     return output
 
+def write_file_if_changed(path: str, content: str) -> bool:
+    """Writes the content to the file, unless the file already has exactly the same content. That
+       way the file's modification time changes only if the content does. The file is replaced
+       atomically, so readers never see it partially written. Returns True if the file has been
+       written.
+    """
+    try:
+        with open(path, 'r', encoding='utf8') as f:
+            if f.read() == content:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf8') as f:
+            f.write(content)
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return True
+
 DRAKY_PREFIX = 'DRAKY_'
 
-def get_env_vars_dict() -> dict[str, str]:
-    """Returns a dictionary of draky-related environment variables that are available.
+def get_env_vars_dict(environment: Mapping[str, str] | None = None) -> dict[str, str]:
+    """Returns a dictionary of draky-related environment variables that are available. Variables
+       are taken from the given environment, or from the process' one if none is given. Variables
+       configuring only the core's process, e.g. tracing, are left out.
     """
-    return {k: v for k, v in os.environ.items() if k.startswith(DRAKY_PREFIX)}
+    if environment is None:
+        environment = os.environ
+    return {
+        k: v for k, v in environment.items()
+        if k.startswith(DRAKY_PREFIX) and k not in INTERNAL_ENV_NAMES
+    }
 
-def vars_dict_from_configs(configs: list[Config]) -> dict[str, str]:
-    """Loads variables.
+def vars_layers_from_configs(
+        configs: list[Config],
+        interpolate: bool = True,
+        environment: Mapping[str, str] | None = None,
+) -> VariableLayers:
+    """Merges variables of the given configs, in order, and the draky-related environment
+       variables on top of them. Environment variables are taken from the given environment, or
+       from the process' one if none is given.
     """
-    env_content_list: list[str] = []
+    layers = VariableLayers(interpolate, environment)
     for config in configs:
-        env_content_list.append(dict_to_env_string(config.variables))
+        layers.add(config.variables, config.path)
     # Add to the dictionary all existing variables that start with the prefix.
-    env_content_list.append(dict_to_env_string(get_env_vars_dict()))
-    return dotenv_values(stream=io.StringIO("\n".join(env_content_list)))
+    layers.add(get_env_vars_dict(environment), ENVIRONMENT_ORIGIN)
+    return layers
+
+def vars_dict_from_configs(configs: list[Config]) -> dict[str, str]:
+    """Loads variables.
+    """
+    return vars_layers_from_configs(configs).values
@@ -0,0 +1,40 @@
+"""Merging of variables defined in layers.
+"""
+import os
+from collections import ChainMap
+from typing import Mapping
+
+from dk.interpolation import Interpolator
+
+# Origin of the variables taken from the process' environment.
+ENVIRONMENT_ORIGIN = 'environment'
+# Origin of the variables set by draky itself.
+BUILTIN_ORIGIN = 'draky'
+
+
+class VariableLayers:
+    """Merges layers of variables. Every layer overrides variables set by the previous ones, and the
+       origin of every final value is recorded.
+    """
+
+    def __init__(self, interpolate: bool = True, environment: Mapping[str, str] | None = None):
+        self.values: dict[str, str] = {}
+        self.origins: dict[str, str] = {}
+        self.__interpolate: bool = interpolate
+        # References are resolved against the values set so far, and then against the given
+        # environment, or the process' one.
+        self.__lookup: ChainMap = ChainMap(
+            self.values, os.environ if environment is None else environment
+        )
+
+    def add(self, variables: dict, origin: str) -> None:
+        """Adds the layer of variables. If interpolation is enabled, references to other variables
+           are resolved leniently, so references to unknown variables are replaced with empty
+           strings.
+        """
+        for name, value in variables.items():
+            value = str(value)
+            if self.__interpolate and '$' in value:
+                value = Interpolator(self.__lookup, strict=False).interpolate(value)
+            self.values[name] = value
+            self.origins[name] = origin
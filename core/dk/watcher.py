@@ -0,0 +1,223 @@
+"""Watching files for changes. inotify is used when it's available, and polling otherwise.
+"""
+import ctypes
+import os
+import select
+import struct
+import time
+from abc import ABC, abstractmethod
+
+from dk.scanner import IgnoreRules, ProjectScanner
+
+# inotify's flags, as defined in <sys/inotify.h>.
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF
+)
+
+EVENT_HEADER = struct.Struct('iIII')
+
+# Changes coming within this time, in seconds, from the previous one are handled together.
+DEBOUNCE_DEFAULT = 0.3
+# Interval between scans of the files, in seconds, when polling.
+POLL_INTERVAL_DEFAULT = 1.0
+
+
+class Watcher(ABC):
+    """Watches directories for changes of the files in them.
+    """
+
+    @abstractmethod
+    def watch(self, path: str, recursive: bool = True, ignore: IgnoreRules | None = None) -> None:
+        """Starts watching the directory, if it's not watched yet. If it's watched recursively,
+           files and directories excluded by the rules, matched against the paths relative to the
+           directory, are neither watched nor reported. Watching it again replaces its rules.
+        """
+
+    @abstractmethod
+    def wait(self, timeout: float | None = None) -> set[str]:
+        """Waits for changes, at most for the given time in seconds, and returns the paths of the
+           changed files. If the timeout passes, an empty set is returned.
+        """
+
+    def close(self) -> None:
+        """Releases the resources used by the watcher.
+        """
+
+    def wait_for_changes(self, debounce: float = DEBOUNCE_DEFAULT) -> set[str]:
+        """Waits for changes, and returns the paths of the changed files once no more changes
+           have come for the debounce time, so bursts of changes are handled at once.
+        """
+        changes = set()
+        while not changes:
+            changes = self.wait()
+        while more_changes := self.wait(debounce):
+            changes |= more_changes
+        return changes
+
+
+class InotifyWatcher(Watcher):
+    """Watches directories with inotify. Directories created in the watched directories are
+       watched too.
+    """
+
+    def __init__(self):
+        self.__libc = ctypes.CDLL(None, use_errno=True)
+        self.__fd: int = self.__libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.__fd < 0:
+            raise OSError(ctypes.get_errno(), "Could not initialize inotify.")
+        # Watched directories by the watch descriptor, and the directory watched recursively they
+        # belong to, if any.
+        self.__watches: dict[int, tuple[str, str | None]] = {}
+        self.__paths: dict[str, int] = {}
+        # Rules of the directories watched recursively.
+        self.__ignore: dict[str, IgnoreRules] = {}
+
+    def watch(self, path: str, recursive: bool = True, ignore: IgnoreRules | None = None) -> None:
+        if not recursive:
+            self.__add_watch(path, None)
+            return
+        self.__ignore[path] = ignore if ignore is not None else IgnoreRules()
+        self.__watch_tree(path, '')
+
+    def wait(self, timeout: float | None = None) -> set[str]:
+        readable, _, _ = select.select([self.__fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changes = set()
+        try:
+            buffer = os.read(self.__fd, 64 * 1024)
+        except BlockingIOError:
+            return changes
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = buffer[offset:offset + length].rstrip(b'\0').decode('utf8', 'surrogateescape')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Some events have been lost, so every watched directory could have changed.
+                changes.update(path for path, _ in self.__watches.values())
+                continue
+            if wd not in self.__watches:
+                continue
+            dirpath, root = self.__watches[wd]
+            if mask & IN_IGNORED:
+                del self.__watches[wd]
+                self.__paths.pop(dirpath, None)
+                continue
+            path = f"{dirpath}/{name}" if name else dirpath
+            if name and root is not None:
+                relative_path = os.path.relpath(path, root).replace(os.sep, '/')
+                # Directories watched before the rules have changed may still report changes.
+                if self.__ignore[root].is_ignored_in_tree(relative_path, bool(mask & IN_ISDIR)):
+                    continue
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    self.__watch_tree(root, relative_path)
+            changes.add(path)
+        return changes
+
+    def close(self) -> None:
+        if self.__fd >= 0:
+            os.close(self.__fd)
+            self.__fd = -1
+
+    def __watch_tree(self, root: str, relative_path: str) -> None:
+        for dirpath, _, _ in ProjectScanner(root, self.__ignore[root]).walk(relative_path):
+            self.__add_watch(dirpath, root)
+
+    def __add_watch(self, path: str, root: str | None) -> None:
+        if path in self.__paths:
+            return
+        wd = self.__libc.inotify_add_watch(self.__fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            # The directory may have been removed in the meantime.
+            return
+        self.__watches[wd] = (path, root)
+        self.__paths[path] = wd
+
+
+class PollingWatcher(Watcher):
+    """Watches directories by scanning them periodically. It works everywhere, including file
+       systems on which inotify doesn't report changes, e.g. mounted from another machine.
+    """
+
+    def __init__(self, interval: float = POLL_INTERVAL_DEFAULT):
+        self.interval: float = interval
+        # Watched directories, whether they are watched recursively, and their rules.
+        self.__watched: dict[str, tuple[bool, IgnoreRules]] = {}
+        self.__snapshot: dict[str, tuple[int, int, int]] = {}
+
+    def watch(self, path: str, recursive: bool = True, ignore: IgnoreRules | None = None) -> None:
+        already_watched = path in self.__watched
+        self.__watched[path] = (recursive, ignore if recursive and ignore else IgnoreRules())
+        # Files of the directory watched again are compared with the previous scan by the next
+        # wait, so their changes made in the meantime aren't missed.
+        if not already_watched:
+            self.__snapshot.update(self.__scan(path, *self.__watched[path]))
+
+    def wait(self, timeout: float | None = None) -> set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = {}
+            for path, (recursive, ignore) in self.__watched.items():
+                snapshot.update(self.__scan(path, recursive, ignore))
+            changes = {
+                path for path in snapshot.keys() | self.__snapshot.keys()
+                if snapshot.get(path) != self.__snapshot.get(path)
+            }
+            self.__snapshot = snapshot
+            if changes:
+                return changes
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            sleep_time = self.interval
+            if deadline is not None:
+                sleep_time = min(sleep_time, max(0.0, deadline - time.monotonic()))
+            time.sleep(sleep_time)
+
+    @staticmethod
+    def __scan(path: str, recursive: bool, ignore: IgnoreRules) -> dict[str, tuple[int, int, int]]:
+        snapshot = {}
+        for dirpath, dirnames, filenames in ProjectScanner(path, ignore).walk():
+            for filename in filenames:
+                file_path = f"{dirpath}/{filename}"
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                snapshot[file_path] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            # Directories are included, so their creation is noticed even if they are empty. Their
+            # modification time isn't, as it changes also when ignored files are added in them.
+            for dirname in dirnames:
+                snapshot[f"{dirpath}/{dirname}"] = (0, 0, 0)
+            if not recursive:
+                break
+        return snapshot
+
+
+def create_watcher(poll: bool = False) -> Watcher:
+    """Creates the inotify watcher if it's available, and the polling watcher otherwise, or if
+       polling is requested.
+    """
+    if not poll:
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher()
@@ -0,0 +1,43 @@
+"""Reading and writing YAML. The LibYAML-based loader and dumper are used when PyYAML has been built
+   with them, as they are much faster than the pure-Python ones.
+"""
+import os
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper  # type: ignore[assignment]
+
+YAMLError = yaml.YAMLError
+
+# Parsed files, together with the metadata identifying their version.
+__files: dict[str, tuple[tuple[int, int, int], object]] = {}
+
+
+def load(stream):
+    """Parses the YAML document from the given string or stream.
+    """
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def dump(data, **kwargs) -> str:
+    """Returns the YAML representation of the data.
+    """
+    return yaml.dump(data, Dumper=SafeDumper, **kwargs)
+
+
+def load_file(path: str):
+    """Returns the parsed content of the file. Every file is parsed only once per process, unless
+       it's modified. The content is shared, so it must not be modified.
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    cached = __files.get(path)
+    if cached is None or cached[0] != key:
+        with open(path, 'r', encoding='utf8') as stream:
+            cached = (key, load(stream))
+        __files[path] = cached
+
+    return cached[1]
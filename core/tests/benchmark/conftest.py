@@ -0,0 +1,148 @@
+"""Fixtures generating synthetic projects for benchmarks.
+"""
+import os
+
+import pytest
+
+try:
+    import pytest_benchmark  # pylint: disable=unused-import
+except ImportError:
+    # Benchmarks require the pytest-benchmark plugin.
+    collect_ignore_glob = ['test_*.py']
+
+
+# Hooks of the generated addons. Both hooks do some work for every service.
+ADDON_HOOKS = """
+def alter_service(name, service, utils, addon):
+    service.setdefault('labels', {})[f"{addon.id}.name"] = utils.substitute_variables(
+        name + "-${DRAKY_PROJECT_ID}"
+    )
+
+def alter_compose(compose, utils, addon):
+    for service in compose['services'].values():
+        service['labels'][f"{addon.id}.services"] = str(len(compose['services']))
+"""
+
+
+def generate_configs(project_path: str, count: int, chain_length: int = 10) -> None:
+    """Generates config files spread over nested directories. Configs are grouped into dependency
+       chains of the given length.
+    """
+    for i in range(count):
+        config_dir = f"{project_path}/services/service{i // 10}/config{i % 10}"
+        os.makedirs(config_dir, exist_ok=True)
+        lines = [f"id: config{i}", 'variables:']
+        lines.extend(f"  CONFIG_{i}_VAR_{j}: value-{i}-{j}" for j in range(10))
+        if i % chain_length:
+            lines.extend(['dependencies:', f"  - config{i - 1}"])
+        with open(f"{config_dir}/config{i}.dk.yml", 'w', encoding='utf8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+def generate_commands(project_path: str, count: int, services: int = 5) -> None:
+    """Generates custom commands spread over the project's directories. Commands are assigned to
+       the given number of services, and every other command has a companion file.
+    """
+    for i in range(count):
+        if i % 2:
+            commands_path = f"{project_path}/commands"
+        else:
+            commands_path = f"{project_path}/services/service{i % services}/commands"
+        os.makedirs(commands_path, exist_ok=True)
+        command_path = f"{commands_path}/command{i}.service{i % services}.dk.sh"
+        with open(command_path, 'w', encoding='utf8') as f:
+            f.write(f"#!/usr/bin/env sh\necho command{i}\n")
+        if i % 2:
+            with open(f"{command_path}.yml", 'w', encoding='utf8') as f:
+                f.write(f"help: Command {i}.\nuser: '1000'\n")
+
+
+def generate_recipe(
+        project_path: str,
+        services: int,
+        shared_files: int = 5,
+        addons: int = 0,
+) -> str:
+    """Generates the recipe of the default environment. Services extend services defined in the
+       given number of shared files, and use the given number of addons. Returns the recipe's path.
+    """
+    addon_ids = [f"addon{i}" for i in range(addons)]
+    for addon_id in addon_ids:
+        addon_path = f"{project_path}/addons/{addon_id}"
+        os.makedirs(addon_path, exist_ok=True)
+        with open(f"{addon_path}/{addon_id}.addon.dk.yml", 'w', encoding='utf8') as f:
+            f.write(f"id: {addon_id}\n")
+        with open(f"{addon_path}/hooks.py", 'w', encoding='utf8') as f:
+            f.write(ADDON_HOOKS)
+
+    for i in range(shared_files):
+        shared_path = f"{project_path}/services/shared{i}"
+        os.makedirs(shared_path, exist_ok=True)
+        lines = ['volumes:', f"  shared{i}-data:", 'services:']
+        for j in range(services // shared_files + 1):
+            lines.extend([
+                f"  service{j}:",
+                '    image: "${IMAGE}"',
+                '    build:',
+                '      context: ./context',
+                '      dockerfile: ./Dockerfile',
+                '    volumes:',
+                '      - ./resources:/resources',
+                f"      - shared{i}-data:/data",
+                '    environment:',
+            ])
+            lines.extend(f"      VAR_{k}: value-{k}" for k in range(20))
+            if addon_ids:
+                lines.extend(['    draky:', '      addons:'])
+                lines.extend(f"        - {addon_id}" for addon_id in addon_ids)
+        with open(f"{shared_path}/services.yml", 'w', encoding='utf8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    lines = ['services:']
+    for i in range(services):
+        lines.extend([
+            f"  service{i}:",
+            '    extends:',
+            f"      file: ../../services/shared{i % shared_files}/services.yml",
+            f"      service: service{i // shared_files}",
+        ])
+    recipe_path = f"{project_path}/env/dev/docker-compose.recipe.yml"
+    with open(recipe_path, 'w', encoding='utf8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return recipe_path
+
+
+@pytest.fixture(name='make_project')
+def fixture_make_project(tmp_path, monkeypatch):
+    """Returns a function creating a synthetic project and setting up the environment the core
+       expects to run in.
+    """
+    def make_project(
+            configs: int = 0,
+            services: int = 0,
+            addons: int = 0,
+            commands: int = 0,
+    ) -> str:
+        project_path = tmp_path / 'project' / '.draky'
+        (project_path / 'env' / 'dev').mkdir(parents=True)
+        (project_path / 'core.dk.yml').write_text(
+            "variables:\n"
+            "    DRAKY_PROJECT_ID: benchmark\n"
+            "    IMAGE: benchmark-image\n",
+            encoding='utf8',
+        )
+        generate_configs(str(project_path), configs)
+        if services:
+            generate_recipe(str(project_path), services, addons=addons)
+        generate_commands(str(project_path), commands)
+
+        global_config_path = tmp_path / 'global-config'
+        global_config_path.mkdir()
+        for name in [k for k in os.environ if k.startswith('DRAKY_')]:
+            monkeypatch.delenv(name)
+        monkeypatch.setenv('DRAKY_VERSION', 'benchmark')
+        monkeypatch.setenv('DRAKY_GLOBAL_CONFIG_ROOT', str(global_config_path))
+        monkeypatch.setenv('DRAKY_PROJECT_CONFIG_ROOT', str(project_path))
+        return str(project_path)
+
+    return make_project
@@ -0,0 +1,62 @@
+"""Environment build benchmarks.
+"""
+from dk.compose_manager import ComposeManager
+from dk.config_manager import ConfigManager
+from dk.hook_manager import HookManager
+from dk.process_executor import ProcessExecutor
+
+from test_compose import load_recipe
+
+SERVICES_COUNT = 60
+ADDONS_COUNT = 2
+
+
+def create_process_executor() -> ProcessExecutor:
+    """Creates the process executor for the current project.
+    """
+    config_manager = ConfigManager()
+    return ProcessExecutor(
+        config_manager,
+        ComposeManager(config_manager),
+        HookManager(config_manager),
+    )
+
+
+def test_addon_alter_services(benchmark, make_project) -> None:
+    """Running the hooks of all addons on all services.
+    """
+    project_path = make_project(services=SERVICES_COUNT, addons=ADDONS_COUNT)
+    config_manager = ConfigManager()
+    recipe = load_recipe(project_path)
+    compose_manager = ComposeManager(config_manager)
+
+    def alter_services():
+        compose = compose_manager.create(recipe, f"{project_path}/env/dev/docker-compose.yml")
+        HookManager(config_manager).addon_alter_services(recipe, compose)
+        return compose
+
+    compose = benchmark(alter_services)
+    assert compose.get_service('service0')['labels']['addon0.name'] == 'service0-benchmark'
+
+
+def test_env_build(benchmark, make_project) -> None:
+    """Building the environment from scratch.
+    """
+    make_project(configs=100, services=SERVICES_COUNT, addons=ADDONS_COUNT)
+
+    def env_build():
+        return create_process_executor().env_build(substitute_vars=True, force=True)
+
+    assert benchmark(env_build)
+
+
+def test_env_build_up_to_date(benchmark, make_project) -> None:
+    """Building the environment when nothing has changed since the previous build.
+    """
+    make_project(configs=100, services=SERVICES_COUNT, addons=ADDONS_COUNT)
+    create_process_executor().env_build(substitute_vars=True)
+
+    def env_build():
+        return create_process_executor().env_build(substitute_vars=True)
+
+    assert not benchmark(env_build)
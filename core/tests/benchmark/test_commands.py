@@ -0,0 +1,34 @@
+"""Custom commands benchmarks.
+"""
+from dk.config_manager import ConfigManager
+from dk.custom_commands_provider import CustomCommandsProvider
+
+COMMANDS_COUNT = 500
+
+
+def test_get_command(benchmark, make_project) -> None:
+    """Finding a single command, as running a custom command does, with the index already built.
+    """
+    make_project(commands=COMMANDS_COUNT)
+    config_manager = ConfigManager()
+    CustomCommandsProvider(config_manager).get_commands()
+
+    def get_command():
+        return CustomCommandsProvider(config_manager).get_command('command1')
+
+    command = benchmark(get_command)
+    assert command.help == 'Command 1.'
+
+
+def test_get_commands(benchmark, make_project) -> None:
+    """Getting all commands, as the help does, with the index already built.
+    """
+    make_project(commands=COMMANDS_COUNT)
+    config_manager = ConfigManager()
+    CustomCommandsProvider(config_manager).get_commands()
+
+    def get_commands():
+        return CustomCommandsProvider(config_manager).get_commands()
+
+    commands = benchmark(get_commands)
+    assert len(commands) == COMMANDS_COUNT
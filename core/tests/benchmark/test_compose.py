@@ -0,0 +1,42 @@
+"""Recipe resolution benchmarks.
+"""
+import yaml
+
+from dk.compose_manager import ComposeRecipe
+
+SERVICES_COUNT = 60
+
+
+def load_recipe(project_path: str) -> ComposeRecipe:
+    """Loads the recipe of the default environment.
+    """
+    recipe_path = f"{project_path}/env/dev/docker-compose.recipe.yml"
+    with open(recipe_path, 'r', encoding='utf8') as f:
+        content = yaml.safe_load(f)
+    return ComposeRecipe(content, recipe_path, f"{project_path}/env/dev")
+
+
+def test_recipe_to_compose(benchmark, make_project) -> None:
+    """Converting the recipe with services extending shared files into the compose.
+    """
+    project_path = make_project(services=SERVICES_COUNT)
+
+    def to_compose():
+        return load_recipe(project_path).to_compose('docker-compose.yml', lambda s: s)
+
+    compose = benchmark(to_compose)
+    assert len(compose.list_services()) == SERVICES_COUNT
+
+
+def test_recipe_addons(benchmark, make_project) -> None:
+    """Converting the recipe and getting addons of every service, as the build does.
+    """
+    project_path = make_project(services=SERVICES_COUNT, addons=2)
+
+    def get_all_addons():
+        recipe = load_recipe(project_path)
+        compose = recipe.to_compose('docker-compose.yml', lambda s: s)
+        return [recipe.get_addons(service) for service in compose.list_services()]
+
+    addons = benchmark(get_all_addons)
+    assert addons[0] == ['addon0', 'addon1']
@@ -0,0 +1,91 @@
+"""Config loading benchmarks.
+"""
+import os
+
+from dk.cache import PersistentCache
+from dk.config import fetch_configs
+from dk.config_manager import ConfigManager
+from dk.scanner import IGNORE_FILENAME
+from dk.utils import vars_dict_from_configs
+
+CONFIGS_COUNT = 500
+
+
+def test_fetch_configs_uncached(benchmark, make_project) -> None:
+    """Loading configs without the cache.
+    """
+    project_path = make_project(configs=CONFIGS_COUNT)
+    configs = benchmark(fetch_configs, project_path)
+    assert len(configs) == CONFIGS_COUNT + 1
+
+
+def test_fetch_configs_cold_cache(benchmark, make_project, tmp_path) -> None:
+    """Loading configs when the cache has to be built from scratch.
+    """
+    project_path = make_project(configs=CONFIGS_COUNT)
+    cache = PersistentCache(str(tmp_path / 'configs.json'), 'benchmark')
+
+    def remove_cache():
+        if os.path.exists(cache.path):
+            os.remove(cache.path)
+
+    configs = benchmark.pedantic(
+        fetch_configs, args=(project_path, cache), setup=remove_cache, rounds=10,
+    )
+    assert len(configs) == CONFIGS_COUNT + 1
+
+
+def test_fetch_configs_warm_cache(benchmark, make_project, tmp_path) -> None:
+    """Loading configs when none of them changed since the cache has been stored.
+    """
+    project_path = make_project(configs=CONFIGS_COUNT)
+    cache = PersistentCache(str(tmp_path / 'configs.json'), 'benchmark')
+    fetch_configs(project_path, cache)
+
+    configs = benchmark(fetch_configs, project_path, cache)
+    assert len(configs) == CONFIGS_COUNT + 1
+
+
+def test_fetch_configs_ignored_data(benchmark, make_project) -> None:
+    """Loading configs when the environment holds lots of data excluded by .drakyignore, e.g. a
+       bind-mounted database.
+    """
+    project_path = make_project(configs=CONFIGS_COUNT)
+    for i in range(100):
+        data_path = f"{project_path}/env/dev/data/table{i}"
+        os.makedirs(data_path)
+        for j in range(100):
+            with open(f"{data_path}/part{j}", 'w', encoding='utf8') as f:
+                f.write('data')
+    with open(f"{project_path}/{IGNORE_FILENAME}", 'w', encoding='utf8') as f:
+        f.write('env/*/data/\n')
+
+    configs = benchmark(fetch_configs, project_path)
+    assert len(configs) == CONFIGS_COUNT + 1
+
+
+def test_vars_dict_from_configs(benchmark, make_project) -> None:
+    """Merging variables of all configs.
+    """
+    project_path = make_project(configs=CONFIGS_COUNT)
+    configs = fetch_configs(project_path)
+    variables = benchmark(vars_dict_from_configs, configs)
+    assert len(variables) >= CONFIGS_COUNT * 10
+
+
+def test_config_manager(benchmark, make_project) -> None:
+    """Creating the config manager, as every command does, with the cache already built.
+    """
+    make_project(configs=CONFIGS_COUNT)
+    ConfigManager()
+    config_manager = benchmark(ConfigManager)
+    assert len(config_manager.get_vars()) >= CONFIGS_COUNT * 10
+
+
+def test_config_manager_for_env(benchmark, make_project) -> None:
+    """Switching the config manager to another environment, as building many environments does.
+    """
+    make_project(configs=CONFIGS_COUNT)
+    config_manager = ConfigManager()
+    test_config_manager = benchmark(config_manager.for_env, 'test')
+    assert test_config_manager.get_vars()['DRAKY_ENV'] == 'test'
@@ -0,0 +1,42 @@
+"""Variables interpolation benchmarks.
+"""
+import string
+
+from dk.config_manager import ConfigManager
+from dk.interpolation import compile_template
+
+VARIABLES_COUNT = 200
+REFERENCES_COUNT = 5000
+
+
+def get_variable_name(i: int) -> str:
+    """Returns the name of the i-th variable.
+    """
+    return 'BENCHMARK_' + string.ascii_uppercase[i // 26 % 26] + string.ascii_uppercase[i % 26]
+
+
+def test_resolve_vars_in_compose(benchmark, make_project) -> None:
+    """Substituting variables in a compose file-sized string, as the build does.
+    """
+    project_path = make_project()
+    with open(f"{project_path}/variables.dk.yml", 'w', encoding='utf8') as f:
+        f.write('variables:\n')
+        f.writelines(
+            f"  {get_variable_name(i)}: value{i}\n" for i in range(VARIABLES_COUNT)
+        )
+    config_manager = ConfigManager()
+    compose_string = ''.join(
+        f"    environment: prefix-${{{get_variable_name(i % VARIABLES_COUNT)}}}-suffix\n"
+        for i in range(REFERENCES_COUNT)
+    )
+
+    # Every build substitutes variables in a different string, so compiled templates are not
+    # reused.
+    result = benchmark.pedantic(
+        config_manager.resolve_vars_in_string,
+        args=(compose_string,),
+        setup=compile_template.cache_clear,
+        rounds=20,
+    )
+    assert '${' not in result
+    assert result.count('value0-suffix') == REFERENCES_COUNT // VARIABLES_COUNT
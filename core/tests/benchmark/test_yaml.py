@@ -0,0 +1,40 @@
+"""YAML backends benchmarks.
+"""
+import pytest
+import yaml
+
+from dk.compose_manager import ComposeRecipe
+
+SERVICES_COUNT = 300
+
+BACKENDS = {'python': (yaml.SafeLoader, yaml.SafeDumper)}
+if yaml.__with_libyaml__:
+    BACKENDS['libyaml'] = (yaml.CSafeLoader, yaml.CSafeDumper)
+
+
+@pytest.fixture(name='compose_string')
+def fixture_compose_string(make_project) -> str:
+    """Returns a large compose file, built from a synthetic recipe.
+    """
+    project_path = make_project(services=SERVICES_COUNT)
+    recipe_path = f"{project_path}/env/dev/docker-compose.recipe.yml"
+    with open(recipe_path, 'r', encoding='utf8') as f:
+        recipe = ComposeRecipe(yaml.safe_load(f), recipe_path, f"{project_path}/env/dev")
+    return recipe.to_compose('docker-compose.yml', str).to_string()
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_yaml_load(benchmark, compose_string, backend) -> None:
+    """Parsing a large compose file.
+    """
+    content = benchmark(yaml.load, compose_string, Loader=BACKENDS[backend][0])
+    assert len(content['services']) == SERVICES_COUNT
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_yaml_dump(benchmark, compose_string, backend) -> None:
+    """Dumping a large compose file.
+    """
+    content = yaml.safe_load(compose_string)
+    result = benchmark(yaml.dump, content, Dumper=BACKENDS[backend][1], default_flow_style=False)
+    assert yaml.safe_load(result) == content
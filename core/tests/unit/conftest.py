@@ -0,0 +1,29 @@
+"""Shared fixtures.
+"""
+import os
+
+import pytest
+
+
+@pytest.fixture(name='project_path')
+def fixture_project_path(tmp_path, monkeypatch) -> str:
+    """Creates a minimal project and sets up the environment the core expects to run in.
+    """
+    global_config_path = tmp_path / 'global-config'
+    global_config_path.mkdir()
+    project_path = tmp_path / 'project' / '.draky'
+    (project_path / 'env' / 'dev').mkdir(parents=True)
+    (project_path / 'commands').mkdir()
+    (project_path / 'core.dk.yml').write_text(
+        "variables:\n"
+        "    DRAKY_PROJECT_ID: test-project\n",
+        encoding='utf8',
+    )
+
+    for name in [k for k in os.environ if k.startswith('DRAKY_')]:
+        monkeypatch.delenv(name)
+    monkeypatch.setenv('DRAKY_VERSION', 'test')
+    monkeypatch.setenv('DRAKY_GLOBAL_CONFIG_ROOT', str(global_config_path))
+    monkeypatch.setenv('DRAKY_PROJECT_CONFIG_ROOT', str(project_path))
+
+    return str(project_path)
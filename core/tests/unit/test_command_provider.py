@@ -0,0 +1,23 @@
+"""Commands provider tests.
+"""
+import pytest
+
+from dk.command_provider import CallableCommandsProvider
+
+
+@pytest.mark.parametrize('args, options, rest', [
+    (['--envs', 'dev,test', '-s'], {'--envs': 'dev,test', '--services': None}, ['-s']),
+    (['-s', '--envs=dev'], {'--envs': 'dev', '--services': None}, ['-s']),
+    (['--services=', 'ls'], {'--envs': None, '--services': ''}, ['ls']),
+    (['--services', 'php', 'ls', '--envs', 'dev'],
+     {'--envs': None, '--services': 'php'}, ['ls', '--envs', 'dev']),
+    (['--envs', 'dev', '--', '--services'], {'--envs': 'dev', '--services': None}, ['--services']),
+    (['--envs'], {'--envs': None, '--services': None}, []),
+])
+def test_parse_options(args, options, rest) -> None:
+    """Tests if options are parsed up to the first positional argument, and the rest of the
+       arguments is returned.
+    """
+    # pylint: disable-next=protected-access
+    assert CallableCommandsProvider._parse_options(args, ['--envs', '--services']) == \
+        (options, rest)
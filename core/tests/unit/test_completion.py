@@ -0,0 +1,78 @@
+"""Completion index tests.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from dk.completion import get_completion_index_path, write_completion_index
+from dk.compose_manager import ComposeManager
+from dk.config_manager import ConfigManager
+from dk.core_commands_provider import CoreCommandsProvider
+from dk.custom_commands_provider import CustomCommandsProvider
+from dk.env_commands_provider import EnvCommandsProvider
+from dk.hook_manager import HookManager
+from dk.process_executor import ProcessExecutor
+
+CORE_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_write_completion_index(project_path) -> None:
+    """Tests if the index lists the built-in and custom commands, environments and services, and
+       if it's written only when it changes.
+    """
+    env_path = f"{project_path}/env/dev"
+    os.makedirs(f"{project_path}/env/test")
+    with open(f"{env_path}/docker-compose.recipe.yml", 'w', encoding='utf8') as f:
+        f.write("services:\n  php:\n    image: php-image\n  nginx:\n    image: nginx-image\n")
+    with open(f"{project_path}/commands/command1.dk.sh", 'w', encoding='utf8') as f:
+        f.write("#!/usr/bin/env sh\n")
+    with open(f"{project_path}/commands/command1.dk.sh.yml", 'w', encoding='utf8') as f:
+        f.write("help: |\n  Multi-line\n  help\ttext.\n")
+
+    config_manager = ConfigManager()
+    process_executor = ProcessExecutor(
+        config_manager, ComposeManager(config_manager), HookManager(config_manager)
+    )
+    process_executor.env_build()
+    providers = [
+        EnvCommandsProvider(process_executor, lambda _: None, config_manager),
+        CoreCommandsProvider(lambda _: None),
+    ]
+    custom_commands = CustomCommandsProvider(config_manager).get_commands()
+
+    assert write_completion_index(process_executor, providers, custom_commands)
+    with open(get_completion_index_path(config_manager), encoding='utf8') as f:
+        lines = f.read().splitlines()
+    assert lines[0].startswith('# draky completion index, format 1.')
+    assert 'command\tenv build\tBuild the compose file.' in lines
+    assert 'flag\tenv build\t--force\t0' in lines
+    assert 'flag\tenv exec-all\t--services\t1' in lines
+    assert 'command\tcore stats\tShow statistics of the wall time of recent commands.' in lines
+    assert 'command\tcommand1\tMulti-line help text.' in lines
+    assert [line for line in lines if line.startswith('env\t')] == ['env\tdev', 'env\ttest']
+    assert [line for line in lines if line.startswith('service\t')] == \
+        ['service\tnginx', 'service\tphp']
+
+    assert not write_completion_index(process_executor, providers, custom_commands)
+
+
+@pytest.mark.parametrize('arguments, written', [
+    (['-h'], False),
+    (['env', 'name'], False),
+    (['env', 'build'], True),
+])
+def test_completion_index_written_by_build(project_path, tmp_path, arguments, written) -> None:
+    """Tests if only the commands building the environment write the completion index.
+    """
+    subprocess.run(
+        [sys.executable, f"{CORE_PATH}/dk", *arguments],
+        check=True,
+        capture_output=True,
+        env=os.environ | {
+            'PYTHONPATH': CORE_PATH,
+            'DRAKY_CONFIG_SERVER_SOCKET': str(tmp_path / 'missing.sock'),
+        },
+    )
+    assert os.path.exists(get_completion_index_path(ConfigManager())) == written
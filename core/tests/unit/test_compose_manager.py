@@ -0,0 +1,40 @@
+"""Compose manager tests.
+"""
+import os
+
+import pytest
+
+from dk.compose_manager import ComposeRecipe, ExtendedFilesCache
+
+
+def test_recipe_resolve(tmp_path) -> None:
+    """Tests if the same extended service can be used by multiple services, and if the extended
+       files are read only once.
+    """
+    os.makedirs(tmp_path / 'services' / 'php')
+    os.makedirs(tmp_path / 'env' / 'dev')
+    with open(tmp_path / 'services' / 'php' / 'services.yml', 'w', encoding='utf8') as f:
+        f.write(
+            "services:\n  php:\n    image: php-image\n    volumes:\n      - ./data:/data\n"
+            "    draky:\n      addons:\n        - addon1\n"
+        )
+    content = {'services': {
+        service: {'extends': {'file': '../../services/php/services.yml', 'service': 'php'}}
+        for service in ['php1', 'php2']
+    }}
+    recipe_path = str(tmp_path / 'env' / 'dev' / 'docker-compose.recipe.yml')
+    extended_files = ExtendedFilesCache()
+    recipe = ComposeRecipe(content, recipe_path, str(tmp_path / 'env' / 'dev'), extended_files)
+
+    compose = recipe.to_compose(str(tmp_path / 'env' / 'dev' / 'docker-compose.yml'), str)
+    for service in ['php1', 'php2']:
+        assert compose.get_service(service)['volumes'] == ['../../services/php/./data:/data']
+        assert 'draky' not in compose.get_service(service)
+        assert recipe.get_addons(service) == ['addon1']
+    assert extended_files.get(
+        str(tmp_path / 'env' / 'dev' / '../../services/php/services.yml')
+    )['services']['php']['volumes'] == ['./data:/data']
+    assert recipe.resolve() is recipe.resolve()
+
+    with pytest.raises(ValueError):
+        recipe.get_addons('nginx')
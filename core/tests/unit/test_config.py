@@ -0,0 +1,85 @@
+"""Config loading tests.
+"""
+import os
+
+from dk import yaml_io
+from dk.cache import PersistentCache
+from dk.config import (
+    AddonConfig, BasicConfig, ConfigIndex, ConfigType, fetch_configs, sort_configs_by_dependencies,
+)
+
+
+def write_config(project_path: str, name: str, content: str) -> None:
+    """Creates a config file in the project.
+    """
+    with open(f"{project_path}/{name}.dk.yml", 'w', encoding='utf8') as f:
+        f.write(content)
+
+
+def test_fetch_configs_cache(project_path, tmp_path, monkeypatch) -> None:
+    """Tests if cached configs are equal to the parsed ones, and only changed files are parsed.
+    """
+    write_config(project_path, 'test1', "id: test1\nvariables:\n  TEST_VAR: value1\n")
+    write_config(project_path, 'test2', "id: test2\ndependencies:\n  - test1\n")
+    cache = PersistentCache(str(tmp_path / 'cache.json'), 'test')
+
+    parsed_paths = []
+    load = yaml_io.load
+    def counting_load(stream):
+        parsed_paths.append(stream.name)
+        return load(stream)
+    monkeypatch.setattr(yaml_io, 'load', counting_load)
+
+    cold = fetch_configs(project_path, cache)
+    assert len(parsed_paths) == 3
+
+    parsed_paths.clear()
+    warm = fetch_configs(project_path, cache)
+    assert not parsed_paths
+    assert [c.id for c in warm] == [c.id for c in cold]
+    assert next(c for c in warm if c.id == 'test1').variables == {'TEST_VAR': 'value1'}
+
+    write_config(project_path, 'test1', "id: test1\nvariables:\n  TEST_VAR: value2\n")
+    os.remove(f"{project_path}/test2.dk.yml")
+    configs = fetch_configs(project_path, cache)
+    assert parsed_paths == [f"{project_path}/test1.dk.yml"]
+    assert 'test2' not in [c.id for c in configs]
+    assert next(c for c in configs if c.id == 'test1').variables == {'TEST_VAR': 'value2'}
+
+
+def test_cache_version(tmp_path) -> None:
+    """Tests if cache stored by a different version of draky is discarded.
+    """
+    path = str(tmp_path / 'cache.json')
+    PersistentCache(path, '1.0.0').save({'key': 'value'})
+    assert PersistentCache(path, '1.0.0').load() == {'key': 'value'}
+    assert not PersistentCache(path, '1.1.0').load()
+
+
+def test_config_index() -> None:
+    """Tests if the index gives the same configs as filtering the sorted list would.
+    """
+    configs = [
+        BasicConfig({'id': 'basic1'}, 'basic1.dk.yml'),
+        AddonConfig({'id': 'addon1', 'environments': ['dev']}, 'addon1.addon.dk.yml'),
+        BasicConfig({'id': 'basic2', 'environments': ['prod']}, 'basic2.dk.yml'),
+        AddonConfig({'id': 'addon2', 'dependencies': ['basic1']}, 'addon2.addon.dk.yml'),
+    ]
+    sort_configs_by_dependencies(configs)
+    index = ConfigIndex(configs)
+
+    def paths(configs) -> list[str]:
+        return [c.path for c in configs]
+
+    assert paths(index.all.configs) == paths(configs)
+    for env in ['dev', 'prod', 'test']:
+        view = index.get_view(env)
+        expected = [c for c in configs if not c.environments or env in c.environments]
+        assert paths(view.configs) == paths(expected)
+        assert paths(view.by_type.get(ConfigType.ADDON, ())) ==\
+            paths(c for c in expected if isinstance(c, AddonConfig))
+        assert paths(index.get_env_specific_view(env).configs) ==\
+            paths(c for c in configs if env in c.environments)
+    assert index.get_view('dev').by_id['addon1'] is configs[[c.id for c in configs].index('addon1')]
+    assert 'addon1' not in index.get_view('prod').by_id
+    assert not hasattr(configs[0], '__dict__')
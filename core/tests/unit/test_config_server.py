@@ -0,0 +1,53 @@
+"""Config server tests.
+"""
+import threading
+
+import pytest
+
+from dk.config_client import ConfigClient
+from dk.config_server import ConfigServer
+
+
+@pytest.fixture(name='client')
+def fixture_client(tmp_path, project_path):  # pylint: disable=unused-argument
+    """Starts the config server in a background thread and returns a client connected to it.
+    """
+    socket_path = str(tmp_path / 'server.sock')
+    server = ConfigServer(socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield ConfigClient(socket_path)
+    server.shutdown()
+    server.server_close()
+
+
+def test_server_answers_internal_commands(client, project_path) -> None:
+    """Tests if the server answers the internal commands the same way the core does.
+    """
+    reply = client.query(['get-project-path'])
+    assert reply['exit_code'] == 0
+    assert reply['stdout'] == project_path
+
+    reply = client.query(['get-command-vars'])
+    assert 'DRAKY_PROJECT_ID=test-project' in reply['stdout']
+
+
+def test_server_reloads_state_on_changes(client, project_path) -> None:
+    """Tests if the server notices changes in the configuration files.
+    """
+    assert client.query(['is-local-command', 'testcommand'])['stdout'] == ''
+
+    command_path = f"{project_path}/commands/testcommand.dk.sh"
+    with open(command_path, 'w', encoding='utf8') as f:
+        f.write("#!/usr/bin/env sh\n")
+    assert client.query(['is-local-command', 'testcommand'])['stdout'] == command_path
+
+    with open(f"{project_path}/variables.dk.yml", 'w', encoding='utf8') as f:
+        f.write("variables:\n  TEST_VAR: test1\n")
+    assert 'TEST_VAR=test1' in client.query(['get-command-vars'])['stdout']
+
+
+def test_client_without_server(tmp_path) -> None:
+    """Tests if the client lets the caller fall back when the server is not running.
+    """
+    assert ConfigClient(str(tmp_path / 'missing.sock')).forward(['get-project-path']) is None
@@ -0,0 +1,88 @@
+"""Custom commands tests.
+"""
+import os
+
+from dk.cache import PersistentCache
+from dk.command_index import CommandIndex
+from dk.config_manager import ConfigManager
+from dk.compose_manager import ComposeManager
+from dk.custom_commands_provider import CustomCommandsProvider
+from dk.hook_manager import HookManager
+from dk.process_executor import ProcessExecutor
+from dk.scanner import scan_project
+from dk.utils import find_files_weighted_by_path
+
+
+def write_file(path: str, content: str = "#!/usr/bin/env sh\n") -> None:
+    """Creates the file together with its parent directories.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf8') as f:
+        f.write(content)
+
+
+def test_command_index_matches_search(project_path, tmp_path) -> None:
+    """Tests if the index finds the same files, in the same order, as the regular search.
+    """
+    write_file(f"{project_path}/commands/command1.dk.sh")
+    write_file(f"{project_path}/services/php/commands/command2.php.dk.sh")
+    write_file(f"{project_path}/services/php/commands/command2.php.dk.sh.yml", "help: Test\n")
+    write_file(f"{project_path}/command3.dk.sh")
+    weights = {f"{project_path}/commands": 10}
+
+    expected = find_files_weighted_by_path('*.dk.sh', weights, project_path)
+    cache = PersistentCache(str(tmp_path / 'commands.json'), 'test')
+    index = CommandIndex(cache)
+    scan = scan_project(project_path)
+    assert index.find_command_files(scan, weights) == expected
+    assert index.has_companion(f"{project_path}/services/php/commands", 'command2.php.dk.sh')
+    assert not index.has_companion(f"{project_path}/commands", 'command1.dk.sh')
+    index.save()
+    assert CommandIndex(cache).find_command_files(scan, weights) == expected
+
+
+def test_single_scan(project_path, monkeypatch) -> None:
+    """Tests if loading configs, finding commands and environments, and building the environment
+       list every directory of the project only once.
+    """
+    write_file(f"{project_path}/services/php/commands/command1.php.dk.sh")
+    write_file(f"{project_path}/addons/addon1/addon1.addon.dk.yml", "id: addon1\n")
+    write_file(f"{project_path}/addons/addon1/hooks.py", "")
+    write_file(
+        f"{project_path}/env/dev/docker-compose.recipe.yml",
+        "services:\n  php:\n    image: php-image\n",
+    )
+
+    listed = []
+    scandir = os.scandir
+    def counting_scandir(path):
+        listed.append(path)
+        return scandir(path)
+    monkeypatch.setattr(os, 'scandir', counting_scandir)
+
+    config_manager = ConfigManager()
+    assert [c.name for c in CustomCommandsProvider(config_manager).get_commands()] == ['command1']
+    assert config_manager.get_project_envs() == ['dev']
+    assert ProcessExecutor(
+        config_manager, ComposeManager(config_manager), HookManager(config_manager)
+    ).env_build()
+
+    assert sorted(listed) == sorted(set(listed))
+    assert f"{project_path}/addons/addon1" in listed
+
+
+def test_custom_commands_provider(project_path) -> None:
+    """Tests if commands are resolved by name, and their companion files are respected.
+    """
+    write_file(f"{project_path}/commands/command1.php.dk.sh")
+    write_file(f"{project_path}/commands/command1.php.dk.sh.yml", "help: Test\nuser: '1000'\n")
+    write_file(f"{project_path}/commands/command2.dk.sh")
+    write_file(f"{project_path}/commands/command2.dk.sh.yml", "environments:\n  - test\n")
+
+    provider = CustomCommandsProvider(ConfigManager())
+    command = provider.get_command('command1')
+    assert command.service == 'php'
+    assert command.help == 'Test'
+    assert command.user == '1000'
+    assert not provider.supports('command2')
+    assert [c.name for c in provider.get_commands()] == ['command1']
@@ -0,0 +1,147 @@
+"""Docker Engine API client tests.
+"""
+import json
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from dk.config_manager import ConfigManager
+from dk.docker_api import DockerApiError, DockerClient
+from dk.env_commands_provider import EnvCommandsProvider
+from dk.process_executor import ProcessExecutor
+
+CONTAINERS = [
+    {
+        'Id': 'b' * 64,
+        'Names': ['/test-project-dev-php-1'],
+        'State': 'running',
+        'Status': 'Up 2 hours (healthy)',
+        'Labels': {
+            'com.docker.compose.project': 'test-project-dev',
+            'com.docker.compose.service': 'php',
+        },
+    },
+    {
+        'Id': 'a' * 64,
+        'Names': ['/test-project-dev-db-1'],
+        'State': 'exited',
+        'Status': 'Exited (1) 5 minutes ago',
+        'Labels': {
+            'com.docker.compose.project': 'test-project-dev',
+            'com.docker.compose.service': 'db',
+        },
+    },
+    {
+        'Id': 'c' * 64,
+        'Names': ['/other-dev-php-1'],
+        'State': 'running',
+        'Status': 'Up 3 seconds (health: starting)',
+        'Labels': {
+            'com.docker.compose.project': 'other-dev',
+            'com.docker.compose.service': 'php',
+        },
+    },
+]
+
+
+class FakeDockerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Fake Docker Engine listening on the Unix socket. It serves the listing of containers, and
+       records the requests it received.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, containers: list[dict]):
+        self.containers: list[dict] = containers
+        self.requests: list[str] = []
+        self.status: int = 200
+        super().__init__(socket_path, FakeDockerHandler)
+
+
+class FakeDockerHandler(BaseHTTPRequestHandler):
+    """Handles requests sent to the fake Docker Engine.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Replies with the containers matching the label filters.
+        """
+        self.server.requests.append(self.path)
+        url = urlparse(self.path)
+        if url.path != '/containers/json' or self.server.status != 200:
+            self.__reply(self.server.status if self.server.status != 200 else 404,
+                         {'message': 'error'})
+            return
+
+        filters = json.loads(parse_qs(url.query).get('filters', ['{}'])[0])
+        labels = [label.split('=', 1) for label in filters.get('label', [])]
+        self.__reply(200, [
+            c for c in self.server.containers
+            if all(c['Labels'].get(name) == value for name, value in labels)
+        ])
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def __reply(self, status: int, content) -> None:
+        body = json.dumps(content).encode('utf8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture(name='docker_server')
+def fixture_docker_server(tmp_path, monkeypatch):
+    """Starts the fake Docker Engine, and points the client to it.
+    """
+    socket_path = str(tmp_path / 'docker.sock')
+    server = FakeDockerServer(socket_path, CONTAINERS)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    monkeypatch.setenv('DOCKER_HOST', f"unix://{socket_path}")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_list_project_containers(docker_server) -> None:
+    """Tests if the containers of the project are listed in a single request.
+    """
+    containers = DockerClient().list_project_containers('test-project-dev')
+
+    assert len(docker_server.requests) == 1
+    assert [c.service for c in containers] == ['db', 'php']
+    db, php = containers
+    assert (php.name, php.state, php.health, php.uptime) == \
+        ('test-project-dev-php-1', 'running', 'healthy', '2 hours')
+    assert (db.state, db.health, db.uptime) == ('exited', None, None)
+
+
+def test_docker_api_errors(docker_server, tmp_path) -> None:
+    """Tests if errors are reported with the API error.
+    """
+    docker_server.status = 500
+    with pytest.raises(DockerApiError, match='500'):
+        DockerClient().list_project_containers('test-project-dev')
+
+    with pytest.raises(DockerApiError, match='Could not connect'):
+        DockerClient(str(tmp_path / 'missing.sock')).get('/containers/json')
+
+
+def test_env_status(project_path, docker_server, capsys) -> None:
+    """Tests if the "status" command reports the containers of the current environment only.
+    """
+    config_manager = ConfigManager()
+    provider = EnvCommandsProvider(ProcessExecutor(config_manager), lambda _: None, config_manager)
+    provider.run('status', [])
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ['SERVICE', 'NAME', 'STATE', 'HEALTH', 'UPTIME']
+    assert lines[1].split() == ['db', 'test-project-dev-db-1', 'exited', '-', '-']
+    assert lines[2].split() == ['php', 'test-project-dev-php-1', 'running', 'healthy', '2', 'hours']
+    assert len(lines) == 3
+    assert 'com.docker.compose.project%3Dtest-project-dev' in docker_server.requests[0]
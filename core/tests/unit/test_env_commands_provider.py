@@ -0,0 +1,124 @@
+"""Environment commands tests.
+"""
+import os
+
+import pytest
+
+from dk.compose_manager import ComposeManager
+from dk.config_manager import ConfigManager
+from dk.env_commands_provider import EnvCommandsProvider
+from dk.hook_manager import HookManager
+from dk.process_executor import ProcessExecutor, SCRIPT_VARIABLE_NAME
+
+
+@pytest.fixture(name='executed')
+def fixture_executed(project_path, monkeypatch) -> list:
+    """Creates the built environment with two services, and records the commands run in them
+       instead of running them. The "nginx" service fails.
+    """
+    with open(f"{project_path}/env/dev/docker-compose.yml", 'w', encoding='utf8') as f:
+        f.write("services:\n  php:\n    image: php\n  nginx:\n    image: nginx\n")
+
+    executed = []
+    def fake_execute_many(_self, commands: dict, variables=None, concurrency=4) -> dict:
+        executed.append((commands, variables, concurrency))
+        return {service: 2 if service == 'nginx' else 0 for service in commands}
+    monkeypatch.setattr(ProcessExecutor, 'execute_many', fake_execute_many)
+    return executed
+
+
+def run_env_command(name: str, args: list[str]) -> None:
+    """Runs the "env" command.
+    """
+    config_manager = ConfigManager()
+    process_executor = ProcessExecutor(
+        config_manager,
+        ComposeManager(config_manager),
+        HookManager(config_manager),
+    )
+    EnvCommandsProvider(process_executor, lambda _: None, config_manager).run(name, args)
+
+
+def test_exec_all(executed, capsys) -> None:
+    """Tests if the command is run in all services, and the highest exit code is returned.
+    """
+    with pytest.raises(SystemExit) as e:
+        run_env_command('exec-all', ['ls', '-la'])
+    assert e.value.code == 2
+
+    commands, _, concurrency = executed[0]
+    assert list(commands) == ['php', 'nginx']
+    assert commands['php'][-4:] == ['-T', 'php', 'ls', '-la']
+    assert concurrency == 4
+    output = capsys.readouterr().out
+    assert 'php: succeeded' in output
+    assert 'nginx: failed with exit code 2' in output
+
+
+def test_exec_all_custom_command(project_path, executed) -> None:
+    """Tests if custom commands are run in the chosen services.
+    """
+    with open(f"{project_path}/commands/command1.php.dk.sh", 'w', encoding='utf8') as f:
+        f.write("#!/usr/bin/env sh\necho test\n")
+
+    with pytest.raises(SystemExit) as e:
+        run_env_command('exec-all', ['--services=php,db', '--concurrency', '8', 'command1', 'arg1'])
+    assert e.value.code == 0
+
+    commands, variables, concurrency = executed[0]
+    assert list(commands) == ['php', 'db']
+    assert commands['db'][-1] == 'arg1'
+    assert 'db' in commands['db']
+    assert SCRIPT_VARIABLE_NAME in variables
+    assert concurrency == 8
+
+
+def test_exec_all_killed(executed, monkeypatch) -> None:
+    """Tests if the command killed by a signal fails the whole run, even if other commands
+       succeed.
+    """
+    def fake_execute_many(_self, commands: dict, _variables=None, _concurrency=4) -> dict:
+        executed.append(commands)
+        return {service: -9 if service == 'nginx' else 0 for service in commands}
+    monkeypatch.setattr(ProcessExecutor, 'execute_many', fake_execute_many)
+
+    with pytest.raises(SystemExit) as e:
+        run_env_command('exec-all', ['ls'])
+    assert e.value.code == 137
+
+
+@pytest.mark.parametrize('concurrency', ['abc', '0', '-1'])
+def test_exec_all_invalid_concurrency(executed, capsys, concurrency) -> None:
+    """Tests if the invalid concurrency is reported without running anything.
+    """
+    with pytest.raises(SystemExit) as e:
+        run_env_command('exec-all', [f"--concurrency={concurrency}", 'ls'])
+    assert e.value.code == 1
+    assert f"'{concurrency}'" in capsys.readouterr().err
+    assert not executed
+
+
+def test_multiple_envs(project_path, executed) -> None:
+    """Tests if all given environments are built and started at once.
+    """
+    for env in ['dev', 'test']:
+        os.makedirs(f"{project_path}/env/{env}", exist_ok=True)
+        with open(f"{project_path}/env/{env}/docker-compose.recipe.yml", 'w', encoding='utf8') as f:
+            f.write("services:\n  php:\n    image: php-${DRAKY_ENV}\n")
+
+    run_env_command('build', ['-s', '--envs', 'dev,test'])
+    for env in ['dev', 'test']:
+        with open(f"{project_path}/env/{env}/docker-compose.yml", encoding='utf8') as f:
+            assert f"php-{env}" in f.read()
+        with open(f"{project_path}/env/{env}/.env", encoding='utf8') as f:
+            assert f"DRAKY_ENV={env}" in f.read()
+
+    run_env_command('up', ['--envs=dev,test'])
+    commands, _, _ = executed[0]
+    assert list(commands) == ['dev', 'test']
+    assert 'test-project-test' in commands['test']
+    assert commands['test'][-2:] == ['up', '-d']
+
+    with pytest.raises(SystemExit) as e:
+        run_env_command('build', ['--envs', 'dev,prod'])
+    assert e.value.code == 1
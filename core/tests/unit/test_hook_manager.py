@@ -0,0 +1,46 @@
+"""Hook manager tests.
+"""
+import os
+
+from dk.compose_manager import ComposeManager, ComposeRecipe
+from dk.config_manager import ConfigManager
+from dk.hook_manager import HookManager
+
+
+def test_addon_alter_services(project_path) -> None:
+    """Tests if the hooks module is loaded once, and both hooks can alter services.
+    """
+    addon_path = f"{project_path}/addons/test-addon"
+    os.makedirs(addon_path)
+    with open(f"{addon_path}/test-addon.addon.dk.yml", 'w', encoding='utf8') as f:
+        f.write("id: test-addon\n")
+    with open(f"{addon_path}/hooks.py", 'w', encoding='utf8') as f:
+        f.write(
+            "import os\n"
+            "with open(os.path.dirname(__file__) + '/loads', 'a', encoding='utf8') as f:\n"
+            "    f.write('loaded\\n')\n"
+            "def alter_service(name, service, utils, addon):\n"
+            "    service['entrypoint'] = [name]\n"
+            "def alter_compose(compose, utils, addon):\n"
+            "    for service in compose['services'].values():\n"
+            "        service['labels'] = sorted(compose['services'])\n"
+        )
+
+    recipe_path = f"{project_path}/env/dev/docker-compose.recipe.yml"
+    services = {
+        service: {'image': 'test-image', 'draky': {'addons': ['test-addon']}}
+        for service in ['php', 'nginx']
+    }
+    services['db'] = {'image': 'test-image'}
+    recipe = ComposeRecipe({'services': services}, recipe_path, f"{project_path}/env/dev")
+
+    config_manager = ConfigManager()
+    compose = ComposeManager(config_manager).create(recipe, f"{project_path}/env/dev/c.yml")
+    HookManager(config_manager).addon_alter_services(recipe, compose)
+
+    for service in ['php', 'nginx']:
+        assert compose.get_service(service)['entrypoint'] == [service]
+        assert compose.get_service(service)['labels'] == ['nginx', 'php']
+    assert 'labels' not in compose.get_service('db')
+    with open(f"{addon_path}/loads", encoding='utf8') as f:
+        assert f.read() == "loaded\n"
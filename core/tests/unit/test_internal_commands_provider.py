@@ -0,0 +1,43 @@
+"""Internal commands tests.
+"""
+import os
+
+import pytest
+
+from dk.config_manager import ConfigManager
+from dk.custom_commands_provider import CustomCommandsProvider
+from dk.internal_commands_provider import InternalCommandsProvider
+
+
+def resolve(args: list[str], capsys) -> list[str]:
+    """Runs the "resolve" internal command and returns the fields it printed.
+    """
+    config_manager = ConfigManager()
+    provider = InternalCommandsProvider(config_manager, CustomCommandsProvider(config_manager))
+    with pytest.raises(SystemExit):
+        provider.handle_internal_commands(['resolve'] + args)
+    output = capsys.readouterr().out
+    assert output.endswith('\0')
+    return output.split('\0')[:-1]
+
+
+def test_resolve(project_path, capsys) -> None:
+    """Tests if the "resolve" command returns everything needed to run the command.
+    """
+    command_path = f"{project_path}/commands/testcommand.dk.sh"
+    with open(command_path, 'w', encoding='utf8') as f:
+        f.write("#!/usr/bin/env sh\n")
+
+    assert resolve([project_path, 'env', 'up'], capsys) == [project_path, '0', '']
+
+    fields = resolve([project_path, 'testcommand', 'argument'], capsys)
+    assert fields[:3] == [project_path, '0', command_path]
+    assert 'DRAKY_PROJECT_ID=test-project' in fields[3:]
+    # The lockfile is refreshed, so the wrapper can run the command without the core.
+    assert os.path.exists(f"{project_path}/env/dev/.resolved.lock")
+
+
+def test_resolve_context_switch(project_path, capsys) -> None:
+    """Tests if the "resolve" command detects that the context has to be switched.
+    """
+    assert resolve(['/other/.draky', 'testcommand'], capsys) == [project_path, '1', '']
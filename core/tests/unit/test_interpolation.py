@@ -0,0 +1,40 @@
+"""Interpolation tests.
+"""
+import pytest
+
+from dk.interpolation import Interpolator, VariableNotExists, VariableReferenceCycle
+
+
+@pytest.mark.parametrize('string,expected', [
+    ('${VAR1} and ${var_2}', 'value1 and value2'),
+    ('$${VAR1} $VAR1 ${} ${1VAR} ${VAR1', '$${VAR1} $VAR1 ${} ${1VAR} ${VAR1'),
+    ('${MISSING:-default} ${MISSING-default}', 'default default'),
+    ('${EMPTY:-default}|${EMPTY-default}', 'default|'),
+    ('${VAR1:-default} ${VAR1:?error}', 'value1 value1'),
+    ('${EMPTY?error}|${VAR1:+alt}|${EMPTY:+alt}|${EMPTY+alt}|${MISSING+alt}', '|alt||alt|'),
+    ('${MISSING:-${OTHER:-${VAR1}}}', 'value1'),
+    ('${MISSING:-{literal}}', '{literal}'),
+    ('${NESTED}', 'nested value1'),
+])
+def test_interpolate(string, expected) -> None:
+    """Tests if references are substituted according to their operators.
+    """
+    interpolator = Interpolator({
+        'VAR1': 'value1',
+        'var_2': 'value2',
+        'EMPTY': '',
+        'NESTED': 'nested ${VAR1}',
+    })
+    assert interpolator.interpolate(string) == expected
+
+
+def test_interpolate_errors() -> None:
+    """Tests if missing variables and cycles are reported.
+    """
+    interpolator = Interpolator({'EMPTY': '', 'CYCLE1': '${CYCLE2}', 'CYCLE2': '${CYCLE1}'})
+    with pytest.raises(VariableNotExists, match="MISSING doesn't exist"):
+        interpolator.interpolate('${MISSING}')
+    with pytest.raises(VariableNotExists, match='EMPTY is required: not set'):
+        interpolator.interpolate('${EMPTY:?not set}')
+    with pytest.raises(VariableReferenceCycle, match='CYCLE1 -> CYCLE2 -> CYCLE1'):
+        interpolator.interpolate('${CYCLE1}')
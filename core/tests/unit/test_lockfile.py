@@ -0,0 +1,129 @@
+"""Lockfile tests.
+"""
+import os
+import subprocess
+import sys
+
+from dk.compose_manager import ComposeManager
+from dk.config_manager import ConfigManager
+from dk.hook_manager import HookManager
+from dk.lockfile import get_default_env_path, get_lockfile_inputs, get_lockfile_path
+from dk.process_executor import ProcessExecutor
+
+CORE_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def read_lockfile(path: str) -> list[str]:
+    """Returns the fields of the lockfile.
+    """
+    with open(path, encoding='utf8') as f:
+        content = f.read()
+    assert content.endswith('\0')
+    return content.split('\0')[:-1]
+
+
+def is_stale(config_manager: ConfigManager) -> bool:
+    """Tells if the lockfile is stale, the same way the wrapper does.
+    """
+    lockfile_mtime = os.stat(get_lockfile_path(config_manager)).st_mtime_ns
+    return any(
+        not os.path.exists(path) or os.stat(path).st_mtime_ns > lockfile_mtime
+        for path in get_lockfile_inputs(config_manager)
+    )
+
+
+def test_write_lockfile(project_path) -> None:
+    """Tests if the build writes the resolved variables and commands, and if the lockfile is
+       fresh until any of its inputs changes.
+    """
+    os.makedirs(f"{project_path}/services/php")
+    local_command_path = f"{project_path}/commands/local.dk.sh"
+    service_command_path = f"{project_path}/services/php/remote.php.dk.sh"
+    for path in [local_command_path, service_command_path]:
+        with open(path, 'w', encoding='utf8') as f:
+            f.write("#!/usr/bin/env sh\n")
+    with open(f"{service_command_path}.yml", 'w', encoding='utf8') as f:
+        f.write("user: www-data\n")
+
+    config_manager = ConfigManager()
+    ProcessExecutor(
+        config_manager, ComposeManager(config_manager), HookManager(config_manager)
+    ).env_build()
+
+    fields = read_lockfile(get_lockfile_path(config_manager))
+    assert fields[:4] == ['draky-lock 1', 'test', 'dev', project_path]
+    inputs_count = int(fields[4])
+    inputs = fields[5:5 + inputs_count]
+    assert project_path in inputs
+    assert f"{project_path}/core.dk.yml" in inputs
+    assert f"{service_command_path}.yml" in inputs
+    vars_count = int(fields[5 + inputs_count])
+    variables = fields[6 + inputs_count:6 + inputs_count + vars_count]
+    assert 'DRAKY_PROJECT_ID=test-project' in variables
+    commands = fields[6 + inputs_count + vars_count:]
+    assert commands[0] == '2'
+    assert sorted(zip(*[iter(commands[1:])] * 4)) == [
+        ('local', '', '0', local_command_path),
+        ('remote', 'php', 'www-data', service_command_path),
+    ]
+    with open(get_default_env_path(config_manager), encoding='utf8') as f:
+        assert f.read() == 'dev\n'
+    assert not is_stale(config_manager)
+
+    lockfile_mtime = os.stat(get_lockfile_path(config_manager)).st_mtime_ns
+    os.utime(local_command_path, ns=(lockfile_mtime + 1, lockfile_mtime + 1))
+    assert is_stale(config_manager)
+
+
+def test_lockfile_without_process_variables(project_path, tmp_path, monkeypatch) -> None:
+    """Tests if variables configuring only the core's process are not stored in the lockfile, so
+       they don't leak into the commands run later without them.
+    """
+    monkeypatch.setenv('DRAKY_TRACE', str(tmp_path / 'trace.json'))
+    config_manager = ConfigManager()
+    ProcessExecutor(
+        config_manager, ComposeManager(config_manager), HookManager(config_manager)
+    ).env_build()
+
+    fields = read_lockfile(get_lockfile_path(config_manager))
+    assert 'DRAKY_PROJECT_ID=test-project' in fields
+    assert not [field for field in fields if field.startswith('DRAKY_TRACE=')]
+
+
+def test_default_env(project_path, monkeypatch) -> None:
+    """Tests if the default environment is recorded, even if another one is built.
+    """
+    os.makedirs(f"{project_path}/env/test")
+    monkeypatch.setenv('DRAKY_ENV', 'test')
+    config_manager = ConfigManager()
+    assert config_manager.get_project_env() == 'test'
+    assert config_manager.get_default_env() == 'dev'
+    ProcessExecutor(
+        config_manager, ComposeManager(config_manager), HookManager(config_manager)
+    ).env_build()
+
+    assert read_lockfile(f"{project_path}/env/test/.resolved.lock")[2] == 'test'
+    assert not os.path.exists(f"{project_path}/env/dev/.resolved.lock")
+    with open(get_default_env_path(config_manager), encoding='utf8') as f:
+        assert f.read() == 'dev\n'
+
+
+def test_lockfiles_fresh_after_build(project_path, tmp_path) -> None:
+    """Tests if lockfiles are still fresh when the whole "env build" command finishes, after
+       other environments and the completion index have been written.
+    """
+    os.makedirs(f"{project_path}/env/test")
+    subprocess.run(
+        [sys.executable, f"{CORE_PATH}/dk", 'env', 'build', '--envs', 'dev,test'],
+        check=True,
+        capture_output=True,
+        env=os.environ | {
+            'PYTHONPATH': CORE_PATH,
+            'DRAKY_CONFIG_SERVER_SOCKET': str(tmp_path / 'missing.sock'),
+        },
+    )
+
+    config_manager = ConfigManager()
+    assert os.path.exists(f"{project_path}/.completion-index")
+    for env in ['dev', 'test']:
+        assert not is_stale(config_manager.for_env(env))
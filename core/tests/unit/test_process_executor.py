@@ -0,0 +1,203 @@
+"""Process executor tests.
+"""
+import os
+import subprocess
+
+import pytest
+
+from dk import process_executor
+from dk.command import ServiceCommand
+from dk.compose_manager import ComposeManager
+from dk.config_manager import ConfigManager
+from dk.hook_manager import HookManager
+from dk.process_executor import ProcessExecutor
+
+
+def create_process_executor() -> ProcessExecutor:
+    """Creates the process executor for the current project.
+    """
+    config_manager = ConfigManager()
+    return ProcessExecutor(
+        config_manager,
+        ComposeManager(config_manager),
+        HookManager(config_manager),
+    )
+
+
+@pytest.fixture(name='env_path')
+def fixture_env_path(project_path) -> str:
+    """Creates a recipe in the default environment, and returns the environment's path.
+    """
+    env_path = f"{project_path}/env/dev"
+    with open(f"{env_path}/docker-compose.recipe.yml", 'w', encoding='utf8') as f:
+        f.write("services:\n  php:\n    image: php-image\n")
+    return env_path
+
+
+def test_env_build_is_incremental(env_path) -> None:
+    """Tests if the build is skipped when its inputs don't change.
+    """
+    compose_path = f"{env_path}/docker-compose.yml"
+    assert create_process_executor().env_build()
+    assert 'image: php-image' in open(compose_path, encoding='utf8').read()
+    compose_mtime = os.stat(compose_path).st_mtime_ns
+
+    assert not create_process_executor().env_build()
+    assert os.stat(compose_path).st_mtime_ns == compose_mtime
+    assert create_process_executor().env_build(force=True)
+    assert create_process_executor().env_build(substitute_vars=True)
+
+    with open(f"{env_path}/docker-compose.recipe.yml", 'a', encoding='utf8') as f:
+        f.write("  nginx:\n    image: nginx-image\n")
+    assert create_process_executor().env_build(substitute_vars=True)
+
+    # Modified outputs are rebuilt.
+    with open(compose_path, 'w', encoding='utf8') as f:
+        f.write('')
+    assert create_process_executor().env_build(substitute_vars=True)
+    assert 'image: nginx-image' in open(compose_path, encoding='utf8').read()
+
+
+def test_env_build_variables_change(env_path, project_path) -> None:
+    """Tests if changing variables triggers the build.
+    """
+    assert create_process_executor().env_build()
+    with open(f"{project_path}/variables.dk.yml", 'w', encoding='utf8') as f:
+        f.write("variables:\n  TEST_VAR: test1\n")
+    assert create_process_executor().env_build()
+    assert 'TEST_VAR=test1' in open(f"{env_path}/.env", encoding='utf8').read()
+
+
+@pytest.mark.parametrize('script_size', [10, 200 * 1024])
+def test_execute_inside_container(project_path, tmp_path, monkeypatch, script_size) -> None:
+    """Tests if scripts are installed in the container only once, and by the same exec that runs
+       them, unless they are too big to be passed in a variable.
+    """
+    script_path = f"{project_path}/commands/command1.php.dk.sh"
+    with open(script_path, 'w', encoding='utf8') as f:
+        f.write('#!/usr/bin/env sh\n' + '#' * script_size + '\necho "$@" > "$DEST"\n')
+    monkeypatch.setattr(process_executor, 'SCRIPTS_PATH', str(tmp_path / 'container'))
+    command = ServiceCommand(name='command1', help='', service='php', cmd=script_path, user='0')
+
+    execs = []
+    def fake_run(command: list, env: dict, **_kwargs):
+        execs.append(command)
+        # Run the part of the command that would be executed in the container, locally.
+        container_command = command[command.index('php') + 1:]
+        return subprocess.run(container_command, check=False, env=env | {
+            'PATH': os.environ['PATH'],
+            'DEST': str(tmp_path / 'output'),
+        })
+    def fake_execute_pipe(_self, commands: list):
+        execs.append(commands[-1])
+        container_command = commands[-1][commands[-1].index('php') + 1:]
+        with open(script_path, 'rb') as f:
+            subprocess.run(container_command, check=True, stdin=f)
+    monkeypatch.setattr(process_executor, 'run', fake_run)
+    monkeypatch.setattr(ProcessExecutor, 'execute_pipe', fake_execute_pipe)
+
+    for _ in range(2):
+        result = ProcessExecutor(ConfigManager()).execute_inside_container(
+            command, ['arg1', 'arg2'], {'DRAKY_ENV': 'dev'},
+        )
+        assert result == 0
+        with open(tmp_path / 'output', encoding='utf8') as f:
+            assert f.read() == "arg1 arg2\n"
+    assert len(os.listdir(tmp_path / 'container')) == 1
+    assert len(execs) == (2 if script_size < process_executor.MAX_INLINE_SCRIPT_SIZE else 4)
+
+
+def test_env_build_commands_mount(env_path, project_path) -> None:
+    """Tests if directories with the service commands are mounted into their services.
+    """
+    os.makedirs(f"{project_path}/services/php/commands")
+    for path in ['commands/command1.php.dk.sh', 'services/php/commands/command2.php.dk.sh']:
+        with open(f"{project_path}/{path}", 'w', encoding='utf8') as f:
+            f.write("#!/usr/bin/env sh\n")
+    with open(f"{project_path}/variables.dk.yml", 'w', encoding='utf8') as f:
+        f.write("variables:\n  DRAKY_COMMANDS_MOUNT: '1'\n")
+
+    assert create_process_executor().env_build()
+    compose = open(f"{env_path}/docker-compose.yml", encoding='utf8').read()
+    for path in ['commands', 'services/php/commands']:
+        assert f"{project_path}/{path}:{project_path}/{path}:ro" in compose
+
+    # Adding commands to services missing from the recipe, or to directories already mounted,
+    # doesn't change the build's inputs.
+    with open(f"{project_path}/commands/command3.nginx.dk.sh", 'w', encoding='utf8') as f:
+        f.write("#!/usr/bin/env sh\n")
+    assert not create_process_executor().env_build()
+    with open(f"{project_path}/commands/command4.php.dk.sh", 'w', encoding='utf8') as f:
+        f.write("#!/usr/bin/env sh\n")
+    assert not create_process_executor().env_build()
+    with open(f"{env_path}/docker-compose.recipe.yml", 'a', encoding='utf8') as f:
+        f.write("  nginx:\n    image: nginx-image\n")
+    assert create_process_executor().env_build()
+    compose = open(f"{env_path}/docker-compose.yml", encoding='utf8').read()
+    assert compose.count(f"{project_path}/commands:{project_path}/commands:ro") == 2
+
+
+@pytest.mark.parametrize('mounted, executable', [(True, True), (True, False), (False, True)])
+def test_execute_mounted_command(
+        env_path, project_path, tmp_path, monkeypatch, mounted, executable
+) -> None:
+    """Tests if mounted executable scripts are run in place, in a single exec, and installed if the
+       built environment doesn't mount them, or if they aren't executable.
+    """
+    script_path = f"{project_path}/commands/command1.php.dk.sh"
+    with open(script_path, 'w', encoding='utf8') as f:
+        f.write('#!/usr/bin/env sh\necho "$0 $@" > "$DEST"\n')
+    os.chmod(script_path, 0o755 if executable else 0o644)
+    with open(f"{project_path}/variables.dk.yml", 'w', encoding='utf8') as f:
+        f.write(f"variables:\n  DRAKY_COMMANDS_MOUNT: '{1 if mounted else 0}'\n")
+    create_process_executor().env_build()
+    if not mounted:
+        # The environment built without the mount is run with the mount enabled.
+        with open(f"{project_path}/variables.dk.yml", 'w', encoding='utf8') as f:
+            f.write("variables:\n  DRAKY_COMMANDS_MOUNT: '1'\n")
+    in_place = mounted and executable
+    command = ServiceCommand(name='command1', help='', service='php', cmd=script_path, user='0')
+
+    execs = []
+
+    def fake_run(command: list, env: dict, **_kwargs):
+        execs.append(command)
+        container_command = command[command.index('php') + 1:]
+        return subprocess.run(container_command, check=False, env=env | {
+            'PATH': os.environ['PATH'],
+            'DEST': str(tmp_path / 'output'),
+        })
+    monkeypatch.setattr(process_executor, 'run', fake_run)
+    monkeypatch.setattr(process_executor, 'SCRIPTS_PATH', str(tmp_path / 'container'))
+
+    executor = ProcessExecutor(ConfigManager())
+    assert executor.execute_inside_container(command, ['arg1']) == 0
+    with open(tmp_path / 'output', encoding='utf8') as f:
+        output = f.read()
+    assert output.startswith(script_path) == in_place
+    assert output.endswith(" arg1\n")
+    assert os.path.exists(tmp_path / 'container') != in_place
+    assert len(execs) == 1
+    assert ('DRAKY_COMMAND_SCRIPT' in execs[0]) != in_place
+
+
+def test_execute_many(project_path, tmp_path, capsys) -> None:
+    """Tests if commands are run concurrently up to the limit, and their output is prefixed.
+    """
+    running_path = tmp_path / 'running'
+    running_path.mkdir()
+    # Every command prints the number of commands running at the same time.
+    script = f'touch "{running_path}/$0"; sleep 0.2; ls "{running_path}" | wc -l; ' \
+             f'rm "{running_path}/$0"'
+    commands = {f"service{i}": ['sh', '-c', script, f"service{i}"] for i in range(5)}
+    commands['failing'] = ['sh', '-c', 'echo first; printf second; exit 3']
+
+    exit_codes = ProcessExecutor(ConfigManager()).execute_many(commands, concurrency=2)
+
+    assert exit_codes == {**{f"service{i}": 0 for i in range(5)}, 'failing': 3}
+    lines = capsys.readouterr().out.splitlines()
+    assert 'failing  | first' in lines
+    assert 'failing  | second' in lines
+    running = [int(line.split('|')[1]) for line in lines if line.startswith('service')]
+    assert len(running) == 5
+    assert max(running) <= 2
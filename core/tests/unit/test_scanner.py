@@ -0,0 +1,124 @@
+"""Project scanning tests.
+"""
+import os
+
+import pytest
+
+from dk.cache import PersistentCache
+from dk.command_index import CommandIndex
+from dk.config import fetch_configs
+from dk.scanner import IGNORE_FILENAME, IgnoreRules, ProjectScanner, scan_project
+
+
+@pytest.mark.parametrize('pattern, path, is_dir, ignored', [
+    ('data/', 'env/dev/data', True, True),
+    ('data/', 'env/dev/data', False, False),
+    ('/data', 'data', True, True),
+    ('/data', 'env/data', True, False),
+    ('env/*/data', 'env/dev/data', True, True),
+    ('env/*/data', 'env/dev/nested/data', True, False),
+    ('env/**/data', 'env/dev/nested/data', True, True),
+    ('env/**/data', 'env/data', True, True),
+    ('cache/**', 'cache/file', False, True),
+    ('*.log', 'env/dev/debug.log', False, True),
+    ('debug.lo?', 'debug.log', False, True),
+    ('[!a]b', 'ab', False, False),
+    ('[!a]b', 'cb', False, True),
+    ('\\#file', '#file', False, True),
+    ('# comment', '# comment', False, False),
+])
+def test_ignore_patterns(pattern, path, is_dir, ignored) -> None:
+    """Tests if gitignore-style patterns are matched against relative paths.
+    """
+    assert IgnoreRules([pattern]).is_ignored(path, is_dir) == ignored
+
+
+def test_ignore_negation() -> None:
+    """Tests if the last matching rule wins.
+    """
+    rules = IgnoreRules(['*.log', '!keep.log', 'node_modules/', '!node_modules/'])
+    assert rules.is_ignored('debug.log', False)
+    assert not rules.is_ignored('keep.log', False)
+    assert not rules.is_ignored('node_modules', True)
+
+
+def test_scanner_prunes_ignored(project_path) -> None:
+    """Tests if ignored directories are not descended into, so their content doesn't add to the
+       cost of the scan.
+    """
+    data_path = f"{project_path}/env/dev/data"
+    os.makedirs(f"{data_path}/nested")
+    for i in range(100):
+        with open(f"{data_path}/nested/file{i}.dk.yml", 'w', encoding='utf8') as f:
+            f.write('variables: {}\n')
+    os.makedirs(f"{project_path}/node_modules/package")
+    with open(f"{project_path}/node_modules/package/test.dk.yml", 'w', encoding='utf8') as f:
+        f.write('variables: {}\n')
+
+    # node_modules is ignored by default.
+    scanner = ProjectScanner(project_path)
+    assert len(list(scanner.walk())) == 6
+    unpruned_visited = scanner.visited
+
+    with open(f"{project_path}/{IGNORE_FILENAME}", 'w', encoding='utf8') as f:
+        f.write("# Database's data.\nenv/*/data/\n")
+    scanner = ProjectScanner(project_path)
+    paths = [path for path, _, _ in scanner.walk()]
+    assert f"{project_path}/env/dev" in paths
+    assert not [path for path in paths if 'data' in path or 'node_modules' in path]
+    assert unpruned_visited > 100
+    assert scanner.visited < 10
+
+    assert [config.path for config in fetch_configs(project_path)] == ['core.dk.yml']
+
+
+def test_command_index_ignore(project_path, tmp_path) -> None:
+    """Tests if changes of the ignore rules are respected by the stored index.
+    """
+    os.makedirs(f"{project_path}/vendor")
+    with open(f"{project_path}/vendor/test.dk.sh", 'w', encoding='utf8') as f:
+        f.write('echo test\n')
+    cache = PersistentCache(str(tmp_path / 'commands.json'), 'test')
+    index = CommandIndex(cache)
+    assert len(index.find_command_files(scan_project(project_path), {})) == 1
+    index.save()
+
+    with open(f"{project_path}/{IGNORE_FILENAME}", 'w', encoding='utf8') as f:
+        f.write('vendor/\n')
+    assert not CommandIndex(cache).find_command_files(scan_project(project_path), {})
+
+
+def test_scan_project(project_path) -> None:
+    """Tests if the project's files are classified in a single scan.
+    """
+    files = {
+        'addons/addon1/addon1.addon.dk.yml': 'id: addon1\n',
+        'addons/addon1/hooks.py': '',
+        'commands/command1.dk.sh': '',
+        'commands/command1.dk.sh.yml': 'help: Test\n',
+        'services/php/command2.php.dk.sh': '',
+        'env/dev/docker-compose.recipe.yml': 'services: {}\n',
+        'env/dev/nested/docker-compose.recipe.yml': 'services: {}\n',
+    }
+    for path, content in files.items():
+        os.makedirs(os.path.dirname(f"{project_path}/{path}"), exist_ok=True)
+        with open(f"{project_path}/{path}", 'w', encoding='utf8') as f:
+            f.write(content)
+    os.makedirs(f"{project_path}/env/test")
+
+    scan = scan_project(project_path)
+    assert sorted(scan.configs) == [
+        f"{project_path}/addons/addon1/addon1.addon.dk.yml", f"{project_path}/core.dk.yml",
+    ]
+    assert sorted(scan.commands) == [
+        (f"{project_path}/commands", 'command1.dk.sh'),
+        (f"{project_path}/services/php", 'command2.php.dk.sh'),
+    ]
+    assert scan.companions == {f"{project_path}/commands/command1.dk.sh"}
+    assert scan.hooks == {f"{project_path}/addons/addon1/hooks.py"}
+    assert scan.environments == ('dev', 'test')
+    assert dict(scan.recipes) == {'dev': f"{project_path}/env/dev/docker-compose.recipe.yml"}
+    assert scan.directories[0] == project_path
+    assert f"{project_path}/env/test" in scan.directories
+    with pytest.raises(AttributeError):
+        scan.configs = ()
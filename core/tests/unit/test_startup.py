@@ -0,0 +1,81 @@
+"""Startup tests.
+"""
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+from dk.command_provider import PARSER_COMMANDS
+
+CORE_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Modules that the internal and custom commands must never load.
+FORBIDDEN_MODULES = ['argparse', 'packaging', 'dk.compose_manager', 'dk.hook_manager']
+
+# Time budget for the imports of the internal and custom commands, in microseconds. It's well above
+# the expected time, so it only catches heavy imports sneaking back into these paths.
+IMPORT_TIME_BUDGET = 500_000
+
+
+def get_imports(arguments: list[str]) -> tuple[list[str], int]:
+    """Runs the core with the given arguments, and returns the imported modules together with the
+       total import time, in microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', f"{CORE_PATH}/dk", *arguments],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=os.environ | {'PYTHONPATH': CORE_PATH},
+    )
+    modules = []
+    total_time = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, module = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        modules.append(module.strip())
+        # Nested imports are indented, and their time is included in the time of their parent.
+        if not module[1:].startswith(' '):
+            total_time += int(cumulative)
+    return modules, total_time
+
+
+@pytest.mark.parametrize('arguments', [
+    ['core', '__internal', 'get-project-path'],
+    ['core', '__internal', 'resolve', '', 'command1'],
+    ['command2'],
+])
+def test_startup_imports(project_path, tmp_path, monkeypatch, arguments) -> None:
+    """Tests if the internal and custom commands don't load modules they don't need.
+    """
+    monkeypatch.setenv('DRAKY_CONFIG_SERVER_SOCKET', str(tmp_path / 'missing.sock'))
+    with open(f"{project_path}/commands/command1.php.dk.sh", 'w', encoding='utf8') as f:
+        f.write("#!/usr/bin/env sh\n")
+
+    modules, total_time = get_imports(arguments)
+    assert 'dk.config_manager' in modules
+    for module in FORBIDDEN_MODULES:
+        assert module not in modules
+    assert total_time < IMPORT_TIME_BUDGET, total_time
+
+
+def test_parser_commands(project_path) -> None:
+    """Tests if the commands told apart from the custom commands without building the parser are
+       exactly the top-level commands the parser handles.
+    """
+    result = subprocess.run(
+        [sys.executable, f"{CORE_PATH}/dk", '-h'],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=project_path,
+        env=os.environ | {'PYTHONPATH': CORE_PATH},
+    )
+    usage = result.stdout.splitlines()[0]
+    commands = re.search(r'\{([^}]*)\}', usage).group(1).split(',')
+    assert sorted(PARSER_COMMANDS) == sorted(['-h', '-v', '--version', *commands])
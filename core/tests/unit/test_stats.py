@@ -0,0 +1,96 @@
+"""Invocation statistics tests.
+"""
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from dk.core_commands_provider import CoreCommandsProvider
+from dk.stats import StatsStore, get_stats_store, record_invocation, summarize
+
+CORE_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_stats_store(tmp_path) -> None:
+    """Tests if records are appended, filtered by time, and if the store's size is bounded.
+    """
+    store = StatsStore(str(tmp_path / 'stats' / 'invocations.jsonl'), max_size=2000)
+    store.append({'time': 10, 'command': 'old'})
+    store.append({'time': 20, 'command': 'new'})
+    assert [r['command'] for r in store.load()] == ['old', 'new']
+    assert [r['command'] for r in store.load(since=15)] == ['new']
+
+    for i in range(200):
+        store.append({'time': 30 + i, 'command': f"command{i}"})
+    assert os.path.getsize(store.path) <= 2000
+    records = store.load()
+    assert records[-1]['command'] == 'command199'
+    assert all(records[i]['time'] < records[i + 1]['time'] for i in range(len(records) - 1))
+
+
+def test_summarize() -> None:
+    """Tests if percentiles are computed per group.
+    """
+    records = [{'command': 'a', 'wall': float(i), 'subprocess': 0.5, 'exit_code': 0}
+               for i in range(1, 101)]
+    records.append({'command': 'b', 'wall': 2.0, 'subprocess': 1.0, 'exit_code': 3})
+
+    summaries = summarize(records, 'command')
+    assert list(summaries) == ['a', 'b']
+    assert (summaries['a'].p50, summaries['a'].p95, summaries['a'].max) == (50.0, 95.0, 100.0)
+    assert summaries['a'].count == 100
+    assert summaries['a'].failed == 0
+    assert summaries['b'].failed == 1
+    assert summaries['b'].subprocess_p50 == 1.0
+
+
+def test_record_invocation(tmp_path, monkeypatch) -> None:
+    """Tests if the exit code of the wrapped block is recorded.
+    """
+    monkeypatch.setenv('DRAKY_GLOBAL_CONFIG_ROOT', str(tmp_path))
+    with pytest.raises(SystemExit):
+        with record_invocation('env up', 'dev', 'project'):
+            sys.exit(2)
+
+    record = get_stats_store().load()[0]
+    assert record['command'] == 'env up'
+    assert record['env'] == 'dev'
+    assert record['exit_code'] == 2
+    assert record['wall'] >= record['subprocess'] >= 0
+
+
+def test_invocations_recorded(project_path, tmp_path, capsys) -> None:
+    """Tests if invocations of the core are recorded, and reported by the "stats" command.
+    """
+    for _ in range(2):
+        subprocess.run(
+            [sys.executable, f"{CORE_PATH}/dk", 'command2'],
+            check=True,
+            capture_output=True,
+            env=os.environ | {
+                'PYTHONPATH': CORE_PATH,
+                'DRAKY_CONFIG_SERVER_SOCKET': str(tmp_path / 'missing.sock'),
+            },
+        )
+    get_stats_store().append({'time': time.time() - 100 * 86400, 'command': 'old'})
+
+    CoreCommandsProvider(lambda _: None).run('stats', [])
+    output = capsys.readouterr().out
+    assert 'command2' in output
+    assert 'old' not in output
+    assert 'dev' in output
+
+    CoreCommandsProvider(lambda _: None).run('stats', ['--days=200'])
+    assert 'old' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('days', ['week', '0', '-1', 'nan', 'inf'])
+def test_stats_invalid_days(project_path, capsys, days) -> None:
+    """Tests if the invalid number of days is reported without the traceback.
+    """
+    with pytest.raises(SystemExit) as e:
+        CoreCommandsProvider(lambda _: None).run('stats', [f"--days={days}"])
+    assert e.value.code == 1
+    assert f"'{days}'" in capsys.readouterr().err
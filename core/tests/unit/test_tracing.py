@@ -0,0 +1,76 @@
+"""Tracing tests.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from dk.config_manager import ConfigManager
+from dk.process_executor import ProcessExecutor
+from dk.tracing import Tracer
+
+CORE_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_trace(path: str) -> list[dict]:
+    """Returns the events from the trace file. The closing bracket is optional in the format, so
+       it's added here.
+    """
+    with open(path, 'r', encoding='utf8') as f:
+        return json.loads(f.read().rstrip(",\n") + "]")
+
+
+def test_tracer(tmp_path) -> None:
+    """Tests if spans are recorded with their arguments, and appended to the trace file.
+    """
+    trace_path = str(tmp_path / 'trace.json')
+    for _ in range(2):
+        tracer = Tracer(trace_path)
+        with tracer.span('outer', path='/path'):
+            with tracer.span('inner') as span_args:
+                span_args['exit_code'] = 1
+        tracer.flush()
+
+    events = load_trace(trace_path)
+    assert [e['name'] for e in events] == ['process_name', 'inner', 'outer', 'process'] * 2
+    inner, outer = events[1], events[2]
+    assert inner['args'] == {'exit_code': 1}
+    assert outer['args'] == {'path': '/path'}
+    assert outer['cat'] == 'outer'
+    assert outer['ts'] <= inner['ts']
+    assert inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+
+
+def test_trace_invocation(project_path, tmp_path) -> None:
+    """Tests if the invocation of the core is traced when the variable is set.
+    """
+    trace_path = str(tmp_path / 'trace.json')
+    subprocess.run(
+        [sys.executable, f"{CORE_PATH}/dk", 'core', '__internal', 'get-project-path'],
+        check=True,
+        capture_output=True,
+        env=os.environ | {
+            'PYTHONPATH': CORE_PATH,
+            'DRAKY_TRACE': trace_path,
+            'DRAKY_CONFIG_SERVER_SOCKET': str(tmp_path / 'missing.sock'),
+        },
+    )
+
+    names = [e['name'] for e in load_trace(trace_path)]
+    for name in ['configs.load', 'configs.discover', 'configs.parse', 'variables.merge', 'process']:
+        assert name in names
+
+
+def test_tracing_does_not_change_variables(project_path, tmp_path, monkeypatch) -> None:
+    """Tests if enabling tracing doesn't add a variable to the project, so it doesn't trigger
+       the build, or end up in the .env file.
+    """
+    assert ProcessExecutor(ConfigManager()).env_build()
+    monkeypatch.setenv('DRAKY_TRACE', str(tmp_path / 'trace.json'))
+    monkeypatch.setenv('DRAKY_CONFIG_SERVER_SOCKET', str(tmp_path / 'server.sock'))
+    config_manager = ConfigManager()
+    assert 'DRAKY_TRACE' not in config_manager.get_vars()
+    assert 'DRAKY_CONFIG_SERVER_SOCKET' not in config_manager.get_vars()
+    assert not ProcessExecutor(config_manager).env_build()
+    with open(f"{project_path}/env/dev/.env", encoding='utf8') as f:
+        assert 'DRAKY_TRACE' not in f.read()
@@ -0,0 +1,75 @@
+"""Variables tests.
+"""
+from dk.config_manager import ConfigManager
+from dk.variables import BUILTIN_ORIGIN, ENVIRONMENT_ORIGIN, VariableLayers
+
+
+def test_variable_layers(monkeypatch) -> None:
+    """Tests if layers override each other, values are kept intact, and references are resolved
+       against the previous values.
+    """
+    monkeypatch.setenv('TEST_ENVIRONMENT_VAR', 'environment-value')
+    layers = VariableLayers()
+    layers.add({'VAR1': 'value1', 'VAR2': "multi\nline # not a comment", 'VAR3': 3}, 'config1')
+    layers.add({
+        'VAR1': '"${VAR1}-overridden"',
+        'VAR4': '${VAR3}${MISSING}${TEST_ENVIRONMENT_VAR}',
+    }, 'config2')
+
+    assert layers.values == {
+        'VAR1': '"value1-overridden"',
+        'VAR2': "multi\nline # not a comment",
+        'VAR3': '3',
+        'VAR4': '3environment-value',
+    }
+    assert layers.origins == {
+        'VAR1': 'config2', 'VAR2': 'config1', 'VAR3': 'config1', 'VAR4': 'config2',
+    }
+
+    layers = VariableLayers(interpolate=False)
+    layers.add({'VAR1': '${VAR2}'}, 'config1')
+    assert layers.values == {'VAR1': '${VAR2}'}
+
+
+def test_vars_origins(project_path, monkeypatch) -> None:
+    """Tests if the origin of every project variable is known.
+    """
+    monkeypatch.setenv('DRAKY_TEST_VAR', 'test')
+    with open(f"{project_path}/variables.dk.yml", 'w', encoding='utf8') as f:
+        f.write(
+            "dependencies:\n  - core.dk.yml\nvariables:\n  TEST_VAR: ${DRAKY_PROJECT_ID}-test\n"
+        )
+
+    config_manager = ConfigManager()
+    assert config_manager.get_vars()['TEST_VAR'] == 'test-project-test'
+    origins = config_manager.get_vars_origins()
+    assert origins['TEST_VAR'] == 'variables.dk.yml'
+    assert origins['DRAKY_PROJECT_ID'] == 'core.dk.yml'
+    assert origins['DRAKY_TEST_VAR'] == ENVIRONMENT_ORIGIN
+    assert origins['DRAKY_ENV'] == BUILTIN_ORIGIN
+
+
+def test_vars_for_env(project_path, monkeypatch) -> None:
+    """Tests if variables of other environments are merged without fetching configs again.
+    """
+    monkeypatch.setenv('DRAKY_ENV', 'dev')
+    with open(f"{project_path}/variables.dk.yml", 'w', encoding='utf8') as f:
+        f.write("variables:\n  URL: ${DRAKY_ENV}.example.com\n  VAR: universal\n")
+    with open(f"{project_path}/test.dk.yml", 'w', encoding='utf8') as f:
+        f.write("environments: [test]\nvariables:\n  VAR: test\n")
+
+    config_manager = ConfigManager()
+    fetched = []
+    monkeypatch.setattr('dk.config_manager.fetch_configs', lambda *_: fetched.append(1))
+    test_config_manager = config_manager.for_env('test')
+
+    assert not fetched
+    assert test_config_manager.get_project_env() == 'test'
+    assert test_config_manager.get_vars()['DRAKY_ENV'] == 'test'
+    assert test_config_manager.get_vars()['URL'] == 'test.example.com'
+    assert test_config_manager.get_vars()['VAR'] == 'test'
+    assert test_config_manager.resolve_vars_in_string('${VAR}') == 'test'
+    assert config_manager.get_project_env() == 'dev'
+    assert config_manager.get_vars()['URL'] == 'dev.example.com'
+    assert config_manager.get_vars()['VAR'] == 'universal'
+    assert config_manager.resolve_vars_in_string('${VAR}') == 'universal'
@@ -0,0 +1,159 @@
+"""File watching tests.
+"""
+import pytest
+
+from dk.completion import COMPLETION_INDEX_FILENAME, write_completion_index
+from dk.compose_manager import ComposeManager
+from dk.config_manager import ConfigManager
+from dk.env_watcher import EnvironmentWatcher
+from dk.hook_manager import HookManager
+from dk.process_executor import ProcessExecutor
+from dk.scanner import IgnoreRules
+from dk.watcher import InotifyWatcher, PollingWatcher, Watcher
+
+
+@pytest.fixture(name='watcher', params=['inotify', 'polling'])
+def fixture_watcher(request):
+    """Creates each kind of the watcher.
+    """
+    watcher = InotifyWatcher() if request.param == 'inotify' else PollingWatcher(interval=0.02)
+    yield watcher
+    watcher.close()
+
+
+def test_watcher(watcher, tmp_path) -> None:
+    """Tests if changes are reported, including in nested directories, and if bursts of changes
+       are reported at once.
+    """
+    (tmp_path / 'nested').mkdir()
+    (tmp_path / 'flat').mkdir()
+    watcher.watch(str(tmp_path / 'nested'))
+    watcher.watch(str(tmp_path / 'flat'), recursive=False)
+    assert not watcher.wait(0.05)
+
+    for i in range(3):
+        (tmp_path / 'nested' / f"file{i}").write_text('content', encoding='utf8')
+    changes = watcher.wait_for_changes(0.2)
+    assert {f"{tmp_path}/nested/file{i}" for i in range(3)} <= changes
+
+    (tmp_path / 'nested' / 'dir').mkdir()
+    watcher.wait_for_changes(0.2)
+    (tmp_path / 'nested' / 'dir' / 'file').write_text('content', encoding='utf8')
+    assert f"{tmp_path}/nested/dir/file" in watcher.wait_for_changes(0.2)
+
+    (tmp_path / 'flat' / 'file').write_text('content', encoding='utf8')
+    assert f"{tmp_path}/flat/file" in watcher.wait_for_changes(0.2)
+
+
+def test_watcher_ignore(watcher, tmp_path) -> None:
+    """Tests if the ignored files and directories are not reported, including the ones created
+       after the watch has started.
+    """
+    (tmp_path / 'node_modules').mkdir()
+    (tmp_path / 'env' / 'dev' / 'data').mkdir(parents=True)
+    watcher.watch(str(tmp_path), ignore=IgnoreRules(['node_modules/', 'env/*/data/', '*.log']))
+
+    (tmp_path / 'node_modules' / 'file').write_text('content', encoding='utf8')
+    (tmp_path / 'env' / 'dev' / 'data' / 'db').write_text('content', encoding='utf8')
+    (tmp_path / 'env' / 'dev' / 'build.log').write_text('content', encoding='utf8')
+    assert not watcher.wait(0.1)
+
+    (tmp_path / 'env' / 'test' / 'data').mkdir(parents=True)
+    watcher.wait_for_changes(0.2)
+    (tmp_path / 'env' / 'test' / 'data' / 'db').write_text('content', encoding='utf8')
+    (tmp_path / 'env' / 'test' / 'vars.dk.yml').write_text('content', encoding='utf8')
+    assert watcher.wait_for_changes(0.2) == {f"{tmp_path}/env/test/vars.dk.yml"}
+
+
+class FakeWatcher(Watcher):
+    """Watcher recording the watched directories.
+    """
+
+    def __init__(self):
+        self.watched: dict[str, bool] = {}
+
+    def watch(self, path: str, recursive: bool = True, ignore: IgnoreRules | None = None) -> None:
+        self.watched[path] = recursive
+
+    def wait(self, timeout: float | None = None) -> set[str]:
+        return set()
+
+
+def test_environment_watcher(project_path, tmp_path, monkeypatch, capsys) -> None:
+    """Tests if the environment is rebuilt when its sources change, and if only the services
+       whose definitions changed are started.
+    """
+    env_path = f"{project_path}/env/dev"
+    # Extended files are usually kept outside the configuration, next to the project's code.
+    extended_path = tmp_path / 'project' / 'services'
+    extended_path.mkdir()
+    (extended_path / 'services.yml').write_text(
+        "services:\n  db:\n    image: db-image\n", encoding='utf8'
+    )
+    recipe_path = f"{env_path}/docker-compose.recipe.yml"
+    with open(recipe_path, 'w', encoding='utf8') as f:
+        f.write("services:\n"
+                "  php:\n    image: php-image\n"
+                "  db:\n    extends:\n      file: ../../../services/services.yml\n"
+                "      service: db\n")
+
+    started = []
+    monkeypatch.setattr(
+        ProcessExecutor, 'env_start', lambda _self, services=None: started.append(services)
+    )
+    config_manager = ConfigManager()
+    watcher = FakeWatcher()
+    env_watcher = EnvironmentWatcher(
+        ProcessExecutor(
+            config_manager, ComposeManager(config_manager), HookManager(config_manager)
+        ),
+        watcher,
+        start=True,
+        build_callback=lambda process_executor: write_completion_index(process_executor, []),
+    )
+
+    assert env_watcher.rebuild(None)
+    assert watcher.watched == {project_path: True, str(extended_path): False}
+    assert not started
+
+    # Outputs of the build, and the files excluded from the project's scan, are not sources.
+    assert not env_watcher.rebuild({f"{env_path}/docker-compose.yml", f"{env_path}/.env"})
+    assert not env_watcher.rebuild({f"{project_path}/node_modules/addon/addon.dk.yml"})
+
+    (extended_path / 'services.yml').write_text(
+        "services:\n  db:\n    image: db-image2\n", encoding='utf8'
+    )
+    assert env_watcher.rebuild({f"{extended_path}/services.yml"})
+    assert started == [['db']]
+    assert 'Changed services: db.' in capsys.readouterr().out
+
+    with open(f"{project_path}/variables.dk.yml", 'w', encoding='utf8') as f:
+        f.write("variables:\n  TEST_VAR: test1\n")
+    assert env_watcher.rebuild({f"{project_path}/variables.dk.yml"})
+    assert started == [['db'], None]
+
+    # The completion index is refreshed, even if the definition doesn't change.
+    with open(f"{project_path}/commands/command1.dk.sh", 'w', encoding='utf8') as f:
+        f.write("#!/usr/bin/env sh\n")
+    assert not env_watcher.rebuild({f"{project_path}/commands/command1.dk.sh"})
+    with open(f"{project_path}/{COMPLETION_INDEX_FILENAME}", encoding='utf8') as f:
+        assert 'command\tcommand1\t' in f.read()
+
+    # Errors don't stop the watch.
+    with open(recipe_path, 'w', encoding='utf8') as f:
+        f.write("services: [\n")
+    assert not env_watcher.rebuild({recipe_path})
+    assert 'The build has failed' in capsys.readouterr().err
+
+    # Invalid configuration doesn't stop the watch either, and the previous one is kept.
+    with open(recipe_path, 'w', encoding='utf8') as f:
+        f.write("services:\n  php:\n    image: php-image\n")
+    with open(f"{project_path}/variables.dk.yml", 'w', encoding='utf8') as f:
+        f.write("variables: [\n")
+    assert not env_watcher.rebuild({f"{project_path}/variables.dk.yml"})
+    assert 'The build has failed' in capsys.readouterr().err
+    with open(f"{project_path}/variables.dk.yml", 'w', encoding='utf8') as f:
+        f.write("variables:\n  TEST_VAR: test2\n")
+    assert env_watcher.rebuild({f"{project_path}/variables.dk.yml"})
+    with open(f"{env_path}/.env", encoding='utf8') as f:
+        assert 'TEST_VAR=test2' in f.read()
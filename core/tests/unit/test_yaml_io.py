@@ -0,0 +1,43 @@
+"""YAML I/O tests.
+"""
+import os
+
+import yaml
+
+from dk import yaml_io
+
+
+def test_load_file(tmp_path, monkeypatch) -> None:
+    """Tests if files are parsed once, unless they are modified.
+    """
+    path = str(tmp_path / 'test.yml')
+    with open(path, 'w', encoding='utf8') as f:
+        f.write("key: value1\n")
+
+    parsed = []
+    load = yaml_io.load
+    def counting_load(stream):
+        parsed.append(stream.name)
+        return load(stream)
+    monkeypatch.setattr(yaml_io, 'load', counting_load)
+
+    assert yaml_io.load_file(path) == {'key': 'value1'}
+    assert yaml_io.load_file(path) is yaml_io.load_file(path)
+    assert len(parsed) == 1
+
+    with open(path, 'w', encoding='utf8') as f:
+        f.write("key: value2 # changed\n")
+    os.utime(path, ns=(0, 0))
+    assert yaml_io.load_file(path) == {'key': 'value2'}
+    assert len(parsed) == 2
+
+
+def test_dump() -> None:
+    """Tests if the output is the same as the one of the pure-Python dumper.
+    """
+    data = {'services': {'php': {
+        'image': 'php:8', 'command': "multi\nline", 'environment': ['A=1', 'B=${B}'], 'ports': [80],
+    }}}
+    assert yaml_io.dump(data, default_flow_style=False) ==\
+        yaml.safe_dump(data, default_flow_style=False)
+    assert yaml_io.load(yaml_io.dump(data)) == data
@@ -8,4 +8,9 @@ if [ ! -d "$DIRECTORY" ]; then
   chown "${DRAKY_HOST_UID}:${DRAKY_HOST_GID}" "${DRAKY_DOCKER_CACHE_PATH}"
 fi
 
+# Start the config server, so the internal commands don't need to load the project's configuration
+# on every call. If it's not running, the commands fall back to loading the configuration by
+# themselves.
+dk-config-server &
+
 exec "$@"
\ No newline at end of file
@@ -307,6 +307,32 @@ EOF
   [[ "$output" == *"# This file is autogenerated"* ]]
 }
 
+@test "Build compose: build is skipped when nothing has changed" {
+  _initialize_test_project
+  # Create the recipe.
+  cat > "$DEFAULT_ENV_RECIPE_PATH" << EOF
+services:
+  php:
+    image: php-image
+EOF
+  ${DRAKY} env build
+  COMPOSE_MTIME="$(stat -c %Y "$DEFAULT_ENV_COMPOSE_PATH")"
+  DOTENV_MTIME="$(stat -c %Y "$DEFAULT_ENV_PATH/.env")"
+  sleep 1
+  ${DRAKY} env build
+  [[ "$(stat -c %Y "$DEFAULT_ENV_COMPOSE_PATH")" == "$COMPOSE_MTIME" ]]
+  [[ "$(stat -c %Y "$DEFAULT_ENV_PATH/.env")" == "$DOTENV_MTIME" ]]
+
+  cat > "$DEFAULT_ENV_RECIPE_PATH" << EOF
+services:
+  php:
+    image: php-image-changed
+EOF
+  ${DRAKY} env build
+  grep -q "image: php-image-changed" "$DEFAULT_ENV_COMPOSE_PATH"
+  ${DRAKY} env build --force
+}
+
 @test "Build compose: import service from an external file" {
   _initialize_test_project
   # Create the recipe.
@@ -539,6 +565,43 @@ EOF
   grep -q "$ENTRYPOINT_SCRIPT" "$DEFAULT_ENV_COMPOSE_PATH"
 }
 
+@test "Addons: Addons can alter all of their services at once" {
+  _initialize_test_project
+
+  # Create a test addon.
+  ADDON_PATH="${TEST_PROJECT_CONFIG_PATH}/addons/test-addon"
+  mkdir -p "$ADDON_PATH"
+  # Create the addon config file.
+  cat > "${ADDON_PATH}/test-addon.addon.dk.yml" << EOF
+id: test-addon
+EOF
+
+  cat > "${ADDON_PATH}/hooks.py" << EOF
+def alter_compose(compose: dict, utils: object, addon: dict):
+    for name, service in compose['services'].items():
+        service['entrypoint'] = ['/' + name + '.entrypoint.sh']
+EOF
+
+  # Create the recipe.
+  cat > "$DEFAULT_ENV_RECIPE_PATH" << EOF
+services:
+  php:
+    image: test-image
+    draky:
+      addons:
+        - test-addon
+  nginx:
+    image: test-image
+    draky:
+      addons:
+        - test-addon
+EOF
+
+  ${DRAKY} env build
+  grep -q "/php.entrypoint.sh" "$DEFAULT_ENV_COMPOSE_PATH"
+  grep -q "/nginx.entrypoint.sh" "$DEFAULT_ENV_COMPOSE_PATH"
+}
+
 @test "Addons: Addons can alter services even if they are enabled on services being extended" {
   _initialize_test_project
 
@@ -619,6 +682,46 @@ EOF
   [[ "$output" == *"Usage:"* ]]
 }
 
+@test "Core commands: draky env status" {
+  _initialize_test_project
+  cat > "$DEFAULT_ENV_RECIPE_PATH" << EOF
+services:
+  php:
+    image: ghcr.io/draky-dev/draky-generic-testing-environment:1.0.0
+    command: 'tail -f /dev/null'
+EOF
+  run ${DRAKY} env status
+  [[ "$output" == *"The environment has no containers."* ]]
+
+  ${DRAKY} env up
+  run ${DRAKY} env status
+  [[ "$status" == 0 ]]
+  [[ "$output" == *"php"*"running"* ]]
+}
+
+@test "Core commands: draky env exec-all" {
+  _initialize_test_project
+  cat > "$DEFAULT_ENV_RECIPE_PATH" << EOF
+services:
+  php:
+    image: ghcr.io/draky-dev/draky-generic-testing-environment:1.0.0
+    command: 'tail -f /dev/null'
+  nginx:
+    image: ghcr.io/draky-dev/draky-generic-testing-environment:1.0.0
+    command: 'tail -f /dev/null'
+EOF
+  ${DRAKY} env up
+
+  run ${DRAKY} env exec-all echo test-output
+  [[ "$status" == 0 ]]
+  [[ "$output" == *"php   | test-output"* ]]
+  [[ "$output" == *"nginx | test-output"* ]]
+
+  run ${DRAKY} env exec-all --services php sh -c 'exit 3'
+  [[ "$status" == 3 ]]
+  [[ "$output" == *"php: failed with exit code 3"* ]]
+}
+
 @test "Custom commands: Custom command is added to the help" {
   _initialize_test_project
   TEST_COMMAND_PATH="${TEST_PROJECT_CONFIG_PATH}/testcommand.dk.sh"
@@ -660,6 +763,40 @@ EOF
   [[ "$output" == *"${TEST_SERVICE_COMMAND_MESSAGE}"* ]]
 }
 
+@test "Custom commands: User can run custom scripts from the mounted commands directory" {
+  _initialize_test_project
+
+  TEST_SERVICE=test_service
+
+    # Create the compose file.
+  cat > "$DEFAULT_ENV_RECIPE_PATH" << EOF
+services:
+  $TEST_SERVICE:
+    image: ghcr.io/draky-dev/draky-generic-testing-environment:1.0.0
+    command: 'tail -f /dev/null'
+EOF
+
+  cat > "${TEST_PROJECT_CONFIG_PATH}/variables.dk.yml" << EOF
+variables:
+  DRAKY_COMMANDS_MOUNT: '1'
+EOF
+
+  TEST_SERVICE_COMMAND_NAME="testservicecommand"
+  TEST_SERVICE_COMMAND_PATH="${TEST_PROJECT_CONFIG_PATH}/${TEST_SERVICE_COMMAND_NAME}.${TEST_SERVICE}.dk.sh"
+
+  cat > "${TEST_SERVICE_COMMAND_PATH}" << 'EOF'
+#!/usr/bin/env sh
+echo "running $0"
+EOF
+  chmod a+x "${TEST_SERVICE_COMMAND_PATH}"
+
+  ${DRAKY} env up
+  grep -q "${TEST_PROJECT_CONFIG_PATH}:${TEST_PROJECT_CONFIG_PATH}:ro" "$DEFAULT_ENV_COMPOSE_PATH"
+
+  run ${DRAKY} ${TEST_SERVICE_COMMAND_NAME}
+  [[ "$output" == *"running ${TEST_SERVICE_COMMAND_PATH}"* ]]
+}
+
 @test "Custom commands: User can run custom scripts on the host" {
   _initialize_test_project
 
@@ -720,6 +857,38 @@ EOF
   [[ "$output" == *"${SOME_VARIABLE_VALUE}"* ]]
 }
 
+@test "Custom commands: Local commands are run from the lockfile without the core" {
+  _initialize_test_project
+  TEST_COMMAND_NAME="testcommand"
+  TEST_COMMAND_PATH="${TEST_PROJECT_CONFIG_PATH}/$TEST_COMMAND_NAME.dk.sh"
+
+  cat > "${TEST_COMMAND_PATH}" << EOF
+#!/usr/bin/env sh
+echo "\$SOME_VARIABLE"
+EOF
+  chmod a+x "${TEST_COMMAND_PATH}"
+  cat > "${TEST_PROJECT_CONFIG_PATH}/variables.dk.yml" << EOF
+variables:
+  SOME_VARIABLE: 'first value'
+EOF
+  ${DRAKY} env build
+  ${DRAKY} core destroy
+
+  run "${DRAKY}" "${TEST_COMMAND_NAME}"
+  [[ "$output" == "first value" ]]
+  # The command has been run without starting the core.
+  ! docker container inspect draky &> /dev/null
+
+  # Changed configuration makes the lockfile stale, so the core resolves the command again.
+  cat > "${TEST_PROJECT_CONFIG_PATH}/variables.dk.yml" << EOF
+variables:
+  SOME_VARIABLE: 'second value'
+EOF
+  run "${DRAKY}" "${TEST_COMMAND_NAME}"
+  [[ "$output" == *"second value"* ]]
+  docker container inspect draky &> /dev/null
+}
+
 @test "Custom commands: Passthrough exit code to the host" {
   _initialize_test_project
 
@@ -1119,3 +1288,48 @@ EOF
   run ${DRAKY} env debug vars
   [[ "$output" == *"${TEST_VAR_NAME} = ${TEST_VAR_VALUE_ENV_TEST}"* ]]
 }
+
+@test "Tracing: Trace file is written to the project's configuration directory" {
+  _initialize_test_project
+  cd "${TEST_PROJECT_PATH}"
+  DRAKY_TRACE=trace.json ${DRAKY} env build
+  [ -s "${TEST_PROJECT_CONFIG_PATH}/trace.json" ]
+
+  # The core can't write outside the project's configuration directory.
+  DRAKY_TRACE="${TEST_PROJECT_PATH}/trace.json" run ${DRAKY} env build
+  [ "$status" -eq 1 ]
+  [[ "$output" == *"The trace file has to be inside"* ]]
+  [ ! -e "${TEST_PROJECT_PATH}/trace.json" ]
+}
+
+@test "Shell completion" {
+  _initialize_test_project
+  cat > "$DEFAULT_ENV_RECIPE_PATH" << EOF
+services:
+  php:
+    image: ghcr.io/draky-dev/draky-generic-testing-environment:1.0.0
+EOF
+  cat > "${TEST_PROJECT_CONFIG_PATH}/testcommand.dk.sh" << EOF
+#!/usr/bin/env sh
+EOF
+  ${DRAKY} env build
+
+  source "${DRAKY_SOURCE_PATH}/bin/draky-completion.bash"
+  cd "${TEST_PROJECT_PATH}"
+
+  COMP_WORDS=(draky '')
+  COMP_CWORD=1
+  _draky_complete
+  [[ " ${COMPREPLY[*]} " == *" env "* ]]
+  [[ " ${COMPREPLY[*]} " == *" testcommand "* ]]
+
+  COMP_WORDS=(draky env b)
+  COMP_CWORD=2
+  _draky_complete
+  [[ "${COMPREPLY[*]}" == "build" ]]
+
+  COMP_WORDS=(draky env exec-all --services '')
+  COMP_CWORD=4
+  _draky_complete
+  [[ "${COMPREPLY[*]}" == "php" ]]
+}